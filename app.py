@@ -15,9 +15,12 @@ import pandas as pd
 import numpy as np
 import os
 from utils import authenticate_user, get_user_role, initialize_session_state
-from data_manager import load_data, save_data
+from data_manager import load_data, save_data, run_migrations
 from email_manager import verify_invitation, mark_invitation_accepted
 
+# Bring the stored data up to the current schema version (a no-op once migrated)
+run_migrations()
+
 # Ensure .streamlit directory exists and create default CSS if needed
 streamlit_dir = '.streamlit'
 css_path = os.path.join(streamlit_dir, 'style.css')
@@ -686,14 +689,14 @@ def main_app():
     # Load summary data filtered by organization
     try:
         from utils import get_current_organization_id
-        from data_manager import load_data_for_organization
+        from data_manager import load_data_for_organization, get_org_context
 
         organization_id = get_current_organization_id()
+        context = get_org_context(organization_id)
 
-        employees_df = load_data_for_organization("employees", organization_id)
-        competencies_df = load_data_for_organization("competencies",
-                                                     organization_id)
-        skills_df = load_data_for_organization("skills", organization_id)
+        employees_df = context.employees
+        competencies_df = context.competencies
+        skills_df = context.skills
         assessments_df = load_data_for_organization("assessments",
                                                     organization_id)
 
@@ -791,9 +794,6 @@ def display_organization_selector():
                 if success:
                     st.success(
                         f"Organization '{org_name}' created successfully!")
-                    # Update schemas to include organization_id fields
-                    from data_manager import update_schema_for_organizations
-                    update_results = update_schema_for_organizations()
                     
                     # Update session state with new organization
                     st.session_state.organization_id = org_id
@@ -1,8 +1,13 @@
 import pandas as pd
+import numpy as np
 import os
 import json
+import threading
+from collections import deque
+from contextlib import contextmanager
 from datetime import datetime
 from utils import get_user_id
+from storage import CSVStorage, SQLiteStorage, apply_schema, match_rows, partition_name
 
 # Define the data files
 DATA_FILES = {
@@ -17,7 +22,9 @@ DATA_FILES = {
     "skill_assessments": "skill_assessments.csv",
     "comp_assessments": "competency_assessments.csv",
     "organizations": "organizations.csv",
-    "notes": "notes.csv"
+    "notes": "notes.csv",
+    "latest_assessments": "latest_skill_scores.csv",
+    "latest_comp_assessments": "latest_competency_scores.csv"
 }
 
 # Define the ID columns for each data type
@@ -32,45 +39,364 @@ ID_COLUMNS = {
     "assessments": "assessment_id",
     "skill_assessments": "assessment_id",  # Added to match DATA_FILES
     "comp_assessments": "assessment_id",
-    "organizations": "organization_id"
+    "organizations": "organization_id",
+    "notes": "note_id",
+    "latest_assessments": "assessment_id",
+    "latest_comp_assessments": "assessment_id"
 }
 
-def load_data(data_type):
-    """Load data from a CSV file"""
+# Define the composite keys for data types without a single ID column
+KEY_COLUMNS = {
+    "expectations": ["level_id", "competency_id", "skill_id"],
+    "comp_expectations": ["level_id", "competency_id"]
+}
+
+# Define the column types of each data type. They drive how stored tables are
+# parsed and the columns of a table that doesn't exist yet:
+# - "Int64": nullable integer IDs, so a missing manager or organization
+#   doesn't turn the whole column into floats
+# - "category": low-cardinality labels, stored once per table instead of once per row
+# - "datetime": dates, parsed on read and written back as YYYY-MM-DD
+# - None: left to the reader (e.g. True/False flags)
+# Tables with a "version" column are versioned per row: see ConflictError.
+_ASSESSMENT_SCHEMA = {
+    "assessment_id": "Int64",
+    "employee_id": "Int64",
+    "competency_id": "Int64",
+    "skill_id": "Int64",
+    "score": "float64",
+    "assessment_type": "category",
+    "assessment_date": "datetime",
+    "notes": "object",
+    "organization_id": "Int64"
+}
+_COMP_ASSESSMENT_SCHEMA = {col: dtype for col, dtype in _ASSESSMENT_SCHEMA.items() if col != "skill_id"}
+
+TABLE_SCHEMAS = {
+    "users": {"username": "object", "password": "object", "role": "object", "name": "object", "email": "object", "version": "Int64"},
+    "employees": {
+        "employee_id": "Int64",
+        "name": "object",
+        "email": "object",
+        "job_title": "object",
+        "job_level": "category",
+        "department": "category",
+        "manager_id": "Int64",
+        "organization_id": "Int64",
+        "hire_date": "datetime",
+        "version": "Int64"
+    },
+    "competencies": {"competency_id": "Int64", "name": "object", "description": "object", "organization_id": "Int64", "version": "Int64"},
+    "skills": {
+        "skill_id": "Int64",
+        "competency_id": "Int64",
+        "name": "object",
+        "description": "object",
+        "organization_id": "Int64",
+        "version": "Int64"
+    },
+    "levels": {"level_id": "Int64", "name": "object", "description": "object", "organization_id": "Int64", "version": "Int64"},
+    "expectations": {
+        "level_id": "Int64",
+        "competency_id": "Int64",
+        "skill_id": "Int64",
+        "expected_score": "float64",
+        "organization_id": "Int64",
+        "version": "Int64"
+    },
+    "comp_expectations": {
+        "level_id": "Int64",
+        "competency_id": "Int64",
+        "expected_score": "float64",
+        "organization_id": "Int64",
+        "version": "Int64"
+    },
+    "assessments": _ASSESSMENT_SCHEMA,
+    "skill_assessments": _ASSESSMENT_SCHEMA,
+    "comp_assessments": _COMP_ASSESSMENT_SCHEMA,
+    "organizations": {"organization_id": "Int64", "name": "object", "created_by": "object", "created_at": "object", "version": "Int64"},
+    "notes": {
+        "note_id": "Int64",
+        "employee_id": "Int64",
+        "author_id": "Int64",
+        "author_type": "category",
+        "date": "object",
+        "content": "object",
+        "is_shared": None,
+        "organization_id": "Int64",
+        "related_skills": "object",
+        "related_competencies": "object"
+    },
+    "latest_assessments": _ASSESSMENT_SCHEMA,
+    "latest_comp_assessments": _COMP_ASSESSMENT_SCHEMA
+}
+
+# Define the columns of each data type, used when a table doesn't exist yet
+TABLE_COLUMNS = {data_type: list(schema) for data_type, schema in TABLE_SCHEMAS.items()}
+
+# Data types whose rows carry a version number, bumped by every update
+VERSIONED_TYPES = [data_type for data_type, schema in TABLE_SCHEMAS.items() if "version" in schema]
+
+# Define the framework items each data type references, as {ID column: (name
+# column, data type holding the names)}. Only the IDs are stored, so renaming
+# an item is a single row update; loaded frames get the names next to the IDs.
+_ASSESSMENT_REFERENCES = {"competency_id": ("competency", "competencies"), "skill_id": ("skill", "skills")}
+_COMP_ASSESSMENT_REFERENCES = {"competency_id": ("competency", "competencies")}
+
+REFERENCE_COLUMNS = {
+    "expectations": {"level_id": ("job_level", "levels"), **_ASSESSMENT_REFERENCES},
+    "comp_expectations": {"level_id": ("job_level", "levels"), **_COMP_ASSESSMENT_REFERENCES},
+    "assessments": _ASSESSMENT_REFERENCES,
+    "skill_assessments": _ASSESSMENT_REFERENCES,
+    "comp_assessments": _COMP_ASSESSMENT_REFERENCES,
+    "latest_assessments": _ASSESSMENT_REFERENCES,
+    "latest_comp_assessments": _COMP_ASSESSMENT_REFERENCES
+}
+
+# Define the secondary indexes for storage backends that support them
+INDEX_COLUMNS = {
+    "employees": [("organization_id",), ("manager_id",)],
+    "competencies": [("organization_id",)],
+    "skills": [("competency_id",)],
+    "levels": [("organization_id",)],
+    "expectations": [("organization_id",), ("skill_id",)],
+    "comp_expectations": [("organization_id",)],
+    "assessments": [("employee_id",), ("organization_id",), ("skill_id",)],
+    "comp_assessments": [("employee_id",), ("organization_id",)],
+    "notes": [("employee_id",)],
+    "latest_assessments": [("employee_id",), ("skill_id",)],
+    "latest_comp_assessments": [("employee_id",), ("competency_id",)]
+}
+
+# Derived tables holding the latest assessment of every key, maintained on write.
+# Maps each assessment data type to (latest data type, key columns). The key
+# includes organization_id so organization filters give the same answer as
+# filtering the full history.
+LATEST_TABLES = {
+    "assessments": ("latest_assessments", ["employee_id", "competency_id", "skill_id", "assessment_type", "organization_id"]),
+    "skill_assessments": ("latest_assessments", ["employee_id", "competency_id", "skill_id", "assessment_type", "organization_id"]),
+    "comp_assessments": ("latest_comp_assessments", ["employee_id", "competency_id", "assessment_type", "organization_id"])
+}
+
+# Data types stored in one partition per organization_id, so reading or
+# rewriting one organization's rows doesn't touch the others
+PARTITIONED_TYPES = [
+    "employees", "competencies", "skills", "levels", "expectations", "comp_expectations",
+    "assessments", "skill_assessments", "comp_assessments", "notes",
+    "latest_assessments", "latest_comp_assessments"
+]
+
+def create_storage(backend=None):
+    """Create the storage backend for the data tables
+    
+    Args:
+        backend: "csv" or "sqlite". Defaults to the SKILLMATRIX_STORAGE environment variable, then "csv".
+        
+    Returns:
+        Storage backend instance
+    """
+    backend = (backend or os.environ.get("SKILLMATRIX_STORAGE", "csv")).lower()
+    csv_storage = CSVStorage(DATA_FILES, ID_COLUMNS, PARTITIONED_TYPES, schemas=TABLE_SCHEMAS)
+    if backend == "sqlite":
+        return SQLiteStorage(
+            os.environ.get("SKILLMATRIX_DB_PATH", "skillmatrix.db"),
+            DATA_FILES, ID_COLUMNS, KEY_COLUMNS, TABLE_COLUMNS, INDEX_COLUMNS,
+            csv_storage=csv_storage, schemas=TABLE_SCHEMAS
+        )
+    if backend == "csv":
+        return csv_storage
+    raise ValueError(f"Unknown storage backend: {backend}")
+
+_storage = create_storage()
+
+def set_storage(storage):
+    """Switch the storage backend used by all data functions"""
+    global _storage
+    _storage = storage
+    invalidate_cache()
+
+# Process-wide cache of parsed tables, keyed by (storage location, partition),
+# where the partition is None for a whole table. Each entry is (version, DataFrame);
+# the version is compared with the backend on every load so changes made by other
+# processes are picked up. For CSV files the version is the file identity
+# (mtime, size, inode).
+_table_cache = {}
+_table_cache_lock = threading.Lock()
+
+def _copy_frame(df):
+    """Return a frame callers can modify without touching the cached one"""
+    # With pandas copy-on-write enabled a shallow copy is enough
+    return df.copy(deep=not pd.options.mode.copy_on_write)
+
+def invalidate_cache(data_type=None):
+    """Drop cached tables so the next load re-reads them from storage
+    
+    Args:
+        data_type: Optional data type to invalidate. If None, the whole cache is cleared.
+    """
+    with _table_cache_lock:
+        if data_type is None:
+            _table_cache.clear()
+        else:
+            table_key = _storage.table_key(data_type)
+            for key in [key for key in _table_cache if key[0] == table_key]:
+                del _table_cache[key]
+    
+    # Analytics cubes check the table versions themselves, but a full
+    # invalidation (e.g. a rolled back transaction) drops them as well
+    if data_type is None:
+        with _cube_lock:
+            _cubes.clear()
+
+def _cached_read(key, get_version, read):
+    """Read through the cache, reusing the cached frame if its version hasn't changed"""
+    version = get_version()
+    
+    with _table_cache_lock:
+        cached = _table_cache.get(key)
+    if cached is not None and cached[0] == version:
+        return _copy_frame(cached[1])
+    
+    df = read()
+    
+    # Only cache the frame if the table didn't change while we were reading it
+    if get_version() == version:
+        with _table_cache_lock:
+            _table_cache[key] = (version, df)
+    return _copy_frame(df)
+
+def _empty_frame(data_type):
+    """Return an empty frame with the columns and types of a data type"""
+    return apply_schema(pd.DataFrame(columns=TABLE_COLUMNS.get(data_type, [])), TABLE_SCHEMAS.get(data_type))
+
+def _read_table(data_type):
+    """Read a whole table, reusing the cached frame if it hasn't changed"""
+    return _cached_read(
+        (_storage.table_key(data_type), None),
+        lambda: _storage.version(data_type),
+        lambda: _storage.read(data_type)
+    )
+
+def _read_partition(data_type, organization_id):
+    """Read one organization's partition of a data type (None for rows without an organization)"""
+    try:
+        return _cached_read(
+            (_storage.table_key(data_type), partition_name(organization_id)),
+            lambda: _storage.partition_version(data_type, organization_id),
+            lambda: _storage.read_partition(data_type, organization_id)
+        )
+    except FileNotFoundError:
+        return _empty_frame(data_type)
+
+def _write_partition(data_type, organization_id, df):
+    """Replace one organization's partition of a data type"""
+    _storage.write_partition(data_type, organization_id, df)
+    invalidate_cache(data_type)
+
+def _load_table(data_type):
+    """Load a whole table as stored, without the names of referenced items"""
+    try:
+        return _read_table(data_type)
+    except FileNotFoundError:
+        # Return empty DataFrame with the correct structure
+        return _empty_frame(data_type)
+
+def _current_table(data_type):
+    """Get the cached frame of a whole table if it is still current, without reading it"""
+    with _table_cache_lock:
+        cached = _table_cache.get((_storage.table_key(data_type), None))
+    if cached is None:
+        return None
+    try:
+        version = _storage.version(data_type)
+    except FileNotFoundError:
+        return None
+    return cached[1] if cached[0] == version else None
+
+def _query_table(data_type, columns=None, filters=None):
+    """Load some columns of the rows of a table matching a filter, without names
+    
+    A current cached copy of the whole table is projected and filtered in
+    memory; otherwise the backend reads only the requested columns and rows.
+    """
+    cached = _current_table(data_type)
+    if cached is not None:
+        df = cached[match_rows(cached, filters)] if filters else cached
+        return df.loc[:, [col for col in (df.columns if columns is None else columns) if col in df.columns]].copy()
+    try:
+        return _storage.query(data_type, columns, filters)
+    except FileNotFoundError:
+        df = _empty_frame(data_type)
+        return df[[col for col in (df.columns if columns is None else columns) if col in df.columns]]
+
+def load_data(data_type, columns=None, filters=None):
+    """Load data from storage
+    
+    Frames referencing framework items by ID (see REFERENCE_COLUMNS) also get
+    the names of those items.
+    
+    Args:
+        data_type: Type of data to load (employees, competencies, assessments, etc.)
+        columns: Optional list of the columns to load. Name columns (e.g.
+            "competency") are loaded through their ID columns, which are kept.
+        filters: Optional {column: value} filter applied while reading, e.g.
+            {"employee_id": [1, 2], "assessment_type": "self"}. List values
+            match any of their members and None matches missing values. An
+            organization_id filter only reads the matching partitions.
+        
+    Returns:
+        DataFrame of the matching rows
+    """
     if data_type not in DATA_FILES:
         raise ValueError(f"Unknown data type: {data_type}")
     
-    file_path = DATA_FILES[data_type]
+    if columns is None and not filters:
+        return _with_names(data_type, _load_table(data_type))
     
+    return _with_names(data_type, _query_table(data_type, _stored_columns(data_type, columns, filters), filters))
+
+def load_data_chunks(data_type, columns=None, filters=None, chunk_rows=None):
+    """Load the rows of a table in chunks, for exports too large to hold in memory
+    
+    Args:
+        data_type: Type of data to load
+        columns: Optional list of the columns to load, as for load_data
+        filters: Optional {column: value} filter applied while reading, as for load_data
+        chunk_rows: Optional number of rows read at a time (default: the backend's chunk_rows)
+        
+    Yields:
+        DataFrames of the matching rows, with the names of referenced items
+    """
+    if data_type not in DATA_FILES:
+        raise ValueError(f"Unknown data type: {data_type}")
+    
+    columns = _stored_columns(data_type, columns, filters)
     try:
-        return pd.read_csv(file_path)
+        chunks = _storage.iter_query(data_type, columns, filters, chunk_rows)
+        for chunk in chunks:
+            yield _with_names(data_type, chunk)
     except FileNotFoundError:
-        # Return empty DataFrame with the correct structure
-        if data_type == "users":
-            return pd.DataFrame(columns=["username", "password", "role", "name", "email"])
-        elif data_type == "employees":
-            return pd.DataFrame(columns=["employee_id", "name", "email", "job_title", "job_level", "department", "manager_id", "organization_id", "hire_date"])
-        elif data_type == "competencies":
-            return pd.DataFrame(columns=["competency_id", "name", "description", "organization_id"])
-        elif data_type == "skills":
-            return pd.DataFrame(columns=["skill_id", "competency_id", "name", "description"])
-        elif data_type == "levels":
-            return pd.DataFrame(columns=["level_id", "name", "description", "organization_id"])
-        elif data_type == "expectations":
-            return pd.DataFrame(columns=["job_level", "competency", "skill", "expected_score"])
-        elif data_type == "comp_expectations":
-            return pd.DataFrame(columns=["job_level", "competency", "expected_score"])
-        elif data_type == "assessments" or data_type == "skill_assessments":
-            return pd.DataFrame(columns=["assessment_id", "employee_id", "competency", "skill", "score", "assessment_type", "assessment_date", "notes", "organization_id"])
-        elif data_type == "comp_assessments":
-            return pd.DataFrame(columns=["assessment_id", "employee_id", "competency", "score", "assessment_type", "assessment_date", "notes", "organization_id"])
-        elif data_type == "organizations":
-            return pd.DataFrame(columns=["organization_id", "name", "created_by", "created_at"])
-        else:
-            return pd.DataFrame()
+        return
+
+def _stored_columns(data_type, columns, filters):
+    """Map the columns requested from load_data to the stored columns to read
+    
+    Names aren't stored, so they are read through the ID columns they are
+    looked up from, and can't be filtered on.
+    """
+    id_columns = {name_column: id_column for id_column, (name_column, _) in REFERENCE_COLUMNS.get(data_type, {}).items()}
+    for column in filters or {}:
+        if column in id_columns:
+            raise ValueError(f"Filter {data_type} by {id_columns[column]} instead of {column}")
+    if columns is None:
+        return None
+    return list(dict.fromkeys(id_columns.get(column, column) for column in columns))
 
 def load_data_for_organization(data_type, organization_id):
-    """Load data from a CSV file filtered by organization_id
+    """Load the records of one organization
+    
+    Only the organization's own partition is read, so the cost doesn't depend
+    on how many other organizations share the deployment.
     
     Args:
         data_type: Type of data to load (employees, competencies, levels, skills, assessments, etc.)
@@ -79,95 +405,705 @@ def load_data_for_organization(data_type, organization_id):
     Returns:
         DataFrame containing only records for the specified organization
     """
-    df = load_data(data_type)
-    
     # Skip filtering for users and organizations
-    if data_type in ["users", "organizations"]:
-        return df
+    if data_type not in PARTITIONED_TYPES:
+        return load_data(data_type)
     
-    # Check if empty dataframe
-    if df.empty:
-        return df
+    if data_type not in DATA_FILES:
+        raise ValueError(f"Unknown data type: {data_type}")
     
-    # Handle special case for skills - they need to be filtered by their competency's organization
-    if data_type == "skills" and "organization_id" not in df.columns:
-        # Ensure organization_id is in the competencies table
-        competencies_df = load_data("competencies")
-        if "organization_id" not in competencies_df.columns:
-            update_csv_structure("competencies", {"organization_id": None})
-            competencies_df = load_data("competencies")
-        
-        # Filter competencies by organization
-        if not competencies_df.empty and "organization_id" in competencies_df.columns:
-            org_competencies = competencies_df[
-                (competencies_df["organization_id"] == organization_id) | 
-                (competencies_df["organization_id"].isna())
-            ]
-            
-            # Then filter skills by those competencies
-            if not org_competencies.empty:
-                return df[df["competency_id"].isin(org_competencies["competency_id"])]
-    
-    # For all other data types, ensure organization_id column exists
-    if "organization_id" not in df.columns:
-        # Update the schema to include organization_id
-        update_csv_structure(data_type, {"organization_id": None})
-        df = load_data(data_type)
-        if "organization_id" not in df.columns:
-            return pd.DataFrame()  # Return empty dataframe if we can't add the column
-    
-    # Ensure organization_id in dataframe is numeric and compare with numeric organization_id parameter
-    # Handle different potential data types in the CSV file
-    if not df.empty and "organization_id" in df.columns:
-        try:
-            # Convert to numeric, but keep NaN values where conversion fails
-            df["organization_id"] = pd.to_numeric(df["organization_id"], errors='coerce')
-            
-            # Handle potential float strings like '1.0' for organization_id parameter
-            org_id_int = None
-            if isinstance(organization_id, str) and '.' in organization_id:
-                org_id_int = int(float(organization_id))
-            elif isinstance(organization_id, float):
-                org_id_int = int(organization_id)
-            else:
-                # Try direct conversion to int
-                try:
-                    org_id_int = int(organization_id)
-                except (ValueError, TypeError):
-                    # If conversion fails, use string comparison below
-                    pass
-            
-            if org_id_int is not None:
-                # Filter by organization ID as integer, including records where organization_id is NULL/None when needed
-                return df[(df["organization_id"] == org_id_int) | 
-                        (df["organization_id"].isna() & (data_type in ["expectations", "comp_expectations"]))]
-            else:
-                # Fall back to string comparison
-                print(f"Warning: Data type conversion issue in organization filtering for {data_type}")
-                return df[(df["organization_id"].astype(str) == str(organization_id)) | 
-                        (df["organization_id"].isna() & (data_type in ["expectations", "comp_expectations"]))]
-        except Exception as e:
-            # If any conversion fails, fall back to string comparison
-            print(f"Warning: Data type conversion error in organization filtering for {data_type}: {str(e)}")
-            return df[(df["organization_id"].astype(str) == str(organization_id)) | 
-                    (df["organization_id"].isna() & (data_type in ["expectations", "comp_expectations"]))]
+    if organization_id is None:
+        df = _empty_frame(data_type)
+    else:
+        df = _read_partition(data_type, organization_id)
+    
+    # Expectations without an organization are shared by every organization
+    if data_type in ["expectations", "comp_expectations"]:
+        shared = _read_partition(data_type, None)
+        if not shared.empty:
+            df = shared if df.empty else pd.concat([df, shared], ignore_index=True)
+    
+    # Skills without an organization belong to their competency's organization
+    elif data_type == "skills" and organization_id is not None:
+        unassigned = _read_partition("skills", None)
+        if not unassigned.empty:
+            org_competencies = _read_partition("competencies", organization_id)
+            unassigned = unassigned[unassigned["competency_id"].isin(org_competencies["competency_id"])]
+            if not unassigned.empty:
+                df = unassigned if df.empty else pd.concat([df, unassigned], ignore_index=True)
+    
+    # Combining partitions drops categories that differ between them
+    return _with_names(data_type, apply_schema(df, TABLE_SCHEMAS.get(data_type)))
+
+# Name dictionaries
+
+def _names(data_type):
+    """Map the IDs of a framework data type (competencies, skills or levels) to their names
+    
+    The dictionary is cached like a table and rebuilt when the table changes.
+    """
+    id_column = ID_COLUMNS[data_type]
+    
+    def read():
+        df = _storage.read(data_type)
+        return df.dropna(subset=[id_column]).drop_duplicates(id_column).set_index(id_column)["name"]
+    
+    try:
+        return _cached_read((_storage.table_key(data_type), "names"), lambda: _storage.version(data_type), read)
+    except FileNotFoundError:
+        return pd.Series(dtype=object)
+
+def _with_names(data_type, df):
+    """Add the names of the framework items a frame references next to their IDs
+    
+    The frame is modified in place and returned.
+    """
+    for id_column, (name_column, source_type) in REFERENCE_COLUMNS.get(data_type, {}).items():
+        if id_column not in df.columns:
+            continue
+        names = df[id_column].map(_names(source_type)).astype("category")
+        if name_column in df.columns:
+            df[name_column] = names
+        else:
+            df.insert(df.columns.get_loc(id_column) + 1, name_column, names)
+    return df
+
+def _with_ids(data_type, df):
+    """Fill in the missing reference IDs of a frame from the names it carries
+    
+    Competencies and job levels are looked up by name within the row's
+    organization and skills within their competency. Rows without one match
+    the first item with that name; rows with one fall back to items without.
+    
+    Returns:
+        Copy of the frame with the ID columns filled in where a name was found
+    """
+    df = df.copy()
+    for id_column, (name_column, source_type) in REFERENCE_COLUMNS.get(data_type, {}).items():
+        if name_column not in df.columns:
+            continue
+        if id_column not in df.columns:
+            df[id_column] = pd.Series(pd.NA, index=df.index, dtype="Int64")
+        missing = df[id_column].isna() & df[name_column].notna()
+        scope = "competency_id" if source_type == "skills" else "organization_id"
+        if not missing.any() or scope not in df.columns:
+            continue
+        
+        items = _load_table(source_type)[[id_column, "name", scope]].sort_values(id_column)
+        items["name"] = items["name"].astype(object)
+        rows = df.loc[missing, [name_column, scope]].astype({name_column: object, scope: "Int64"})
+        
+        # Match the name within the row's scope first
+        exact = rows.reset_index().merge(
+            items.drop_duplicates(["name", scope]).rename(columns={"name": name_column}),
+            on=[name_column, scope], how="left"
+        ).set_index("index")[id_column]
+        
+        first_any = items.drop_duplicates("name").set_index("name")[id_column]
+        first_shared = items[items[scope].isna()].drop_duplicates("name").set_index("name")[id_column]
+        fallback = rows[name_column].map(first_any).where(rows[scope].isna(), rows[name_column].map(first_shared))
+        df.loc[missing, id_column] = exact.fillna(fallback).astype("Int64")
     return df
 
+def _without_names(data_type, df):
+    """Drop the name columns added by _with_names, first filling in missing IDs from them"""
+    name_columns = [name for name, _ in REFERENCE_COLUMNS.get(data_type, {}).values() if name in df.columns]
+    if not name_columns:
+        return df
+    return _with_ids(data_type, df).drop(columns=name_columns)
+
+def _framework_ids(organization_id, **names):
+    """Look up framework items by name, e.g. job_level="Senior", competency="Testing"
+    
+    Returns:
+        Dictionary mapping the ID column of each named item (level_id,
+        competency_id, skill_id) to its ID, or None if an item wasn't found
+    """
+    id_columns = {name: id_column for id_column, (name, _) in REFERENCE_COLUMNS["expectations"].items()}
+    row = pd.DataFrame({name: [value] for name, value in names.items()})
+    row["organization_id"] = pd.array([organization_id], dtype="Int64")
+    row = _with_ids("expectations", row).iloc[0]
+    
+    ids = {id_columns[name]: row[id_columns[name]] for name in names}
+    if any(pd.isna(value) for value in ids.values()):
+        return None
+    return {col: int(value) for col, value in ids.items()}
+
+def _write_table(data_type, df):
+    """Replace the whole table of a data type in storage"""
+    _storage.write(data_type, df)
+    
+    # The table changed, so the cached copy is stale
+    invalidate_cache(data_type)
+
+@contextmanager
+def transaction():
+    """Group the writes made to several tables into one atomic commit
+    
+    Example:
+        with transaction():
+            _update_rows("levels", {"level_id": 2}, {"name": "Senior"})
+            _update_rows("employees", {"job_level": "Mid"}, {"job_level": "Senior"})
+    
+    Reads inside the block see its writes, other threads and processes only
+    see them once the block exits. If the block raises, none of its writes are
+    stored. Nested transactions join the outer one.
+    """
+    try:
+        with _storage.transaction():
+            yield
+    except BaseException:
+        # Frames cached inside the block may hold writes that were rolled back
+        invalidate_cache()
+        raise
+
 def save_data(data_type, df):
-    """Save data to a CSV file"""
+    """Save data to storage, replacing the whole table"""
     if data_type not in DATA_FILES:
         raise ValueError(f"Unknown data type: {data_type}")
     
-    file_path = DATA_FILES[data_type]
-    df.to_csv(file_path, index=False)
+    # Only the IDs of referenced items are stored
+    _write_table(data_type, _without_names(data_type, df))
+    
+    # A full rewrite can change any key, so rebuild the latest scores from scratch
+    if data_type in LATEST_TABLES:
+        rebuild_latest_scores(data_type)
     return True
 
+def _match_mask(df, where):
+    """Build a boolean mask for the rows of df matching a {column: value} filter
+    
+    List, tuple and set values match any of their members.
+    """
+    mask = pd.Series(True, index=df.index)
+    for col, value in where.items():
+        if isinstance(value, (list, tuple, set)):
+            mask &= df[col].isin(value)
+        else:
+            # Missing values in nullable columns never match
+            mask &= (df[col] == value).fillna(False).astype(bool)
+    return mask
+
+def _find_rows(data_type, where):
+    """Get the rows of a data type matching a {column: value} filter"""
+    if _storage.supports_row_writes:
+        try:
+            return _storage.select(data_type, where)
+        except FileNotFoundError:
+            return _load_table(data_type)
+    
+    # A filter on a single organization only needs that organization's partition
+    organization_id = where.get("organization_id", [])
+    if data_type in PARTITIONED_TYPES and not isinstance(organization_id, (list, tuple, set)):
+        df = _read_partition(data_type, organization_id)
+    else:
+        df = _load_table(data_type)
+    if df.empty or any(col not in df.columns for col in where):
+        return df.iloc[0:0]
+    return df[_match_mask(df, where)]
+
+def _new_versions(data_type, rows):
+    """Give new rows of a versioned data type their first version"""
+    if data_type not in VERSIONED_TYPES:
+        return rows
+    rows = rows.copy()
+    rows["version"] = rows["version"].fillna(1) if "version" in rows.columns else 1
+    return rows
+
+def _append_rows(data_type, rows):
+    """Add new rows to a data type, assigning their IDs from the storage backend
+    
+    The rows are appended without rewriting the existing table, and IDs are
+    assigned under the backend's write lock so concurrent writers never reuse one.
+    
+    Returns:
+        List of the IDs assigned to the new rows
+    """
+    rows = _new_versions(data_type, rows)
+    ids = _storage.append(data_type, rows, ID_COLUMNS[data_type])
+    invalidate_cache(data_type)
+    
+    if data_type in LATEST_TABLES:
+        rows = rows.copy()
+        rows[ID_COLUMNS[data_type]] = ids
+        _merge_latest(data_type, rows)
+    return ids
+
+def _stored_parts(data_type, where=None, whole=False):
+    """Yield (frame, save) pairs covering the stored rows of a data type that may match a filter
+    
+    Partitioned tables give one pair per organization partition, or only the
+    partitions of the organizations named by the filter's organization_id, so a
+    read-modify-write only rewrites the partitions it touches. With whole=True
+    (or for other tables) the whole table is a single pair.
+    
+    Callers hold the data type's write lock while iterating, so no other writer
+    can change the rows between reading and saving them.
+    """
+    if whole or data_type not in PARTITIONED_TYPES:
+        yield _load_table(data_type), lambda df: _write_table(data_type, df)
+        return
+    
+    if "organization_id" not in (where or {}):
+        names = _storage.partitions(data_type)
+    elif isinstance(where["organization_id"], (list, tuple, set)):
+        names = sorted({partition_name(organization_id) for organization_id in where["organization_id"]})
+    else:
+        names = [partition_name(where["organization_id"])]
+    for name in names:
+        yield _read_partition(data_type, name), lambda df, name=name: _write_partition(data_type, name, df)
+
+def _insert_rows(data_type, rows):
+    """Add new rows to a data type
+    
+    Backends with row-level writes insert the rows directly; otherwise the
+    table (or the organization partitions receiving rows) is loaded, extended
+    and saved.
+    """
+    rows = _new_versions(data_type, rows)
+    if _storage.supports_row_writes:
+        _storage.insert(data_type, rows)
+        invalidate_cache(data_type)
+    elif data_type in PARTITIONED_TYPES:
+        names = rows["organization_id"].map(partition_name) if "organization_id" in rows.columns else pd.Series("", index=rows.index)
+        with _storage.lock(data_type):
+            for name, group in rows.groupby(names, sort=False):
+                df = _read_partition(data_type, name)
+                _write_partition(data_type, name, pd.concat([df, group], ignore_index=True))
+    else:
+        with _storage.lock(data_type):
+            df = _load_table(data_type)
+            df = pd.concat([df, rows], ignore_index=True)
+            _write_table(data_type, df)
+    
+    if data_type in LATEST_TABLES:
+        _merge_latest(data_type, rows)
+
+class ConflictError(Exception):
+    """Raised when an update was based on a row that has changed since it was read
+    
+    Nothing was written. The caller can reload the row and retry.
+    """
+
+def _update_rows(data_type, where, values, expected_version=None):
+    """Set column values on the rows of a data type matching a filter
+    
+    Rows of versioned data types get their version bumped. With
+    expected_version, only a row still at that version is updated
+    (compare-and-set), so concurrent edits of the same row can't overwrite
+    each other while edits of different rows don't wait for each other.
+    
+    Args:
+        data_type: Data type to update
+        where: {column: value} filter selecting the rows
+        values: {column: value} of the columns to set
+        expected_version: Optional version the rows were read at
+        
+    Returns:
+        Number of rows updated
+        
+    Raises:
+        ConflictError: If a matching row exists but its version moved on
+    """
+    versioned = data_type in VERSIONED_TYPES
+    match = where
+    if pd.notna(expected_version):
+        match = {**where, "version": int(expected_version)}
+    
+    if _storage.supports_row_writes:
+        count = _storage.update(data_type, match, values, increment=["version"] if versioned else ())
+        invalidate_cache(data_type)
+    else:
+        # Moving rows to another organization rewrites the whole table
+        count = 0
+        with _storage.lock(data_type):
+            for df, save in _stored_parts(data_type, where, whole="organization_id" in values):
+                if df.empty or any(col not in df.columns for col in match):
+                    continue
+                mask = _match_mask(df, match)
+                if not mask.any():
+                    continue
+                for col, value in values.items():
+                    # A categorical column has to know a label before it can hold it
+                    if (col in df.columns and isinstance(df[col].dtype, pd.CategoricalDtype)
+                            and pd.notna(value) and value not in df[col].cat.categories):
+                        df[col] = df[col].cat.add_categories([value])
+                    df.loc[mask, col] = value
+                if versioned:
+                    if "version" not in df.columns:
+                        df["version"] = pd.Series(pd.NA, index=df.index, dtype="Int64")
+                    df.loc[mask, "version"] = df.loc[mask, "version"].fillna(0) + 1
+                save(df)
+                count += int(mask.sum())
+    
+    # No row at the expected version: tell a stale read from a missing row
+    if not count and match is not where and not _find_rows(data_type, where).empty:
+        raise ConflictError(f"Someone else changed this record ({data_type}) since it was loaded. Reload it and try again.")
+    
+    if count and data_type in LATEST_TABLES:
+        _update_latest(data_type, where, values)
+    return count
+
+def _delete_rows(data_type, where):
+    """Delete the rows of a data type matching a filter
+    
+    Returns:
+        Number of rows deleted
+    """
+    # Remember which assessments go, so their keys can get a new latest score
+    removed_ids = None
+    if data_type in LATEST_TABLES:
+        removed_ids = _find_rows(data_type, where)[ID_COLUMNS[data_type]].tolist()
+    
+    if _storage.supports_row_writes:
+        count = _storage.delete(data_type, where)
+        invalidate_cache(data_type)
+    else:
+        count = 0
+        with _storage.lock(data_type):
+            for df, save in _stored_parts(data_type, where):
+                if df.empty or any(col not in df.columns for col in where):
+                    continue
+                mask = _match_mask(df, where)
+                if not mask.any():
+                    continue
+                save(df[~mask])
+                count += int(mask.sum())
+    
+    if count and removed_ids:
+        _refresh_latest(data_type, removed_ids)
+    return count
+
+# Latest scores tables
+
+def _keep_latest(df, key_columns):
+    """Keep the most recent row of every key, by assessment date then ID"""
+    sort_columns = ["assessment_date"] + (["assessment_id"] if "assessment_id" in df.columns else [])
+    ordered = df.sort_values(
+        sort_columns,
+        key=lambda col: pd.to_datetime(col) if col.name == "assessment_date" else col
+    )
+    return ordered.drop_duplicates(key_columns, keep="last")
+
+def _key_filter(rows):
+    """Build a filter matching at least every key of the given assessment rows"""
+    where = {}
+    for col in ["employee_id", "competency_id", "skill_id", "assessment_type"]:
+        if col in rows.columns:
+            where[col] = rows[col].dropna().unique().tolist()
+    return where
+
+def rebuild_latest_scores(data_type=None):
+    """Rebuild the latest scores tables from the full assessment history
+    
+    Args:
+        data_type: Optional assessment data type to rebuild. If None, every latest scores table is rebuilt.
+        
+    Returns:
+        Dict mapping each rebuilt latest data type to its number of rows
+    """
+    data_types = [data_type] if data_type is not None else ["assessments", "comp_assessments"]
+    
+    counts = {}
+    for source_type in data_types:
+        latest_type, key_columns = LATEST_TABLES[source_type]
+        history = _load_table(source_type)
+        if history.empty:
+            latest = _empty_frame(latest_type)
+        else:
+            latest = _keep_latest(history, key_columns)
+        _write_table(latest_type, latest)
+        counts[latest_type] = len(latest)
+    return counts
+
+def _ensure_latest(data_type):
+    """Build the latest scores table of an assessment data type if it was never built
+    
+    Returns:
+        True if the table was (re)built from the history
+    """
+    latest_type = LATEST_TABLES[data_type][0]
+    if _load_table(latest_type).empty and not _load_table(data_type).empty:
+        rebuild_latest_scores(data_type)
+        return True
+    return False
+
+def _sync_latest(data_type, current, candidates, dropped_ids=()):
+    """Make the latest scores rows of some keys match their most recent assessment
+    
+    Args:
+        data_type: Assessment data type
+        current: Rows of the latest scores table covering the affected keys
+        candidates: Assessments that may now be the latest of their key
+        dropped_ids: IDs of assessments that no longer exist
+    """
+    latest_type, key_columns = LATEST_TABLES[data_type]
+    id_column = ID_COLUMNS[data_type]
+    
+    frames = [df for df in (current, candidates) if not df.empty]
+    pool = pd.concat(frames, ignore_index=True).drop_duplicates(id_column) if frames else current
+    pool = pool[~pool[id_column].isin(list(dropped_ids))]
+    winners = _keep_latest(pool, key_columns) if not pool.empty else pool
+    
+    stale_ids = current.loc[~current[id_column].isin(winners[id_column]), id_column].tolist()
+    new_rows = winners[~winners[id_column].isin(current[id_column])]
+    stamp = _cube_stamp(latest_type)
+    if stale_ids:
+        _delete_rows(latest_type, {id_column: stale_ids})
+    if not new_rows.empty:
+        _insert_rows(latest_type, new_rows)
+    _update_cube(data_type, stamp, stale_ids, new_rows)
+
+def _merge_latest(data_type, rows):
+    """Update the latest scores table after assessments were added"""
+    if _ensure_latest(data_type):
+        return
+    current = _find_rows(LATEST_TABLES[data_type][0], _key_filter(rows))
+    _sync_latest(data_type, current, rows)
+
+def _update_latest(data_type, where, values):
+    """Apply an update of assessments to their copies in the latest scores table"""
+    if _ensure_latest(data_type):
+        return
+    latest_type, key_columns = LATEST_TABLES[data_type]
+    id_column = ID_COLUMNS[data_type]
+    stamp = _cube_stamp(latest_type)
+    updated_ids = _find_rows(latest_type, where)[id_column].tolist()
+    _update_rows(latest_type, where, values)
+    _update_cube(data_type, stamp, [], _find_rows(latest_type, {id_column: updated_ids}))
+    
+    # Changing dates or key columns (e.g. renaming a skill) can make another
+    # assessment the latest, or merge two keys into one
+    if "assessment_date" in values or any(col in key_columns for col in values):
+        changed = _find_rows(data_type, where if "assessment_date" in values else
+                             {col: value for col, value in values.items() if col in key_columns})
+        if not changed.empty:
+            current = _find_rows(latest_type, _key_filter(changed))
+            candidates = _find_rows(data_type, _key_filter(changed))
+            _sync_latest(data_type, current, candidates)
+
+def _refresh_latest(data_type, removed_ids):
+    """Update the latest scores table after assessments were deleted"""
+    if _ensure_latest(data_type):
+        return
+    latest_type = LATEST_TABLES[data_type][0]
+    id_column = ID_COLUMNS[data_type]
+    
+    # Deleting an assessment that wasn't the latest of its key changes nothing
+    stale = _find_rows(latest_type, {id_column: removed_ids})
+    if stale.empty:
+        return
+    
+    current = _find_rows(latest_type, _key_filter(stale))
+    candidates = _find_rows(data_type, _key_filter(stale))
+    _sync_latest(data_type, current, candidates, dropped_ids=removed_ids)
+
+def _latest_rows(data_type, where=None):
+    """Read rows of the latest scores table of an assessment data type"""
+    latest_type = LATEST_TABLES[data_type][0]
+    if where is None:
+        return _load_table(latest_type)
+    return _find_rows(latest_type, where)
+
+# Analytics cube
+
+# Define the dimensions of the analytics cube of each latest scores table.
+# Department, job level and manager come from the employee the score is about.
+CUBE_DIMENSIONS = {
+    "latest_assessments": ["organization_id", "department", "job_level", "manager_id", "competency_id", "skill_id", "assessment_type"],
+    "latest_comp_assessments": ["organization_id", "department", "job_level", "manager_id", "competency_id", "assessment_type"]
+}
+
+_EMPLOYEE_DIMENSIONS = ["department", "job_level", "manager_id"]
+
+def _cube_value(value):
+    """Normalize a dimension value so equal values make equal cell keys"""
+    if pd.isna(value):
+        return None
+    if isinstance(value, float) and value.is_integer():
+        return int(value)
+    return value.item() if hasattr(value, "item") else value
+
+class AnalyticsCube:
+    """Count, sum, sum of squares, min and max of the latest scores per cell
+    
+    A cell is one combination of the cube's dimensions. Scores are added and
+    removed one assessment at a time, so keeping the cube current costs as
+    much as the change, and any rollup only reads the cells. The cube is not
+    thread-safe; the module functions using it hold _cube_lock.
+    """
+    
+    def __init__(self, latest, employees, dimensions):
+        self.dimensions = dimensions
+        self._employees = {
+            _cube_value(employee_id): tuple(_cube_value(value) for value in values)
+            for employee_id, *values in employees.drop_duplicates("employee_id")[["employee_id"] + _EMPLOYEE_DIMENSIONS].itertuples(index=False)
+        }
+        self._cells = {}
+        self._members = {}
+        self._cell_of = {}
+        self._frame = None
+        self.add(latest)
+    
+    def _cell_key(self, row):
+        employee = self._employees.get(_cube_value(row["employee_id"]), (None,) * len(_EMPLOYEE_DIMENSIONS))
+        values = dict(zip(_EMPLOYEE_DIMENSIONS, employee))
+        return tuple(values[dim] if dim in values else _cube_value(row[dim]) for dim in self.dimensions)
+    
+    def add(self, rows):
+        """Add the scores of latest scores rows, replacing rows already in the cube"""
+        self.remove(rows["assessment_id"])
+        for row in rows.dropna(subset=["score"]).to_dict("records"):
+            assessment_id = _cube_value(row["assessment_id"])
+            score = float(row["score"])
+            key = self._cell_key(row)
+            self._cell_of[assessment_id] = key
+            self._members.setdefault(key, {})[assessment_id] = score
+            cell = self._cells.get(key)
+            if cell is None:
+                self._cells[key] = [1, score, score * score, score, score]
+            else:
+                cell[0] += 1
+                cell[1] += score
+                cell[2] += score * score
+                cell[3] = min(cell[3], score)
+                cell[4] = max(cell[4], score)
+        self._frame = None
+    
+    def remove(self, assessment_ids):
+        """Remove the scores of the given assessments from the cube"""
+        for assessment_id in assessment_ids:
+            key = self._cell_of.pop(_cube_value(assessment_id), None)
+            if key is None:
+                continue
+            members = self._members[key]
+            score = members.pop(_cube_value(assessment_id))
+            if not members:
+                del self._members[key]
+                del self._cells[key]
+                continue
+            cell = self._cells[key]
+            cell[0] -= 1
+            cell[1] -= score
+            cell[2] -= score * score
+            
+            # Min and max can't be taken back, so they are recomputed from the
+            # cell's own scores when the removed one was one of them
+            if score <= cell[3] or score >= cell[4]:
+                cell[3] = min(members.values())
+                cell[4] = max(members.values())
+            self._frame = None
+    
+    def frame(self):
+        """Get the cells as a frame of the dimensions plus count, sum, sumsq, min and max"""
+        if self._frame is None:
+            self._frame = pd.DataFrame(
+                [key + tuple(cell) for key, cell in self._cells.items()],
+                columns=self.dimensions + ["count", "sum", "sumsq", "min", "max"]
+            )
+        return self._frame
+    
+    def rollup(self, dimensions=(), **filters):
+        """Aggregate the cells by a subset of the dimensions
+        
+        Args:
+            dimensions: Dimensions to group by (none for a single total row)
+            **filters: {dimension: value or list of values} the cells must match
+        
+        Returns:
+            DataFrame with the dimensions plus count, sum, sumsq, min, max,
+            mean and std (population standard deviation)
+        """
+        df = self.frame()
+        for dim, value in filters.items():
+            if value is None:
+                df = df[df[dim].isna()]
+            elif isinstance(value, (list, tuple, set, pd.Series, pd.Index)):
+                # A None in the list matches the cells without a value
+                values = [_cube_value(v) for v in value]
+                df = df[df[dim].isin([v for v in values if v is not None]) | (df[dim].isna() & (None in values))]
+            else:
+                df = df[df[dim] == _cube_value(value)]
+        
+        aggregations = {"count": "sum", "sum": "sum", "sumsq": "sum", "min": "min", "max": "max"}
+        dimensions = list(dimensions)
+        if dimensions:
+            result = df.groupby(dimensions, dropna=False, sort=True).agg(aggregations).reset_index()
+        else:
+            result = df.agg(aggregations).to_frame().T if not df.empty else pd.DataFrame(columns=list(aggregations))
+        result = result.astype({"count": int, "sum": float, "sumsq": float, "min": float, "max": float})
+        result["mean"] = result["sum"] / result["count"]
+        result["std"] = (result["sumsq"] / result["count"] - result["mean"] ** 2).clip(lower=0) ** 0.5
+        return result
+
+# Process-wide cache of analytics cubes, keyed by latest scores data type. Each
+# entry is ((latest table version, employees version), cube). Writes of the
+# latest scores in this process update a current cube in place; a cube that
+# missed a change (e.g. an employee moved department) is rebuilt on next use.
+_cubes = {}
+_cube_lock = threading.Lock()
+
+def _cube_stamp(latest_type):
+    return (_storage.version(latest_type), _storage.version("employees"))
+
+def _analytics_cube(data_type):
+    """Get the current analytics cube of an assessment data type (call with _cube_lock held)"""
+    latest_type = LATEST_TABLES[data_type][0]
+    stamp = _cube_stamp(latest_type)
+    cached = _cubes.get(latest_type)
+    if cached is not None and cached[0] == stamp:
+        return cached[1]
+    
+    cube = AnalyticsCube(_latest_rows(data_type), _load_table("employees"), CUBE_DIMENSIONS[latest_type])
+    # Only cache the cube if nothing changed while it was built
+    if _cube_stamp(latest_type) == stamp:
+        _cubes[latest_type] = (stamp, cube)
+    return cube
+
+def _update_cube(data_type, stamp, removed_ids, added):
+    """Apply a change of the latest scores table to its cached cube
+    
+    Args:
+        data_type: Assessment data type
+        stamp: _cube_stamp taken before the change
+        removed_ids: IDs of assessments no longer among the latest scores
+        added: Latest scores rows that were added or changed
+    """
+    latest_type = LATEST_TABLES[data_type][0]
+    with _cube_lock:
+        cached = _cubes.get(latest_type)
+        if cached is None or cached[0] != stamp:
+            return
+        cube = cached[1]
+        cube.remove(removed_ids)
+        cube.add(added)
+        _cubes[latest_type] = (_cube_stamp(latest_type), cube)
+
+def get_score_rollup(dimensions=(), data_type="assessments", **filters):
+    """Aggregate the latest scores by any subset of the analytics cube dimensions
+    
+    This reads the pre-aggregated cube instead of scanning the assessments.
+    
+    Args:
+        dimensions: Dimensions in CUBE_DIMENSIONS to group by, e.g. ["competency_id"]
+        data_type: "assessments" for skill scores or "comp_assessments" for competency scores
+        **filters: {dimension: value or list of values}, e.g. organization_id=2, manager_id=[5, 7]
+    
+    Returns:
+        DataFrame with the dimensions plus count, sum, sumsq, min, max, mean
+        and std, and the names of grouped competencies and skills
+    """
+    try:
+        with _cube_lock:
+            result = _analytics_cube(data_type).rollup(dimensions, **filters)
+    except FileNotFoundError:
+        return pd.DataFrame()
+    return _with_names(data_type, result)
+
 def add_user(username, password, role, name, email):
     """Add a new user"""
-    users_df = load_data("users")
-    
     # Check if username already exists
-    if not users_df.empty and username in users_df["username"].values:
+    if not _find_rows("users", {"username": username}).empty:
         return False, "Username already exists"
     
     # Add new user
@@ -179,26 +1115,53 @@ def add_user(username, password, role, name, email):
         "email": [email]
     })
     
-    users_df = pd.concat([users_df, new_user], ignore_index=True)
-    save_data("users", users_df)
+    _insert_rows("users", new_user)
     return True, "User added successfully"
 
-def add_employee(name, email, job_title, job_level, department, manager_id, organization_id=None, hire_date=None):
-    """Add a new employee"""
-    employees_df = load_data("employees")
+def update_user(username, password=None, role=None, name=None, email=None, expected_version=None):
+    """Update a user's details
     
-    # Generate new employee ID
-    if employees_df.empty:
-        new_id = 1
-    else:
-        new_id = employees_df["employee_id"].max() + 1
+    Args:
+        username: Username of the user to update
+        password: Optional new password
+        role: Optional new role
+        name: Optional new full name
+        email: Optional new email
+        expected_version: Optional version of the user record the changes are based on
+        
+    Returns:
+        Tuple of (success, message)
+        
+    Raises:
+        ConflictError: If the user was changed since expected_version
+    """
+    if _find_rows("users", {"username": username}).empty:
+        return False, f"User {username} not found"
+    
+    changes = {}
+    if password is not None:
+        changes["password"] = password
+    
+    if role is not None:
+        changes["role"] = role
+    
+    if name is not None:
+        changes["name"] = name
+    
+    if email is not None:
+        changes["email"] = email
     
+    if changes:
+        _update_rows("users", {"username": username}, changes, expected_version)
+    return True, "User updated successfully"
+
+def add_employee(name, email, job_title, job_level, department, manager_id, organization_id=None, hire_date=None):
+    """Add a new employee"""
     # Add new employee
     if hire_date is None:
         hire_date = datetime.now().strftime("%Y-%m-%d")
     
     new_employee = pd.DataFrame({
-        "employee_id": [new_id],
         "name": [name],
         "email": [email],
         "job_title": [job_title],
@@ -209,158 +1172,141 @@ def add_employee(name, email, job_title, job_level, department, manager_id, orga
         "hire_date": [hire_date]
     })
     
-    employees_df = pd.concat([employees_df, new_employee], ignore_index=True)
-    save_data("employees", employees_df)
+    new_id = _append_rows("employees", new_employee)[0]
     return True, "Employee added successfully", new_id
 
 def add_competency(name, description="", organization_id=None):
     """Add a new competency"""
-    competencies_df = load_data("competencies")
-    
-    # Generate new competency ID
-    if competencies_df.empty:
-        new_id = 1
-    else:
-        new_id = competencies_df["competency_id"].max() + 1
-    
     # Add new competency
     new_competency = pd.DataFrame({
-        "competency_id": [new_id],
         "name": [name],
         "description": [description],
         "organization_id": [organization_id]
     })
     
-    competencies_df = pd.concat([competencies_df, new_competency], ignore_index=True)
-    save_data("competencies", competencies_df)
+    new_id = _append_rows("competencies", new_competency)[0]
     return True, "Competency added successfully", new_id
 
 def add_skill(competency_id, name, description=""):
     """Add a new skill to a competency"""
-    skills_df = load_data("skills")
-    competencies_df = load_data("competencies")
-    
     # Check if competency exists
-    if competencies_df.empty or competency_id not in competencies_df["competency_id"].values:
+    if _find_rows("competencies", {"competency_id": competency_id}).empty:
         return False, "Competency does not exist", None
     
-    # Generate new skill ID
-    if skills_df.empty:
-        new_id = 1
-    else:
-        new_id = skills_df["skill_id"].max() + 1
-    
     # Add new skill
     new_skill = pd.DataFrame({
-        "skill_id": [new_id],
         "competency_id": [competency_id],
         "name": [name],
         "description": [description]
     })
     
-    skills_df = pd.concat([skills_df, new_skill], ignore_index=True)
-    save_data("skills", skills_df)
+    new_id = _append_rows("skills", new_skill)[0]
     return True, "Skill added successfully", new_id
 
 def add_job_level(name, description="", organization_id=None):
     """Add a new job level"""
-    levels_df = load_data("levels")
-    
-    # Generate new level ID
-    if levels_df.empty:
-        new_id = 1
-    else:
-        new_id = levels_df["level_id"].max() + 1
-    
     # Add new level
     new_level = pd.DataFrame({
-        "level_id": [new_id],
         "name": [name],
         "description": [description],
         "organization_id": [organization_id]
     })
     
-    levels_df = pd.concat([levels_df, new_level], ignore_index=True)
-    save_data("levels", levels_df)
+    new_id = _append_rows("levels", new_level)[0]
     return True, "Job level added successfully", new_id
 
-def set_skill_expectation(job_level, competency, skill, expected_score):
-    """Set the expected score for a skill at a specific job level"""
-    expectations_df = load_data("expectations")
+def set_skill_expectation(job_level, competency, skill, expected_score, expected_version=None, organization_id=None):
+    """Set the expected score for a skill at a specific job level
+    
+    Args:
+        job_level: Name of the job level
+        competency: Name of the competency
+        skill: Name of the skill
+        expected_score: Expected score
+        expected_version: Optional version of the expectation the change is based on
+        organization_id: Organization the names belong to (defaults to the first match)
+        
+    Raises:
+        ConflictError: If the expectation was changed since expected_version
+    """
+    key = _framework_ids(organization_id, job_level=job_level, competency=competency, skill=skill)
+    if key is None:
+        return False, "Unknown job level, competency or skill"
     
     # Check if expectation already exists
-    existing = expectations_df[
-        (expectations_df["job_level"] == job_level) & 
-        (expectations_df["competency"] == competency) & 
-        (expectations_df["skill"] == skill)
-    ]
+    existing = _find_rows("expectations", key)
     
     if not existing.empty:
         # Update existing expectation
-        expectations_df.loc[existing.index, "expected_score"] = expected_score
+        _update_rows("expectations", key, {"expected_score": expected_score}, expected_version)
     else:
-        # Add new expectation
+        # Add new expectation, in its competency's organization
+        competency_org = _find_rows("competencies", {"competency_id": key["competency_id"]})["organization_id"]
         new_expectation = pd.DataFrame({
-            "job_level": [job_level],
-            "competency": [competency],
-            "skill": [skill],
-            "expected_score": [expected_score]
+            "level_id": [key["level_id"]],
+            "competency_id": [key["competency_id"]],
+            "skill_id": [key["skill_id"]],
+            "expected_score": [expected_score],
+            "organization_id": [competency_org.iloc[0] if not competency_org.empty else organization_id]
         })
-        expectations_df = pd.concat([expectations_df, new_expectation], ignore_index=True)
+        _insert_rows("expectations", new_expectation)
     
-    save_data("expectations", expectations_df)
     return True, "Skill expectation set successfully"
 
-def set_competency_expectation(job_level, competency, expected_score):
-    """Set the expected score for a competency at a specific job level"""
+def set_competency_expectation(job_level, competency, expected_score, expected_version=None, organization_id=None):
+    """Set the expected score for a competency at a specific job level
+    
+    Args:
+        job_level: Name of the job level
+        competency: Name of the competency
+        expected_score: Expected score
+        expected_version: Optional version of the expectation the change is based on
+        organization_id: Organization the names belong to (defaults to the first match)
+        
+    Raises:
+        ConflictError: If the expectation was changed since expected_version
+    """
     # Use a separate file for competency expectations
-    comp_expectations_df = load_data("comp_expectations")
+    key = _framework_ids(organization_id, job_level=job_level, competency=competency)
+    if key is None:
+        return False, "Unknown job level or competency"
     
     # Check if expectation already exists
-    existing = comp_expectations_df[
-        (comp_expectations_df["job_level"] == job_level) & 
-        (comp_expectations_df["competency"] == competency)
-    ]
+    existing = _find_rows("comp_expectations", key)
     
     if not existing.empty:
         # Update existing expectation
-        comp_expectations_df.loc[existing.index, "expected_score"] = expected_score
+        _update_rows("comp_expectations", key, {"expected_score": expected_score}, expected_version)
     else:
-        # Add new expectation
+        # Add new expectation, in its competency's organization
+        competency_org = _find_rows("competencies", {"competency_id": key["competency_id"]})["organization_id"]
         new_expectation = pd.DataFrame({
-            "job_level": [job_level],
-            "competency": [competency],
-            "expected_score": [expected_score]
+            "level_id": [key["level_id"]],
+            "competency_id": [key["competency_id"]],
+            "expected_score": [expected_score],
+            "organization_id": [competency_org.iloc[0] if not competency_org.empty else organization_id]
         })
-        comp_expectations_df = pd.concat([comp_expectations_df, new_expectation], ignore_index=True)
+        _insert_rows("comp_expectations", new_expectation)
     
-    save_data("comp_expectations", comp_expectations_df)
     return True, "Competency expectation set successfully"
 
 def add_assessment(employee_id, competency, skill, score, assessment_type, notes="", organization_id=None):
     """Add a new skill assessment"""
-    assessments_df = load_data("assessments")
-    
     # Get employee's organization if not provided
     if organization_id is None and employee_id is not None:
-        employees_df = load_data("employees")
-        if not employees_df.empty:
-            employee = employees_df[employees_df["employee_id"] == employee_id]
-            if not employee.empty and "organization_id" in employee.columns:
-                organization_id = employee.iloc[0].get("organization_id")
+        employee = _find_rows("employees", {"employee_id": employee_id})
+        if not employee.empty and "organization_id" in employee.columns:
+            organization_id = employee.iloc[0].get("organization_id")
     
-    # Generate new assessment ID
-    if assessments_df.empty:
-        new_id = 1
-    else:
-        new_id = assessments_df["assessment_id"].max() + 1
+    ids = _framework_ids(organization_id, competency=competency, skill=skill)
+    if ids is None:
+        return False, f"Unknown competency or skill: {competency} / {skill}", None
     
     # Add new assessment
     new_assessment = pd.DataFrame({
-        "assessment_id": [new_id],
         "employee_id": [employee_id],
-        "competency": [competency],
-        "skill": [skill],
+        "competency_id": [ids["competency_id"]],
+        "skill_id": [ids["skill_id"]],
         "score": [score],
         "assessment_type": [assessment_type],
         "assessment_date": [datetime.now().strftime("%Y-%m-%d")],
@@ -368,10 +1314,98 @@ def add_assessment(employee_id, competency, skill, score, assessment_type, notes
         "organization_id": [organization_id]
     })
     
-    assessments_df = pd.concat([assessments_df, new_assessment], ignore_index=True)
-    save_data("assessments", assessments_df)
+    new_id = _append_rows("assessments", new_assessment)[0]
     return True, "Assessment added successfully", new_id
 
+# Valid assessment types and score range for submitted assessments
+ASSESSMENT_TYPES = ["self", "manager"]
+SCORE_RANGE = (0, 5)
+
+def _build_assessment_rows(data_type, records, name_columns):
+    """Validate assessment records and turn them into rows ready to be stored
+    
+    The names of what is assessed are replaced by IDs, looked up within each
+    employee's organization.
+    
+    Args:
+        data_type: Assessment data type the rows are for
+        records: List of dicts with employee_id, the name columns, score, assessment_type
+                 and optionally notes and organization_id
+        name_columns: Columns naming what is assessed (["competency", "skill"] or ["competency"])
+        
+    Returns:
+        Tuple of (DataFrame of rows or None, error message or None)
+    """
+    rows = []
+    for i, record in enumerate(records, start=1):
+        for field in ["employee_id"] + name_columns + ["score", "assessment_type"]:
+            value = record.get(field)
+            if value is None or (not isinstance(value, str) and pd.isna(value)) or value == "":
+                return None, f"Record {i} is missing {field}"
+        
+        try:
+            score = float(record["score"])
+        except (TypeError, ValueError):
+            return None, f"Record {i} has an invalid score: {record['score']}"
+        if not SCORE_RANGE[0] <= score <= SCORE_RANGE[1]:
+            return None, f"Record {i} has a score outside {SCORE_RANGE[0]}-{SCORE_RANGE[1]}: {score}"
+        
+        if record["assessment_type"] not in ASSESSMENT_TYPES:
+            return None, f"Record {i} has an unknown assessment type: {record['assessment_type']}"
+        
+        row = {"employee_id": record["employee_id"]}
+        for col in name_columns:
+            row[col] = record[col]
+        row["score"] = score
+        row["assessment_type"] = record["assessment_type"]
+        row["assessment_date"] = datetime.now().strftime("%Y-%m-%d")
+        row["notes"] = record.get("notes", "")
+        row["organization_id"] = record.get("organization_id")
+        rows.append(row)
+    
+    rows_df = pd.DataFrame(rows)
+    
+    # Look up the organization of every employee that doesn't have one in a single read
+    missing_org = rows_df["organization_id"].isna()
+    if missing_org.any():
+        employee_ids = rows_df.loc[missing_org, "employee_id"].unique().tolist()
+        employees = _find_rows("employees", {"employee_id": employee_ids})
+        if not employees.empty and "organization_id" in employees.columns:
+            org_by_employee = employees.drop_duplicates("employee_id").set_index("employee_id")["organization_id"]
+            rows_df.loc[missing_org, "organization_id"] = rows_df.loc[missing_org, "employee_id"].map(org_by_employee)
+    
+    rows_df = _with_ids(data_type, rows_df)
+    unknown = rows_df[[id_column for id_column in REFERENCE_COLUMNS[data_type]]].isna().any(axis=1)
+    if unknown.any():
+        i = int(unknown.to_numpy().argmax())
+        names = " / ".join(str(records[i][col]) for col in name_columns)
+        return None, f"Record {i + 1} names an unknown {' or '.join(name_columns)}: {names}"
+    
+    return rows_df.drop(columns=name_columns), None
+
+def add_assessments_bulk(records):
+    """Add several skill assessments with a single write
+    
+    All records are validated before anything is stored, so either every
+    assessment is added or none is.
+    
+    Args:
+        records: List of dicts with employee_id, competency, skill, score, assessment_type
+                 and optionally notes and organization_id
+        
+    Returns:
+        Tuple of (success, message, list of new assessment IDs)
+    """
+    if not records:
+        return False, "No assessments to add", []
+    
+    rows_df, error = _build_assessment_rows("assessments", records, ["competency", "skill"])
+    if error:
+        return False, error, []
+    
+    new_ids = _append_rows("assessments", rows_df)
+    return True, f"{len(new_ids)} assessments added successfully", new_ids
+
 def get_employee_assessments(employee_id, assessment_type=None, organization_id=None):
     """Get all assessments for an employee
     
@@ -383,38 +1417,26 @@ def get_employee_assessments(employee_id, assessment_type=None, organization_id=
     Returns:
         DataFrame of assessments
     """
-    assessments_df = load_data("assessments")
-    
-    if assessments_df.empty:
-        return pd.DataFrame()
-    
     # If no organization_id provided, get it from the employee record
-    if organization_id is None and employee_id is not None:
-        employees_df = load_data("employees")
-        if not employees_df.empty:
-            employee = employees_df[employees_df["employee_id"] == employee_id]
-            if not employee.empty and "organization_id" in employee.columns:
-                organization_id = employee.iloc[0].get("organization_id")
+    organization_id = _assessment_organization(employee_id, organization_id)
     
     # Base filter is always by employee ID
-    filtered = assessments_df[assessments_df["employee_id"] == employee_id]
+    filters = {"employee_id": employee_id}
     
     # Add assessment type filter if provided
     if assessment_type:
-        filtered = filtered[filtered["assessment_type"] == assessment_type]
+        filters["assessment_type"] = assessment_type
     
-    # Add organization filter if organization_id column exists
-    if organization_id is not None and "organization_id" in filtered.columns:
-        filtered = filtered[
-            (filtered["organization_id"] == organization_id) | 
-            (filtered["organization_id"].isna())
-        ]
+    # Add organization filter, keeping assessments without an organization
+    if organization_id is not None:
+        filters["organization_id"] = [organization_id, None]
     
-    return filtered
+    # Only the matching rows are read
+    return load_data("assessments", filters=filters)
 
 def get_skill_assessments(employee_id, competency, skill):
     """Get all assessments for a specific skill"""
-    assessments_df = load_data("assessments")
+    assessments_df = load_data("assessments", filters={"employee_id": employee_id})
     
     if assessments_df.empty:
         return pd.DataFrame()
@@ -438,46 +1460,98 @@ def get_latest_assessment(employee_id, competency, skill, assessment_type, organ
     Returns:
         Latest assessment record or None if not found
     """
-    assessments_df = load_data("assessments")
-    
-    if assessments_df.empty:
+    ids = _framework_ids(_assessment_organization(employee_id, organization_id), competency=competency, skill=skill)
+    if ids is None:
         return None
     
-    # If no organization_id provided, get it from the employee record
+    # Only the latest scores table needs to be searched, not the full history
+    relevant = _latest_rows("assessments", {
+        "employee_id": employee_id,
+        **ids,
+        "assessment_type": assessment_type
+    })
+    
+    latest = _select_latest(
+        relevant,
+        ["employee_id", "competency_id", "skill_id", "assessment_type"],
+        [employee_id], assessment_type, organization_id
+    )
+    if latest.empty:
+        return None
+    return _with_names("assessments", latest).iloc[0]
+
+def _assessment_organization(employee_id, organization_id=None):
+    """Get the organization whose names an employee's assessments use"""
     if organization_id is None and employee_id is not None:
-        employees_df = load_data("employees")
-        if not employees_df.empty:
-            employee = employees_df[employees_df["employee_id"] == employee_id]
-            if not employee.empty and "organization_id" in employee.columns:
-                organization_id = employee.iloc[0].get("organization_id")
-    
-    # Base filter conditions
-    conditions = [
-        (assessments_df["employee_id"] == employee_id),
-        (assessments_df["competency"] == competency),
-        (assessments_df["skill"] == skill),
-        (assessments_df["assessment_type"] == assessment_type)
-    ]
+        employee = _find_rows("employees", {"employee_id": employee_id})
+        if not employee.empty and "organization_id" in employee.columns:
+            organization_id = employee.iloc[0].get("organization_id")
+    return organization_id
+
+def _id_list(ids):
+    """Turn a single ID or a collection of IDs into a list"""
+    if isinstance(ids, (list, tuple, set, pd.Series, pd.Index)):
+        return list(ids)
+    return [ids]
+
+def _select_latest(assessments_df, key_columns, employee_ids=None, assessment_type=None, organization_id=None):
+    """Keep only the most recent assessment for every combination of key columns
     
-    # Add organization filter if needed
-    if organization_id is not None and "organization_id" in assessments_df.columns:
-        conditions.append(
-            (assessments_df["organization_id"] == organization_id) | 
-            (assessments_df["organization_id"].isna())
-        )
+    Assessments are filtered the same way as get_latest_assessment: by assessment
+    type, and by organization (the given one, or else each employee's own),
+    always keeping assessments without an organization.
+    """
+    if assessments_df.empty:
+        return assessments_df
     
-    # Apply all filters
-    relevant = assessments_df[pd.Series(True, index=assessments_df.index)]
-    for condition in conditions:
-        relevant = relevant[condition]
+    df = assessments_df
+    if employee_ids is not None:
+        df = df[df["employee_id"].isin(_id_list(employee_ids))]
     
-    if relevant.empty:
-        return None
+    if assessment_type:
+        df = df[df["assessment_type"] == assessment_type]
     
-    # Sort by date and get most recent
-    relevant["assessment_date"] = pd.to_datetime(relevant["assessment_date"])
-    latest = relevant.sort_values("assessment_date", ascending=False).iloc[0]
-    return latest
+    if "organization_id" in df.columns and not df.empty:
+        if organization_id is not None:
+            df = df[(df["organization_id"] == organization_id) | df["organization_id"].isna()]
+        else:
+            # Match each assessment against its employee's organization
+            if employee_ids is not None:
+                employees_df = _find_rows("employees", {"employee_id": df["employee_id"].unique().tolist()})
+            else:
+                employees_df = load_data("employees")
+            if not employees_df.empty and "organization_id" in employees_df.columns:
+                org_by_employee = employees_df.drop_duplicates("employee_id").set_index("employee_id")["organization_id"]
+                employee_org = df["employee_id"].map(org_by_employee)
+                df = df[employee_org.isna() | df["organization_id"].isna() | (df["organization_id"] == employee_org)]
+    
+    if df.empty:
+        return df
+    
+    df = df.copy()
+    df["assessment_date"] = pd.to_datetime(df["assessment_date"])
+    return _keep_latest(df, key_columns).reset_index(drop=True)
+
+def get_latest_assessments(employee_ids, assessment_type=None, organization_id=None):
+    """Get the latest skill assessment of several employees in one pass
+    
+    Args:
+        employee_ids: Employee ID or list of employee IDs (None for all employees)
+        assessment_type: Optional filter for assessment type (self/manager)
+        organization_id: Optional organization ID to filter assessments. If not
+                         provided, each employee's own organization is used.
+        
+    Returns:
+        DataFrame with the latest assessment record for every
+        (employee_id, competency, skill, assessment_type)
+    """
+    where = None if employee_ids is None else {"employee_id": _id_list(employee_ids)}
+    latest = _select_latest(
+        _latest_rows("assessments", where),
+        ["employee_id", "competency_id", "skill_id", "assessment_type"],
+        employee_ids, assessment_type, organization_id
+    )
+    return _with_names("assessments", latest)
 
 def get_competency_skills(competency_id):
     """Get all skills for a competency"""
@@ -488,46 +1562,117 @@ def get_competency_skills(competency_id):
     
     return skills_df[skills_df["competency_id"] == competency_id]
 
+def _employee_assessment_store(employee_id):
+    """Get the assessment store of an employee's organization, so other organizations aren't loaded"""
+    organization_id = _assessment_organization(employee_id)
+    if organization_id is None or pd.isna(organization_id):
+        return get_assessment_store()
+    return get_assessment_store(int(organization_id))
+
 def calculate_employee_skill_means(employee_id):
     """Calculate the mean scores for all skills for an employee"""
-    assessments_df = load_data("assessments")
-    
-    if assessments_df.empty:
-        return pd.DataFrame()
-    
-    employee_assessments = assessments_df[assessments_df["employee_id"] == employee_id]
+    means = _employee_assessment_store(employee_id).means(by=["skill", "type"], employee_ids=[employee_id])
     
-    if employee_assessments.empty:
+    if means.empty:
         return pd.DataFrame()
     
-    # Group by competency, skill, and assessment_type and calculate mean
-    means = employee_assessments.groupby(["competency", "skill", "assessment_type"])["score"].mean().reset_index()
-    
-    return means
+    # Keep the competency, skill, and assessment_type columns with their mean
+    means = means.rename(columns={"mean": "score"})[["competency", "skill", "assessment_type", "score"]]
+    return means.sort_values(["competency", "skill", "assessment_type"]).reset_index(drop=True)
 
 def calculate_employee_competency_means(employee_id):
     """Calculate the mean scores for competencies (separately from skills)"""
-    assessments_df = load_data("assessments")
+    means = _employee_assessment_store(employee_id).means(by=["competency", "type"], employee_ids=[employee_id])
     
-    if assessments_df.empty:
+    if means.empty:
         return pd.DataFrame()
     
-    employee_assessments = assessments_df[assessments_df["employee_id"] == employee_id]
+    # Keep the competency and assessment_type columns with their mean
+    means = means.rename(columns={"mean": "score"})[["competency", "assessment_type", "score"]]
+    return means.sort_values(["competency", "assessment_type"]).reset_index(drop=True)
+
+# Reporting hierarchy
+
+class ReportingHierarchy:
+    """Index of who reports to whom, built from the manager_id column of employees
     
-    if employee_assessments.empty:
-        return pd.DataFrame()
+    Each query only walks the part of the tree it returns, so its cost
+    depends on the size of the result, not of the organization. A manager
+    cycle in the data is walked once instead of forever.
+    """
     
-    # Group by competency and assessment_type and calculate mean
-    means = employee_assessments.groupby(["competency", "assessment_type"])["score"].mean().reset_index()
+    def __init__(self, employees):
+        self._managers = {}
+        self._reports = {}
+        rows = employees.dropna(subset=["employee_id", "manager_id"]).drop_duplicates("employee_id")
+        for employee_id, manager_id in zip(rows["employee_id"].astype(int), rows["manager_id"].astype(int)):
+            self._managers[employee_id] = manager_id
+            self._reports.setdefault(manager_id, []).append(employee_id)
+    
+    def copy(self, deep=True):
+        """Return the index itself: it is never modified, so the cached one can be shared"""
+        return self
+    
+    def manager(self, employee_id):
+        """Get the ID of an employee's direct manager (None if they have none)"""
+        return self._managers.get(employee_id)
+    
+    def direct_reports(self, manager_id):
+        """Get the IDs of the employees reporting directly to a manager"""
+        return list(self._reports.get(manager_id, []))
+    
+    def descendants(self, manager_id):
+        """Get the IDs of a manager's direct and indirect reports, nearest first"""
+        result = []
+        seen = {manager_id}
+        queue = deque([manager_id])
+        while queue:
+            for employee_id in self._reports.get(queue.popleft(), []):
+                if employee_id not in seen:
+                    seen.add(employee_id)
+                    result.append(employee_id)
+                    queue.append(employee_id)
+        return result
+    
+    def management_chain(self, employee_id):
+        """Get the IDs of the managers above an employee, from their direct manager up"""
+        chain = []
+        seen = {employee_id}
+        manager_id = self._managers.get(employee_id)
+        while manager_id is not None and manager_id not in seen:
+            chain.append(manager_id)
+            seen.add(manager_id)
+            manager_id = self._managers.get(manager_id)
+        return chain
+    
+    def span_of_control(self, manager_id, include_indirect=False):
+        """Count the employees reporting to a manager, directly or through other managers"""
+        if include_indirect:
+            return len(self.descendants(manager_id))
+        return len(self._reports.get(manager_id, []))
+
+def get_reporting_hierarchy():
+    """Get the reporting hierarchy of all employees
     
-    return means
+    The index is cached like a table and rebuilt when employees change.
+    """
+    try:
+        return _cached_read(
+            (_storage.table_key("employees"), "hierarchy"),
+            lambda: _storage.version("employees"),
+            lambda: ReportingHierarchy(_storage.read("employees"))
+        )
+    except FileNotFoundError:
+        return ReportingHierarchy(_empty_frame("employees"))
 
-def get_employees_for_manager(manager_id, organization_id=None):
+def get_employees_for_manager(manager_id, organization_id=None, include_indirect=False):
     """Get all employees reporting to a manager
     
     Args:
         manager_id: ID of the manager
         organization_id: Optional organization ID to filter employees
+        include_indirect: Also include the employees reporting to the manager
+            through other managers
         
     Returns:
         DataFrame of employees reporting to this manager
@@ -535,559 +1680,1172 @@ def get_employees_for_manager(manager_id, organization_id=None):
     try:
         employees_df = load_data("employees")
         
-        if employees_df.empty:
-            return pd.DataFrame()
+        if employees_df.empty:
+            return pd.DataFrame()
+        
+        # If no organization_id provided, get it from the manager's record
+        if organization_id is None and manager_id is not None:
+            manager = employees_df[employees_df["employee_id"] == manager_id]
+            if not manager.empty and "organization_id" in manager.columns:
+                organization_id = manager.iloc[0].get("organization_id")
+        
+        # Always filter by the manager's reports
+        hierarchy = get_reporting_hierarchy()
+        if include_indirect:
+            report_ids = hierarchy.descendants(manager_id)
+        else:
+            report_ids = hierarchy.direct_reports(manager_id)
+        filtered = employees_df[employees_df["employee_id"].isin(report_ids)]
+        
+        # Add organization filter if needed
+        if organization_id is not None and "organization_id" in filtered.columns:
+            filtered = filtered[filtered["organization_id"] == organization_id]
+        
+        return filtered
+        
+    except Exception as e:
+        print(f"Error getting employees for manager: {str(e)}")
+        return pd.DataFrame()
+
+def get_team_skill_means(manager_id, organization_id=None, include_indirect=False):
+    """Calculate team skill means for a manager's team
+    
+    Args:
+        manager_id: ID of the manager
+        organization_id: Optional organization ID to filter data
+        include_indirect: Also include the manager's indirect reports
+        
+    Returns:
+        DataFrame with mean scores by competency, skill, and assessment type
+    """
+    # Get employees from the same organization as the manager
+    team_members = get_employees_for_manager(manager_id, organization_id, include_indirect)
+    
+    if team_members.empty:
+        return pd.DataFrame()
+    
+    # Extract employee IDs
+    team_employee_ids = team_members["employee_id"].tolist()
+    
+    if not team_employee_ids:
+        return pd.DataFrame()
+    
+    # If no organization_id provided, get it from the manager's record
+    organization_id = _assessment_organization(manager_id, organization_id)
+    
+    # Read only the team members' assessments, and only the columns the means need
+    filters = {"employee_id": team_employee_ids}
+    if organization_id is not None:
+        filters["organization_id"] = [organization_id, None]
+    team_assessments = load_data(
+        "assessments",
+        columns=["competency", "skill", "assessment_type", "score"],
+        filters=filters
+    )
+    
+    if team_assessments.empty:
+        return pd.DataFrame()
+    
+    # Group by competency, skill and assessment_type and calculate mean
+    means = team_assessments.groupby(["competency", "skill", "assessment_type"], observed=True)["score"].mean().reset_index()
+    
+    return means
+
+def get_team_competency_means(manager_id, organization_id=None, include_indirect=False):
+    """Calculate team competency means for a manager's team (separate from skills)
+    
+    Args:
+        manager_id: ID of the manager
+        organization_id: Optional organization ID to filter data
+        include_indirect: Also include the manager's indirect reports
+        
+    Returns:
+        DataFrame with mean scores by competency and assessment type
+    """
+    # Get employees from the same organization as the manager
+    team_members = get_employees_for_manager(manager_id, organization_id, include_indirect)
+    
+    if team_members.empty:
+        return pd.DataFrame()
+    
+    # Extract employee IDs
+    team_employee_ids = team_members["employee_id"].tolist()
+    
+    if not team_employee_ids:
+        return pd.DataFrame()
+    
+    # If no organization_id provided, get it from the manager's record
+    organization_id = _assessment_organization(manager_id, organization_id)
+    
+    # Read only the team members' assessments, and only the columns the means need
+    filters = {"employee_id": team_employee_ids}
+    if organization_id is not None:
+        filters["organization_id"] = [organization_id, None]
+    team_assessments = load_data(
+        "assessments",
+        columns=["competency", "assessment_type", "score"],
+        filters=filters
+    )
+    
+    if team_assessments.empty:
+        return pd.DataFrame()
+    
+    # Group by competency only and assessment_type and calculate mean
+    means = team_assessments.groupby(["competency", "assessment_type"], observed=True)["score"].mean().reset_index()
+    
+    return means
+
+def team_comparison_matrix(team_ids, assessment_type=None, organization_id=None):
+    """Compare the mean scores of team members by competency
+    
+    Args:
+        team_ids: IDs of the team members
+        assessment_type: Optional assessment type ("self" or "manager"). If None, both are used.
+        organization_id: Optional organization whose assessments are read
+        
+    Returns:
+        DataFrame with one row per team member with assessments, in team_ids
+        order: employee_id, name, one column per competency (by name) with the
+        member's mean score, "Overall Mean" over all their assessments and
+        "Rank" by overall mean (1 is the highest). A last row named
+        "TEAM AVERAGE", without employee_id and rank, holds the team means.
+        Empty if the team has no assessments.
+    """
+    team_ids = list(team_ids)
+    filters = {"employee_id": team_ids}
+    if organization_id is not None:
+        filters["organization_id"] = [organization_id, None]
+    if assessment_type is not None:
+        filters["assessment_type"] = assessment_type
+    team_assessments = load_data("assessments", columns=["employee_id", "competency", "score"], filters=filters)
+    team_assessments = team_assessments.dropna(subset=["competency", "score"])
+    if team_assessments.empty:
+        return pd.DataFrame()
+    
+    # One pivot gives the employee x competency means; its margins are every
+    # employee's overall mean and the team mean of every competency
+    matrix = team_assessments.astype({"competency": str}).pivot_table(
+        index="employee_id", columns="competency", values="score",
+        aggfunc="mean", margins=True, margins_name="Overall Mean"
+    )
+    matrix.columns.name = None
+    team_means = matrix.loc["Overall Mean"]
+    
+    members = matrix.drop(index="Overall Mean").rename_axis("employee_id").reset_index()
+    members["employee_id"] = members["employee_id"].astype("Int64")
+    order = {employee_id: position for position, employee_id in enumerate(team_ids)}
+    members = members.sort_values("employee_id", key=lambda ids: ids.map(order)).reset_index(drop=True)
+    
+    names = load_data("employees", columns=["employee_id", "name"]).drop_duplicates("employee_id").set_index("employee_id")["name"]
+    members.insert(1, "name", members["employee_id"].map(names))
+    members["Rank"] = members["Overall Mean"].rank(ascending=False, method="min").astype("Int64")
+    
+    team_row = pd.DataFrame([{"employee_id": pd.NA, "name": "TEAM AVERAGE", **team_means.to_dict(), "Rank": pd.NA}])
+    result = pd.concat([members, team_row.astype({"employee_id": "Int64", "Rank": "Int64"})], ignore_index=True)
+    return result
+
+# Organization context
+
+# Define the data types held by an organization context
+CONTEXT_TYPES = ["employees", "competencies", "skills", "levels", "expectations", "comp_expectations"]
+
+class OrgContext:
+    """The employees and framework of an organization, with lookups built once
+    
+    Pages and charts read these tables on every rerun. The context loads
+    them once and is cached until one of them changes, so a rerun only checks
+    the table versions. The frames are shared by every caller: copy one
+    before modifying it.
+    
+    Attributes:
+        organization_id: Organization of the context (None for all organizations)
+        employees, competencies, skills, levels, expectations, comp_expectations:
+            Frames as returned by load_data_for_organization
+        employee_names, competency_names, skill_names, level_names: Dicts mapping IDs to names
+    """
+    
+    def __init__(self, organization_id, frames):
+        self.organization_id = organization_id
+        self.employees = frames["employees"]
+        self.competencies = frames["competencies"]
+        self.skills = frames["skills"]
+        self.levels = frames["levels"]
+        self.expectations = frames["expectations"]
+        self.comp_expectations = frames["comp_expectations"]
+        
+        self.employee_names = self._id_names(self.employees, "employee_id")
+        self.competency_names = self._id_names(self.competencies, "competency_id")
+        self.skill_names = self._id_names(self.skills, "skill_id")
+        self.level_names = self._id_names(self.levels, "level_id")
+        
+        self._competency_skills = {
+            int(competency_id): rows for competency_id, rows in self.skills.groupby("competency_id", sort=False)
+        }
+        self._level_expectations = {
+            str(level): rows for level, rows in self.expectations.groupby("job_level", sort=False, observed=True)
+        }
+        self._level_comp_expectations = {
+            str(level): rows for level, rows in self.comp_expectations.groupby("job_level", sort=False, observed=True)
+        }
+    
+    @staticmethod
+    def _id_names(df, id_column):
+        rows = df.dropna(subset=[id_column]).drop_duplicates(id_column)
+        return dict(zip(rows[id_column].astype(int), rows["name"]))
+    
+    def copy(self, deep=True):
+        """Return the context itself: it is never modified, so the cached one can be shared"""
+        return self
+    
+    def skills_of(self, competency_id):
+        """Get the skills of a competency"""
+        skills = self._competency_skills.get(int(competency_id))
+        return skills if skills is not None else self.skills.iloc[:0]
+    
+    def expectations_for(self, job_level):
+        """Get the skill expectations of a job level, by name"""
+        expectations = self._level_expectations.get(str(job_level))
+        return expectations if expectations is not None else self.expectations.iloc[:0]
+    
+    def comp_expectations_for(self, job_level):
+        """Get the competency expectations of a job level, by name"""
+        expectations = self._level_comp_expectations.get(str(job_level))
+        return expectations if expectations is not None else self.comp_expectations.iloc[:0]
+
+def _table_versions(data_types):
+    """Get the versions of several tables, None for tables that don't exist yet"""
+    versions = []
+    for data_type in data_types:
+        try:
+            versions.append(_storage.version(data_type))
+        except FileNotFoundError:
+            versions.append(None)
+    return tuple(versions)
+
+def get_data_version(data_types):
+    """Get a token that changes whenever one of several tables changes, e.g. to key cached reports
+    
+    Args:
+        data_types: List of the data types the result depends on
+    
+    Returns:
+        Hashable version token of those tables, equal across processes while they don't change
+    """
+    return _table_versions(data_types)
+
+def get_org_context(organization_id=None):
+    """Get the employees and framework of an organization with their lookups
+    
+    The context is cached and rebuilt when one of CONTEXT_TYPES changes.
+    
+    Args:
+        organization_id: Optional organization. If None, the context holds all organizations.
+        
+    Returns:
+        OrgContext of the organization
+    """
+    def read():
+        if organization_id is None:
+            frames = {data_type: load_data(data_type) for data_type in CONTEXT_TYPES}
+        else:
+            frames = {data_type: load_data_for_organization(data_type, organization_id) for data_type in CONTEXT_TYPES}
+        return OrgContext(organization_id, frames)
+    
+    return _cached_read(
+        (_storage.table_key("employees"), ("context", organization_id)),
+        lambda: _table_versions(CONTEXT_TYPES),
+        read
+    )
+
+# Gap analysis
+
+class GapAnalysis:
+    """Latest and expected skill scores of every employee as NumPy matrices
+    
+    scores is an employees x skills matrix of the latest scores and
+    expectations a levels x skills matrix of the expected scores, both NaN
+    where there is none. Taking each employee's level row of the expectations
+    and subtracting it from the scores gives every gap in one operation, so
+    reports over thousands of employees never filter expectations row by row.
+    
+    Attributes:
+        employees: Frame of the employees in row order (employee_id, name, department, job_level, organization_id, level_id)
+        skill_ids: Skill IDs in column order
+        level_ids: Level IDs in expectation row order
+        scores: employees x skills array of latest scores
+        expectations: levels x skills array of expected scores
+        employee_levels: Expectation row of each employee (-1 if their level has no expectations)
+        gaps: employees x skills array of score minus expected score
+    """
+    
+    def __init__(self, latest, employees, expectations, skills):
+        employees = employees.dropna(subset=["employee_id"]).drop_duplicates("employee_id")
+        employees = _with_ids("expectations", employees[["employee_id", "name", "department", "job_level", "organization_id"]])
+        self.employees = employees.reset_index(drop=True)
+        employee_index = pd.Index(self.employees["employee_id"].astype(int))
+        
+        skills = skills.dropna(subset=["skill_id"]).drop_duplicates("skill_id")
+        self.skill_ids = skills["skill_id"].astype(int).to_numpy()
+        self._skill_competencies = skills["competency_id"].to_numpy()
+        skill_index = pd.Index(self.skill_ids)
+        
+        # Own expectations come before shared ones, so they win for a key
+        expectations = expectations.dropna(subset=["level_id", "skill_id", "expected_score"]).drop_duplicates(["level_id", "skill_id"])
+        self.level_ids = np.unique(expectations["level_id"].astype(int).to_numpy())
+        level_index = pd.Index(self.level_ids)
+        
+        # Several assessment types of one skill are averaged
+        latest = latest.dropna(subset=["employee_id", "skill_id", "score"])
+        rows = employee_index.get_indexer(latest["employee_id"].astype(int))
+        cols = skill_index.get_indexer(latest["skill_id"].astype(int))
+        found = (rows >= 0) & (cols >= 0)
+        totals = np.zeros((len(employee_index), len(skill_index)))
+        counts = np.zeros_like(totals)
+        np.add.at(totals, (rows[found], cols[found]), latest["score"].to_numpy(dtype=float)[found])
+        np.add.at(counts, (rows[found], cols[found]), 1)
+        self.scores = np.divide(totals, counts, out=np.full_like(totals, np.nan), where=counts > 0)
+        
+        self.expectations = np.full((len(level_index), len(skill_index)), np.nan)
+        rows = level_index.get_indexer(expectations["level_id"].astype(int))
+        cols = skill_index.get_indexer(expectations["skill_id"].astype(int))
+        found = cols >= 0
+        self.expectations[rows[found], cols[found]] = expectations["expected_score"].to_numpy(dtype=float)[found]
+        
+        self.employee_levels = level_index.get_indexer(self.employees["level_id"].fillna(-1).astype(int))
+        self.gaps = self.scores - self._expected_rows(self.employee_levels)
+    
+    def copy(self, deep=True):
+        """Return the analysis itself: it is never modified, so the cached one can be shared"""
+        return self
+    
+    def _expected_rows(self, level_rows):
+        # A trailing row of NaN gives employees without expectations (row -1) no expected scores
+        padded = np.vstack([self.expectations, np.full((1, len(self.skill_ids)), np.nan)])
+        return padded[level_rows]
+    
+    def _skill_frame(self, columns):
+        df = pd.DataFrame({
+            "competency_id": pd.array(self._skill_competencies, dtype="Int64"),
+            "skill_id": pd.array(self.skill_ids, dtype="Int64"),
+            **columns
+        })
+        return _with_names("latest_assessments", df)
+    
+    def employee_gaps(self, employee_id, job_level=None):
+        """Get an employee's scores, expected scores and gaps by skill
+        
+        Args:
+            employee_id: ID of the employee
+            job_level: Optional name of a job level of the employee's organization
+                to compare with instead of their own
+        
+        Returns:
+            DataFrame with competency_id, competency, skill_id, skill, score,
+            expected_score and gap for every skill with a score or an
+            expectation (gap is NaN unless both exist)
+        """
+        rows = np.flatnonzero(self.employees["employee_id"] == employee_id)
+        if len(rows) == 0:
+            scores = np.full(len(self.skill_ids), np.nan)
+            level_row = -1
+        else:
+            scores = self.scores[rows[0]]
+            level_row = self.employee_levels[rows[0]]
+            if job_level is not None:
+                ids = _framework_ids(_cube_value(self.employees.at[rows[0], "organization_id"]), job_level=job_level)
+                level_row = -1 if ids is None else pd.Index(self.level_ids).get_indexer([ids["level_id"]])[0]
+        expected = self._expected_rows([level_row])[0]
+        df = self._skill_frame({"score": scores, "expected_score": expected, "gap": scores - expected})
+        return df[~(np.isnan(scores) & np.isnan(expected))].reset_index(drop=True)
+    
+    def to_frame(self):
+        """Get every employee and skill with both a score and an expected score
+        
+        Returns:
+            DataFrame with employee_id, name, department, job_level,
+            competency_id, competency, skill_id, skill, score, expected_score and gap
+        """
+        rows, cols = np.nonzero(~np.isnan(self.gaps))
+        df = self.employees.loc[rows, ["employee_id", "name", "department", "job_level"]].reset_index(drop=True)
+        skills = self._skill_frame({}).iloc[cols].reset_index(drop=True)
+        df = pd.concat([df, skills], axis=1)
+        df["score"] = self.scores[rows, cols]
+        df["expected_score"] = self._expected_rows(self.employee_levels[rows])[np.arange(len(rows)), cols]
+        df["gap"] = self.gaps[rows, cols]
+        return df
+    
+    def _employee_rows(self, employee_ids=None):
+        """Get a mask of the employee rows, optionally only of some employees"""
+        if employee_ids is None:
+            return np.ones(len(self.employees), dtype=bool)
+        return self.employees["employee_id"].isin(list(employee_ids)).to_numpy()
+    
+    def skill_summary(self, employee_ids=None):
+        """Summarize the gaps of every skill across employees
+        
+        Args:
+            employee_ids: Optional list of the employees to summarize (default: all)
+        
+        Returns:
+            DataFrame with competency_id, competency, skill_id and skill plus
+            employees (number compared with an expectation), mean_gap,
+            min_gap (largest shortfall), below (employees under the
+            expectation) and below_share, for skills with at least one gap
+        """
+        gaps = self.gaps[self._employee_rows(employee_ids)]
+        compared = ~np.isnan(gaps)
+        counts = compared.sum(axis=0)
+        totals = np.where(compared, gaps, 0).sum(axis=0)
+        below = (np.nan_to_num(gaps, nan=0) < 0).sum(axis=0)
+        lowest = np.where(compared, gaps, np.inf).min(axis=0, initial=np.inf)
+        df = self._skill_frame({
+            "employees": counts,
+            "mean_gap": np.divide(totals, counts, out=np.full(len(counts), np.nan), where=counts > 0),
+            "min_gap": lowest,
+            "below": below,
+            "below_share": np.divide(below, counts, out=np.full(len(counts), np.nan), where=counts > 0)
+        })
+        return df[counts > 0].reset_index(drop=True)
+    
+    def employee_summary(self, employee_ids=None):
+        """Summarize the gaps of every employee across skills
+        
+        Args:
+            employee_ids: Optional list of the employees to summarize (default: all)
+        
+        Returns:
+            DataFrame with employee_id, name, department and job_level plus
+            skills (number compared with an expectation), mean_gap, below
+            (skills under the expectation) and the skill_id and min_gap of
+            their largest shortfall, for employees with at least one gap
+        """
+        rows = self._employee_rows(employee_ids)
+        gaps = self.gaps[rows]
+        compared = ~np.isnan(gaps)
+        counts = compared.sum(axis=1)
+        totals = np.where(compared, gaps, 0).sum(axis=1)
+        lowest = np.where(compared, gaps, np.inf)
+        weakest = lowest.argmin(axis=1) if len(self.skill_ids) else np.zeros(len(counts), dtype=int)
+        df = self.employees.loc[rows, ["employee_id", "name", "department", "job_level"]].reset_index(drop=True)
+        df["skills"] = counts
+        df["mean_gap"] = np.divide(totals, counts, out=np.full(len(counts), np.nan), where=counts > 0)
+        df["below"] = (np.nan_to_num(gaps, nan=0) < 0).sum(axis=1)
+        df["skill_id"] = pd.array(self.skill_ids[weakest] if len(self.skill_ids) else weakest, dtype="Int64")
+        df["min_gap"] = lowest[np.arange(len(counts)), weakest] if len(self.skill_ids) else np.nan
+        return _with_names("latest_assessments", df[counts > 0].reset_index(drop=True))
+    
+    def group_summary(self, by, employee_ids=None):
+        """Summarize the gaps by an employee column, e.g. "department" or "job_level"
+        
+        Args:
+            by: Employee column to group by
+            employee_ids: Optional list of the employees to summarize (default: all)
+        
+        Returns:
+            DataFrame with the group column plus employees (with at least one
+            gap), gaps (employee and skill pairs compared), mean_gap, below and below_share
+        """
+        rows = self._employee_rows(employee_ids)
+        gaps = self.gaps[rows]
+        compared = ~np.isnan(gaps)
+        df = pd.DataFrame({
+            by: self.employees.loc[rows, by].to_numpy(),
+            "employees": compared.any(axis=1).astype(int),
+            "gaps": compared.sum(axis=1),
+            "total": np.where(compared, gaps, 0).sum(axis=1),
+            "below": (np.nan_to_num(gaps, nan=0) < 0).sum(axis=1)
+        })
+        df = df.groupby(by, dropna=False, observed=True).sum().reset_index()
+        df = df[df["gaps"] > 0].reset_index(drop=True)
+        df["mean_gap"] = df.pop("total") / df["gaps"]
+        df["below_share"] = df["below"] / df["gaps"]
+        return df
+
+def get_gap_analysis(assessment_type=None, organization_id=None):
+    """Get the gap analysis of the latest skill scores against the expectations
+    
+    The analysis is cached and rebuilt when the latest scores, employees,
+    expectations, skills or levels change.
+    
+    Args:
+        assessment_type: Optional assessment type ("self" or "manager"). If None,
+            the latest scores of both types are averaged.
+        organization_id: Optional organization to analyze. If None, all organizations are.
+        
+    Returns:
+        GapAnalysis of the employees and skills
+    """
+    def read():
+        if organization_id is not None:
+            latest = _read_partition("latest_assessments", organization_id)
+        else:
+            latest = _load_table("latest_assessments")
+        if assessment_type is not None:
+            latest = latest[latest["assessment_type"] == assessment_type]
+        context = get_org_context(organization_id)
+        return GapAnalysis(latest, context.employees, context.expectations, context.skills)
+    
+    return _cached_read(
+        (_storage.table_key("latest_assessments"), ("gaps", assessment_type, organization_id)),
+        lambda: _table_versions(["latest_assessments", "employees", "expectations", "skills", "levels"]),
+        read
+    )
+
+# Compact assessment store
+
+# Define the fields of a row of the assessment store: indexes into the
+# store's employee, skill and type lists, the day (days since 1970-01-01)
+# and the score. Notes and other text stay in the assessment tables.
+ASSESSMENT_STORE_DTYPE = np.dtype([
+    ("employee", np.int32),
+    ("skill", np.int16),
+    ("type", np.int8),
+    ("day", np.int32),
+    ("score", np.float32)
+])
+
+# Define the assessment columns the store is built from
+ASSESSMENT_STORE_COLUMNS = ["assessment_id", "employee_id", "competency_id", "skill_id", "assessment_type",
+                            "assessment_date", "score"]
+
+# Define the periods trend queries can group by
+TREND_PERIODS = ["D", "W", "M", "Y"]
+
+def _epoch_day(value):
+    """Convert a date to days since 1970-01-01"""
+    return int(np.datetime64(pd.Timestamp(value), "D").astype(np.int64))
+
+class AssessmentStore:
+    """Skill assessment history encoded as one NumPy structured array
+    
+    Each assessment takes ASSESSMENT_STORE_DTYPE.itemsize (15) bytes instead
+    of a pandas row with names, dates and notes, so years of history fit in
+    memory and means, latest scores and trends are computed with vectorized
+    group operations. Rows are sorted by employee, skill, type, day and
+    assessment ID, so the last row of a key is its latest assessment.
+    
+    Attributes:
+        rows: Structured array of ASSESSMENT_STORE_DTYPE
+        employee_ids, skill_ids: IDs the employee and skill fields index into
+        skill_competencies: Competency ID of every skill
+        types: Assessment types the type field indexes into
+    """
+    
+    # Define the fields queries can group by
+    GROUPS = ["employee", "skill", "competency", "type", "period"]
+    
+    def __init__(self, assessments):
+        assessments = assessments.dropna(subset=["employee_id", "skill_id", "assessment_type", "assessment_date", "score"])
+        assessments = assessments.sort_values(["employee_id", "skill_id", "assessment_type", "assessment_date", "assessment_id"])
+        
+        employees = pd.Categorical(assessments["employee_id"].astype(int))
+        skills = pd.Categorical(assessments["skill_id"].astype(int))
+        types = pd.Categorical(assessments["assessment_type"].astype(str))
+        if len(skills.categories) > np.iinfo(np.int16).max:
+            raise ValueError("Too many skills for the assessment store")
+        
+        self.employee_ids = employees.categories.to_numpy(dtype=np.int64)
+        self.skill_ids = skills.categories.to_numpy(dtype=np.int64)
+        self.types = types.categories.tolist()
+        competencies = assessments.drop_duplicates("skill_id").set_index("skill_id")["competency_id"]
+        self.skill_competencies = pd.array(competencies.reindex(self.skill_ids).to_numpy(), dtype="Int64")
+        
+        self.rows = np.empty(len(assessments), dtype=ASSESSMENT_STORE_DTYPE)
+        self.rows["employee"] = employees.codes
+        self.rows["skill"] = skills.codes
+        self.rows["type"] = types.codes
+        self.rows["day"] = pd.to_datetime(assessments["assessment_date"]).to_numpy("datetime64[D]").astype(np.int64)
+        self.rows["score"] = assessments["score"].to_numpy(dtype=np.float32)
+    
+    def __len__(self):
+        return len(self.rows)
+    
+    @property
+    def nbytes(self):
+        """Memory held by the encoded rows"""
+        return self.rows.nbytes
+    
+    def copy(self, deep=True):
+        """Return the store itself: it is never modified, so the cached one can be shared"""
+        return self
+    
+    def _scores(self, rows):
+        """Get the scores of some rows as floats, dropping the float32 rounding noise"""
+        return np.round(rows["score"].astype(np.float64), 4)
+    
+    def _select(self, employee_ids=None, skill_ids=None, assessment_type=None, start=None, end=None):
+        """Get the rows matching the filters, still in store order"""
+        rows = self.rows
+        mask = np.ones(len(rows), dtype=bool)
+        if employee_ids is not None:
+            codes = pd.Index(self.employee_ids).get_indexer(pd.Index(list(employee_ids)).astype("Int64").dropna().astype(int))
+            mask &= np.isin(rows["employee"], codes[codes >= 0])
+        if skill_ids is not None:
+            codes = pd.Index(self.skill_ids).get_indexer(pd.Index(list(skill_ids)).astype("Int64").dropna().astype(int))
+            mask &= np.isin(rows["skill"], codes[codes >= 0])
+        if assessment_type is not None:
+            mask &= rows["type"] == (self.types.index(assessment_type) if assessment_type in self.types else -1)
+        if start is not None:
+            mask &= rows["day"] >= _epoch_day(start)
+        if end is not None:
+            mask &= rows["day"] <= _epoch_day(end)
+        return rows[mask]
+    
+    def _period_starts(self, days, period):
+        """Get the day each row's period starts on (weeks start on Monday)"""
+        if period == "D":
+            return days
+        if period == "W":
+            # 1970-01-01 was a Thursday
+            return (days + 3) // 7 * 7 - 3
+        unit = "datetime64[M]" if period == "M" else "datetime64[Y]"
+        return days.astype("datetime64[D]").astype(unit).astype("datetime64[D]").astype(np.int64)
+    
+    def _group(self, rows, by, period=None):
+        """Number the groups of rows by some fields
+        
+        Returns:
+            (group of each row, first row of each group) arrays
+        """
+        if not by:
+            return np.zeros(len(rows), dtype=np.int64), np.zeros(min(len(rows), 1), dtype=np.int64)
+        columns = []
+        for field in by:
+            if field not in self.GROUPS:
+                raise ValueError(f"Unknown assessment store group: {field}")
+            if field == "competency":
+                columns.append(np.asarray(self.skill_competencies.fillna(-1), dtype=np.int64)[rows["skill"]])
+            elif field == "period":
+                columns.append(self._period_starts(rows["day"].astype(np.int64), period))
+            else:
+                columns.append(rows[field].astype(np.int64))
+        _, first, groups = np.unique(np.column_stack(columns), axis=0, return_index=True, return_inverse=True)
+        return groups.ravel(), first
+    
+    def _frame(self, rows, by, period=None):
+        """Decode the group fields of some rows into ID, name and date columns"""
+        df = pd.DataFrame(index=range(len(rows)))
+        for field in by:
+            if field == "employee":
+                df["employee_id"] = pd.array(self.employee_ids[rows["employee"]], dtype="Int64")
+            elif field == "skill":
+                df["competency_id"] = self.skill_competencies[rows["skill"]]
+                df["skill_id"] = pd.array(self.skill_ids[rows["skill"]], dtype="Int64")
+            elif field == "competency":
+                df["competency_id"] = self.skill_competencies[rows["skill"]]
+            elif field == "type":
+                df["assessment_type"] = pd.Categorical.from_codes(rows["type"], categories=self.types)
+            elif field == "period":
+                df["period"] = self._period_starts(rows["day"].astype(np.int64), period).astype("datetime64[D]").astype("datetime64[ns]")
+        return _with_names("assessments", df)
+    
+    def means(self, by=("employee", "skill", "type"), **filters):
+        """Mean scores over the assessment history
+        
+        Args:
+            by: Fields of GROUPS (except "period") to group by
+            **filters: employee_ids, skill_ids, assessment_type, and start/end dates
         
-        # If no organization_id provided, get it from the manager's record
-        if organization_id is None and manager_id is not None:
-            manager = employees_df[employees_df["employee_id"] == manager_id]
-            if not manager.empty and "organization_id" in manager.columns:
-                organization_id = manager.iloc[0].get("organization_id")
+        Returns:
+            DataFrame with the IDs (and names) of the group fields plus count and mean
+        """
+        return self.trend(period=None, by=[field for field in by if field != "period"], **filters)
+    
+    def latest(self, as_of=None, **filters):
+        """Latest score of every employee, skill and assessment type
         
-        # Always filter by manager_id
-        filtered = employees_df[employees_df["manager_id"] == manager_id]
+        Args:
+            as_of: Optional date; only assessments up to that day count
+            **filters: employee_ids, skill_ids, assessment_type and start date
         
-        # Add organization filter if needed
-        if organization_id is not None and "organization_id" in filtered.columns:
-            filtered = filtered[filtered["organization_id"] == organization_id]
+        Returns:
+            DataFrame with employee_id, competency_id, competency, skill_id,
+            skill, assessment_type, assessment_date and score
+        """
+        return self.trend(period=None, by=["employee", "skill", "type"], how="last", end=as_of, **filters)
+    
+    def trend(self, period="M", by=(), how="mean", **filters):
+        """Scores per period, e.g. the monthly mean of a team's manager assessments
         
-        return filtered
+        Args:
+            period: Period of TREND_PERIODS to group by, or None for no periods
+            by: Other fields of GROUPS to group by, e.g. ["type"]
+            how: "mean" for the count and mean of every group, or "last" for
+                the latest assessment of every group (by day, then by
+                assessment ID within an employee, skill and type)
+            **filters: employee_ids, skill_ids, assessment_type, and start/end dates
         
-    except Exception as e:
-        print(f"Error getting employees for manager: {str(e)}")
-        return pd.DataFrame()
+        Returns:
+            DataFrame with the group fields (period is the date the period
+            starts on) plus count and mean, or assessment_date and score
+        """
+        if period is not None and period not in TREND_PERIODS:
+            raise ValueError(f"Unknown trend period: {period}")
+        by = list(by) + (["period"] if period is not None else [])
+        rows = self._select(**filters)
+        groups, first = self._group(rows, by, period)
+        result = self._frame(rows[first], by, period)
+        
+        if how == "last":
+            # Rank rows by day, keeping the store order within a day
+            order = np.lexsort((np.arange(len(rows)), rows["day"]))
+            rank = np.empty(len(rows), dtype=np.int64)
+            rank[order] = np.arange(len(rows))
+            best = np.full(len(first), -1, dtype=np.int64)
+            np.maximum.at(best, groups, rank)
+            last = rows[order[best]] if len(rows) else rows
+            result["assessment_date"] = last["day"].astype("datetime64[D]").astype("datetime64[ns]")
+            result["score"] = self._scores(last)
+        elif how == "mean":
+            counts = np.bincount(groups, minlength=len(first))
+            result["count"] = counts
+            result["mean"] = np.bincount(groups, weights=self._scores(rows), minlength=len(first)) / np.maximum(counts, 1)
+        else:
+            raise ValueError(f"Unknown aggregation: {how}")
+        
+        if "period" in result.columns:
+            result = result.sort_values("period", kind="stable").reset_index(drop=True)
+        return result
 
-def get_team_skill_means(manager_id, organization_id=None):
-    """Calculate team skill means for a manager's team
+def get_assessment_store(organization_id=None):
+    """Get the compact store of the skill assessment history
+    
+    The store is cached and rebuilt when the assessments (of the
+    organization's partition) change.
     
     Args:
-        manager_id: ID of the manager
-        organization_id: Optional organization ID to filter data
+        organization_id: Optional organization. If None, the store holds all organizations.
         
     Returns:
-        DataFrame with mean scores by competency, skill, and assessment type
+        AssessmentStore of the assessments
     """
-    # Get employees from the same organization as the manager
-    team_members = get_employees_for_manager(manager_id, organization_id)
-    assessments_df = load_data("assessments")
-    
-    if team_members.empty or assessments_df.empty:
-        return pd.DataFrame()
-    
-    # Extract employee IDs
-    team_employee_ids = team_members["employee_id"].tolist()
+    # Only the encoded fields are read, chunk by chunk, so the assessment
+    # frame with its notes and names is neither built nor cached
+    where = None if organization_id is None else {"organization_id": organization_id}
     
-    if not team_employee_ids:
-        return pd.DataFrame()
+    def version():
+        try:
+            if organization_id is not None:
+                return _storage.partition_version("assessments", organization_id)
+            return _storage.version("assessments")
+        except FileNotFoundError:
+            return None
     
-    # If no organization_id provided, get it from the manager's record
-    if organization_id is None and manager_id is not None:
-        employees_df = load_data("employees")
-        if not employees_df.empty:
-            manager = employees_df[employees_df["employee_id"] == manager_id]
-            if not manager.empty and "organization_id" in manager.columns:
-                organization_id = manager.iloc[0].get("organization_id")
+    def read():
+        try:
+            chunks = [chunk for chunk in _storage.iter_query("assessments", ASSESSMENT_STORE_COLUMNS, where) if not chunk.empty]
+        except FileNotFoundError:
+            chunks = []
+        if not chunks:
+            return AssessmentStore(_empty_frame("assessments")[ASSESSMENT_STORE_COLUMNS])
+        return AssessmentStore(pd.concat(chunks, ignore_index=True) if len(chunks) > 1 else chunks[0])
+    
+    return _cached_read(
+        (_storage.table_key("assessments"), ("store", organization_id)),
+        version,
+        read
+    )
+
+# Delete functions for each data type
+# Cascading deletes
+
+# Define the rows that depend on each data type, as (dependent data type,
+# {dependent column: parent column}) rules. A dependent row is deleted with a
+# parent row when all mapped columns match.
+CASCADE_RULES = {
+    "competencies": [
+        ("skills", {"competency_id": "competency_id"}),
+        ("expectations", {"competency_id": "competency_id"}),
+        ("comp_expectations", {"competency_id": "competency_id"}),
+        ("assessments", {"competency_id": "competency_id"}),
+        ("comp_assessments", {"competency_id": "competency_id"})
+    ],
+    "skills": [
+        ("expectations", {"skill_id": "skill_id"}),
+        ("assessments", {"skill_id": "skill_id"})
+    ],
+    "levels": [
+        ("expectations", {"level_id": "level_id"}),
+        ("comp_expectations", {"level_id": "level_id"})
+    ],
+    "employees": [
+        ("assessments", {"employee_id": "employee_id"}),
+        ("comp_assessments", {"employee_id": "employee_id"}),
+        ("notes", {"employee_id": "employee_id"})
+    ]
+}
+
+def _row_key(data_type):
+    """Get the columns identifying a stored row of a data type"""
+    id_column = ID_COLUMNS.get(data_type)
+    if id_column:
+        return [id_column]
+    return KEY_COLUMNS[data_type] + ["organization_id"]
+
+def _in_keys(df, keys):
+    """Build a boolean mask for the rows of df whose key columns match a row of keys"""
+    if keys.empty:
+        return pd.Series(False, index=df.index)
+    columns = list(keys.columns)
+    if len(columns) == 1:
+        return df[columns[0]].isin(keys[columns[0]])
+    rows = pd.MultiIndex.from_frame(df[columns].astype(object))
+    return pd.Series(rows.isin(pd.MultiIndex.from_frame(keys.astype(object))), index=df.index)
+
+def _dependent_rows(parents, data_type, mapping):
+    """Get the rows of a data type that depend on some parent rows through one cascade rule"""
+    # Narrow the candidates down with the first column, then match all of them
+    first = next(iter(mapping))
+    candidates = _find_rows(data_type, {first: parents[mapping[first]].dropna().unique().tolist()})
+    if candidates.empty or any(col not in candidates.columns for col in mapping):
+        return candidates.iloc[0:0]
+    
+    keys = parents[list(mapping.values())].set_axis(list(mapping), axis=1).drop_duplicates()
+    return candidates[_in_keys(candidates, keys)]
+
+def _plan_cascade(data_type, rows):
+    """Collect every row that has to go when some rows of a data type are deleted
     
-    # Get assessments for all team members
-    team_assessments = assessments_df[assessments_df["employee_id"].isin(team_employee_ids)]
+    Follows CASCADE_RULES from the rows to their dependents, their dependents'
+    dependents and so on, reading each dependent table once per rule.
     
-    # Add organization filter if needed
-    if organization_id is not None and "organization_id" in team_assessments.columns:
-        team_assessments = team_assessments[
-            (team_assessments["organization_id"] == organization_id) | 
-            (team_assessments["organization_id"].isna())
-        ]
+    Returns:
+        Dictionary mapping each data type to the frame of its rows to delete,
+        parents before their dependents
+    """
+    plan = {data_type: rows}
+    pending = [(data_type, rows)]
+    while pending:
+        parent_type, parents = pending.pop(0)
+        for child_type, mapping in CASCADE_RULES.get(parent_type, []):
+            children = _dependent_rows(parents, child_type, mapping)
+            if child_type in plan:
+                children = children[~_in_keys(children, plan[child_type][_row_key(child_type)])]
+            if children.empty:
+                continue
+            plan[child_type] = pd.concat([plan[child_type], children], ignore_index=True) if child_type in plan else children
+            pending.append((child_type, children))
+    return plan
+
+def _delete_found_rows(data_type, rows):
+    """Delete rows previously read from a data type, with one write per table
     
-    if team_assessments.empty:
-        return pd.DataFrame()
+    Only the partitions holding the rows are rewritten; backends with row-level
+    writes delete them all in a single transaction.
     
-    # Group by competency, skill and assessment_type and calculate mean
-    means = team_assessments.groupby(["competency", "skill", "assessment_type"])["score"].mean().reset_index()
+    Returns:
+        Number of rows deleted
+    """
+    keys = rows[_row_key(data_type)].drop_duplicates()
+    if keys.empty:
+        return 0
     
-    return means
+    if _storage.supports_row_writes:
+        count = _storage.delete_keys(data_type, keys)
+        invalidate_cache(data_type)
+    else:
+        where = None
+        if "organization_id" in rows.columns:
+            where = {"organization_id": rows["organization_id"].unique().tolist()}
+        count = 0
+        with _storage.lock(data_type):
+            for df, save in _stored_parts(data_type, where):
+                if df.empty or any(col not in df.columns for col in keys.columns):
+                    continue
+                mask = _in_keys(df, keys)
+                if not mask.any():
+                    continue
+                save(df[~mask])
+                count += int(mask.sum())
+    
+    if count and data_type in LATEST_TABLES:
+        _refresh_latest(data_type, keys[ID_COLUMNS[data_type]].tolist())
+    return count
 
-def get_team_competency_means(manager_id, organization_id=None):
-    """Calculate team competency means for a manager's team (separate from skills)
+def cascade_delete(data_type, where):
+    """Delete the rows of a data type matching a filter and every row depending on them
+    
+    All dependent rows are found first, then each table is written once,
+    dependents before the rows they depend on, in a single transaction.
     
     Args:
-        manager_id: ID of the manager
-        organization_id: Optional organization ID to filter data
+        data_type: Data type of the rows to delete
+        where: {column: value} filter selecting the rows to delete
         
     Returns:
-        DataFrame with mean scores by competency and assessment type
+        Dictionary mapping each data type to the number of rows deleted from it
     """
-    # Get employees from the same organization as the manager
-    team_members = get_employees_for_manager(manager_id, organization_id)
-    assessments_df = load_data("assessments")
-    
-    if team_members.empty or assessments_df.empty:
-        return pd.DataFrame()
-    
-    # Extract employee IDs
-    team_employee_ids = team_members["employee_id"].tolist()
-    
-    if not team_employee_ids:
-        return pd.DataFrame()
-    
-    # If no organization_id provided, get it from the manager's record
-    if organization_id is None and manager_id is not None:
-        employees_df = load_data("employees")
-        if not employees_df.empty:
-            manager = employees_df[employees_df["employee_id"] == manager_id]
-            if not manager.empty and "organization_id" in manager.columns:
-                organization_id = manager.iloc[0].get("organization_id")
-    
-    # Get assessments for all team members
-    team_assessments = assessments_df[assessments_df["employee_id"].isin(team_employee_ids)]
-    
-    # Add organization filter if needed
-    if organization_id is not None and "organization_id" in team_assessments.columns:
-        team_assessments = team_assessments[
-            (team_assessments["organization_id"] == organization_id) | 
-            (team_assessments["organization_id"].isna())
-        ]
-    
-    if team_assessments.empty:
-        return pd.DataFrame()
-    
-    # Group by competency only and assessment_type and calculate mean
-    means = team_assessments.groupby(["competency", "assessment_type"])["score"].mean().reset_index()
-    
-    return means
+    rows = _find_rows(data_type, where)
+    if rows.empty:
+        return {}
+    
+    plan = _plan_cascade(data_type, rows)
+    counts = {}
+    with transaction():
+        for plan_type, plan_rows in reversed(list(plan.items())):
+            counts[plan_type] = _delete_found_rows(plan_type, plan_rows)
+    return counts
+
+def _describe_counts(counts):
+    """Describe deleted row counts, such as 3 employees, 40 assessments"""
+    return ", ".join(f"{count} {data_type}" for data_type, count in counts.items() if count)
 
-# Delete functions for each data type
 def delete_record(data_type, record_id):
     """Delete a record from the specified data type by ID"""
     if data_type not in DATA_FILES:
         return False, f"Unknown data type: {data_type}"
     
-    df = load_data(data_type)
-    
-    if df.empty:
-        return False, f"No {data_type} data found"
-    
     # Get the ID column name
     id_column = ID_COLUMNS.get(data_type)
     if id_column is None:
         return False, f"Cannot delete from {data_type} using a simple ID"
     
-    # Check if the record exists
-    if record_id not in df[id_column].values:
+    # Delete the record, checking that it exists
+    if not _delete_rows(data_type, {id_column: record_id}):
+        if load_data(data_type).empty:
+            return False, f"No {data_type} data found"
         return False, f"{data_type} record with ID {record_id} not found"
     
-    # Delete the record
-    df = df[df[id_column] != record_id]
-    save_data(data_type, df)
-    
     return True, f"{data_type} record deleted successfully"
 
 def delete_competency(competency_id):
-    """Delete a competency and all associated skills and expectations"""
-    # First check if there are any skills using this competency
-    skills_df = load_data("skills")
-    has_skills = not skills_df.empty and any(skills_df["competency_id"] == competency_id)
-    
-    # Also check if there are expectations using this competency's name
-    expectations_df = load_data("expectations")
-    comp_expectations_df = load_data("comp_expectations")
-    competency_name = ""
-    
-    competencies_df = load_data("competencies")
-    if not competencies_df.empty:
-        competency = competencies_df[competencies_df["competency_id"] == competency_id]
-        if not competency.empty:
-            competency_name = competency.iloc[0]["name"]
-    
-    has_expectations = not expectations_df.empty and any(expectations_df["competency"] == competency_name)
-    has_comp_expectations = not comp_expectations_df.empty and any(comp_expectations_df["competency"] == competency_name)
-    
-    # Also check if there are assessments using this competency's name
-    assessments_df = load_data("assessments")
-    has_assessments = not assessments_df.empty and any(assessments_df["competency"] == competency_name)
-    
-    # First delete associated skills
-    if has_skills:
-        skills_to_delete = skills_df[skills_df["competency_id"] == competency_id]
-        for _, skill in skills_to_delete.iterrows():
-            delete_skill(skill["skill_id"])
-    
-    # Then delete skill expectations
-    if has_expectations:
-        expectations_df = expectations_df[expectations_df["competency"] != competency_name]
-        save_data("expectations", expectations_df)
-    
-    # Delete competency expectations
-    if has_comp_expectations:
-        comp_expectations_df = comp_expectations_df[comp_expectations_df["competency"] != competency_name]
-        save_data("comp_expectations", comp_expectations_df)
-    
-    # Handle assessments
-    if has_assessments:
-        assessments_df = assessments_df[assessments_df["competency"] != competency_name]
-        save_data("assessments", assessments_df)
-    
-    # Finally delete the competency
-    competencies_df = competencies_df[competencies_df["competency_id"] != competency_id]
-    save_data("competencies", competencies_df)
+    """Delete a competency and all associated skills, expectations and assessments"""
+    if _find_rows("competencies", {"competency_id": competency_id}).empty:
+        if load_data("competencies").empty:
+            return False, "No competencies data found"
+        return False, f"Competency with ID {competency_id} not found"
+    
+    # Delete the competency with its skills and everything referencing either
+    cascade_delete("competencies", {"competency_id": competency_id})
     
     return True, "Competency and related data deleted successfully"
 
 def delete_skill(skill_id):
     """Delete a skill and all associated expectations and assessments"""
-    skills_df = load_data("skills")
-    if skills_df.empty:
-        return False, "No skills data found"
-    
-    # Get the skill name and competency
-    skill = skills_df[skills_df["skill_id"] == skill_id]
-    if skill.empty:
+    # Check if skill exists
+    if _find_rows("skills", {"skill_id": skill_id}).empty:
+        if load_data("skills").empty:
+            return False, "No skills data found"
         return False, f"Skill with ID {skill_id} not found"
     
-    skill_name = skill.iloc[0]["name"]
-    
-    # Check for expectations and assessments using this skill's name
-    expectations_df = load_data("expectations")
-    has_expectations = not expectations_df.empty and any(expectations_df["skill"] == skill_name)
-    
-    assessments_df = load_data("assessments")
-    has_assessments = not assessments_df.empty and any(assessments_df["skill"] == skill_name)
-    
-    # Delete expectations
-    if has_expectations:
-        expectations_df = expectations_df[expectations_df["skill"] != skill_name]
-        save_data("expectations", expectations_df)
-    
-    # Delete assessments
-    if has_assessments:
-        assessments_df = assessments_df[assessments_df["skill"] != skill_name]
-        save_data("assessments", assessments_df)
-    
-    # Delete the skill
-    skills_df = skills_df[skills_df["skill_id"] != skill_id]
-    save_data("skills", skills_df)
+    # Delete the skill with the expectations and assessments referencing it
+    cascade_delete("skills", {"skill_id": skill_id})
     
     return True, "Skill and related data deleted successfully"
 
 def delete_job_level(level_id):
     """Delete a job level and all associated expectations"""
-    levels_df = load_data("levels")
-    if levels_df.empty:
-        return False, "No job levels data found"
-    
     # Get the level name
-    level = levels_df[levels_df["level_id"] == level_id]
+    level = _find_rows("levels", {"level_id": level_id})
     if level.empty:
+        if load_data("levels").empty:
+            return False, "No job levels data found"
         return False, f"Job level with ID {level_id} not found"
     
     level_name = level.iloc[0]["name"]
     
-    # Check for expectations using this level's name
-    expectations_df = load_data("expectations")
-    comp_expectations_df = load_data("comp_expectations")
-    has_expectations = not expectations_df.empty and any(expectations_df["job_level"] == level_name)
-    has_comp_expectations = not comp_expectations_df.empty and any(comp_expectations_df["job_level"] == level_name)
-    
-    # Also check for employees with this job level
-    employees_df = load_data("employees")
-    has_employees = not employees_df.empty and any(employees_df["job_level"] == level_name)
-    
     # Warn if there are employees using this level
-    if has_employees:
+    if not _find_rows("employees", {"job_level": level_name}).empty:
         return False, f"Cannot delete job level '{level_name}' because it is assigned to employees"
     
-    # Delete skill expectations
-    if has_expectations:
-        expectations_df = expectations_df[expectations_df["job_level"] != level_name]
-        save_data("expectations", expectations_df)
-    
-    # Delete competency expectations
-    if has_comp_expectations:
-        comp_expectations_df = comp_expectations_df[comp_expectations_df["job_level"] != level_name]
-        save_data("comp_expectations", comp_expectations_df)
-    
-    # Delete the level
-    levels_df = levels_df[levels_df["level_id"] != level_id]
-    save_data("levels", levels_df)
+    # Delete the level with the skill and competency expectations referencing it
+    cascade_delete("levels", {"level_id": level_id})
     
     return True, "Job level and related data deleted successfully"
 
 def delete_employee(employee_id):
-    """Delete an employee and all associated assessments"""
-    employees_df = load_data("employees")
-    if employees_df.empty:
-        return False, "No employees data found"
-    
+    """Delete an employee and all associated assessments and notes"""
     # Check if employee exists
-    employee = employees_df[employees_df["employee_id"] == employee_id]
+    employee = _find_rows("employees", {"employee_id": employee_id})
     if employee.empty:
+        if load_data("employees").empty:
+            return False, "No employees data found"
         return False, f"Employee with ID {employee_id} not found"
     
     # Check if there are other employees with this as manager
-    has_subordinates = not employees_df.empty and any(employees_df["manager_id"] == employee_id)
-    if has_subordinates:
+    if not _find_rows("employees", {"manager_id": employee_id}).empty:
         return False, f"Cannot delete employee because they are assigned as a manager"
     
-    # Delete assessments
-    assessments_df = load_data("assessments")
-    if not assessments_df.empty:
-        assessments_df = assessments_df[assessments_df["employee_id"] != employee_id]
-        save_data("assessments", assessments_df)
-    
-    # Delete the employee
-    employees_df = employees_df[employees_df["employee_id"] != employee_id]
-    save_data("employees", employees_df)
+    # Delete the employee with their assessments and notes
+    cascade_delete("employees", {"employee_id": employee_id})
     
     return True, "Employee and related data deleted successfully"
 
-def delete_expectation(job_level, competency, skill):
-    """Delete a specific skill expectation"""
-    expectations_df = load_data("expectations")
-    if expectations_df.empty:
-        return False, "No expectations data found"
-    
-    # Find the specific expectation
-    filtered = expectations_df[
-        (expectations_df["job_level"] == job_level) & 
-        (expectations_df["competency"] == competency) & 
-        (expectations_df["skill"] == skill)
-    ]
-    
-    if filtered.empty:
+def delete_expectation(job_level, competency, skill, organization_id=None):
+    """Delete a specific skill expectation, named by job level, competency and skill"""
+    key = _framework_ids(organization_id, job_level=job_level, competency=competency, skill=skill)
+    if key is None or not _delete_rows("expectations", key):
+        if load_data("expectations").empty:
+            return False, "No expectations data found"
         return False, "Expectation not found"
     
-    # Delete the expectation
-    expectations_df = expectations_df.drop(filtered.index)
-    save_data("expectations", expectations_df)
-    
     return True, "Expectation deleted successfully"
 
-def delete_competency_expectation(job_level, competency):
-    """Delete a specific competency expectation"""
-    comp_expectations_df = load_data("comp_expectations")
-    if comp_expectations_df.empty:
-        return False, "No competency expectations data found"
-    
-    # Find the specific expectation
-    filtered = comp_expectations_df[
-        (comp_expectations_df["job_level"] == job_level) & 
-        (comp_expectations_df["competency"] == competency)
-    ]
-    
-    if filtered.empty:
+def delete_competency_expectation(job_level, competency, organization_id=None):
+    """Delete a specific competency expectation, named by job level and competency"""
+    key = _framework_ids(organization_id, job_level=job_level, competency=competency)
+    if key is None or not _delete_rows("comp_expectations", key):
+        if load_data("comp_expectations").empty:
+            return False, "No competency expectations data found"
         return False, "Competency expectation not found"
     
-    # Delete the expectation
-    comp_expectations_df = comp_expectations_df.drop(filtered.index)
-    save_data("comp_expectations", comp_expectations_df)
-    
     return True, "Competency expectation deleted successfully"
 
 def delete_assessment(assessment_id):
     """Delete a specific assessment"""
-    assessments_df = load_data("assessments")
-    if assessments_df.empty:
-        return False, "No assessments data found"
-    
-    # Check if assessment exists
-    assessment = assessments_df[assessments_df["assessment_id"] == assessment_id]
-    if assessment.empty:
+    if not _delete_rows("assessments", {"assessment_id": assessment_id}):
+        if load_data("assessments").empty:
+            return False, "No assessments data found"
         return False, f"Assessment with ID {assessment_id} not found"
     
-    # Delete the assessment
-    assessments_df = assessments_df[assessments_df["assessment_id"] != assessment_id]
-    save_data("assessments", assessments_df)
-    
     return True, "Assessment deleted successfully"
 
-def update_competency(competency_id, name=None, description=None):
-    """Update a competency's details"""
-    competencies_df = load_data("competencies")
-    if competencies_df.empty:
-        return False, "No competencies data found"
+def update_competency(competency_id, name=None, description=None, expected_version=None):
+    """Update a competency's details
     
+    Raises:
+        ConflictError: If the competency was changed since expected_version
+    """
     # Check if competency exists
-    competency = competencies_df[competencies_df["competency_id"] == competency_id]
+    competency = _find_rows("competencies", {"competency_id": competency_id})
     if competency.empty:
+        if load_data("competencies").empty:
+            return False, "No competencies data found"
         return False, f"Competency with ID {competency_id} not found"
     
-    # Get the current name for reference
-    old_name = competency.iloc[0]["name"]
-    
-    # Update the competency
+    # Update the competency; expectations and assessments reference it by ID
+    changes = {}
     if name is not None:
-        competencies_df.loc[competency.index, "name"] = name
+        changes["name"] = name
     
     if description is not None:
-        competencies_df.loc[competency.index, "description"] = description
-    
-    save_data("competencies", competencies_df)
-    
-    # If name changed, update related records
-    if name is not None and name != old_name:
-        # Update skill expectations
-        expectations_df = load_data("expectations")
-        if not expectations_df.empty:
-            expectations_df.loc[expectations_df["competency"] == old_name, "competency"] = name
-            save_data("expectations", expectations_df)
-        
-        # Update competency expectations
-        comp_expectations_df = load_data("comp_expectations")
-        if not comp_expectations_df.empty:
-            comp_expectations_df.loc[comp_expectations_df["competency"] == old_name, "competency"] = name
-            save_data("comp_expectations", comp_expectations_df)
-        
-        # Update assessments
-        assessments_df = load_data("assessments")
-        if not assessments_df.empty:
-            assessments_df.loc[assessments_df["competency"] == old_name, "competency"] = name
-            save_data("assessments", assessments_df)
+        changes["description"] = description
+    
+    if changes:
+        _update_rows("competencies", {"competency_id": competency_id}, changes, expected_version)
     
     return True, "Competency updated successfully"
 
-def update_skill(skill_id, name=None, description=None):
-    """Update a skill's details"""
-    skills_df = load_data("skills")
-    if skills_df.empty:
-        return False, "No skills data found"
+def update_skill(skill_id, name=None, description=None, expected_version=None):
+    """Update a skill's details
     
+    Raises:
+        ConflictError: If the skill was changed since expected_version
+    """
     # Check if skill exists
-    skill = skills_df[skills_df["skill_id"] == skill_id]
+    skill = _find_rows("skills", {"skill_id": skill_id})
     if skill.empty:
+        if load_data("skills").empty:
+            return False, "No skills data found"
         return False, f"Skill with ID {skill_id} not found"
     
-    # Get the current name for reference
-    old_name = skill.iloc[0]["name"]
-    
-    # Update the skill
+    # Update the skill; expectations and assessments reference it by ID
+    changes = {}
     if name is not None:
-        skills_df.loc[skill.index, "name"] = name
+        changes["name"] = name
     
     if description is not None:
-        skills_df.loc[skill.index, "description"] = description
-    
-    save_data("skills", skills_df)
+        changes["description"] = description
     
-    # If name changed, update related records
-    if name is not None and name != old_name:
-        # Update expectations
-        expectations_df = load_data("expectations")
-        if not expectations_df.empty:
-            expectations_df.loc[expectations_df["skill"] == old_name, "skill"] = name
-            save_data("expectations", expectations_df)
-        
-        # Update assessments
-        assessments_df = load_data("assessments")
-        if not assessments_df.empty:
-            assessments_df.loc[assessments_df["skill"] == old_name, "skill"] = name
-            save_data("assessments", assessments_df)
+    if changes:
+        _update_rows("skills", {"skill_id": skill_id}, changes, expected_version)
     
     return True, "Skill updated successfully"
 
-def update_job_level(level_id, name=None, description=None):
-    """Update a job level's details"""
-    levels_df = load_data("levels")
-    if levels_df.empty:
-        return False, "No job levels data found"
+def update_job_level(level_id, name=None, description=None, expected_version=None):
+    """Update a job level's details
     
+    Raises:
+        ConflictError: If the job level was changed since expected_version
+    """
     # Check if level exists
-    level = levels_df[levels_df["level_id"] == level_id]
+    level = _find_rows("levels", {"level_id": level_id})
     if level.empty:
+        if load_data("levels").empty:
+            return False, "No job levels data found"
         return False, f"Job level with ID {level_id} not found"
     
     # Get the current name for reference
     old_name = level.iloc[0]["name"]
     
     # Update the level
+    changes = {}
     if name is not None:
-        levels_df.loc[level.index, "name"] = name
+        changes["name"] = name
     
     if description is not None:
-        levels_df.loc[level.index, "description"] = description
+        changes["description"] = description
     
-    save_data("levels", levels_df)
-    
-    # If name changed, update related records
-    if name is not None and name != old_name:
-        # Update skill expectations
-        expectations_df = load_data("expectations")
-        if not expectations_df.empty:
-            expectations_df.loc[expectations_df["job_level"] == old_name, "job_level"] = name
-            save_data("expectations", expectations_df)
-        
-        # Update competency expectations
-        comp_expectations_df = load_data("comp_expectations")
-        if not comp_expectations_df.empty:
-            comp_expectations_df.loc[comp_expectations_df["job_level"] == old_name, "job_level"] = name
-            save_data("comp_expectations", comp_expectations_df)
+    # Commit the level and the employees referencing it by name together
+    # (expectations reference it by ID)
+    with transaction():
+        if changes:
+            _update_rows("levels", {"level_id": level_id}, changes, expected_version)
         
-        # Update employees
-        employees_df = load_data("employees")
-        if not employees_df.empty:
-            employees_df.loc[employees_df["job_level"] == old_name, "job_level"] = name
-            save_data("employees", employees_df)
+        # If name changed, update related records
+        if name is not None and name != old_name:
+            _update_rows("employees", {"job_level": old_name}, {"job_level": name})
     
     return True, "Job level updated successfully"
 
-def update_employee(employee_id, name=None, email=None, job_title=None, job_level=None, department=None, manager_id=None):
-    """Update an employee's details"""
-    employees_df = load_data("employees")
-    if employees_df.empty:
-        return False, "No employees data found"
+def update_employee(employee_id, name=None, email=None, job_title=None, job_level=None, department=None, manager_id=None,
+                    expected_version=None):
+    """Update an employee's details
     
+    Raises:
+        ConflictError: If the employee was changed since expected_version
+    """
     # Check if employee exists
-    employee = employees_df[employees_df["employee_id"] == employee_id]
+    employee = _find_rows("employees", {"employee_id": employee_id})
     if employee.empty:
+        if load_data("employees").empty:
+            return False, "No employees data found"
         return False, f"Employee with ID {employee_id} not found"
     
     # Update the employee fields that are provided
+    changes = {}
     if name is not None:
-        employees_df.loc[employee.index, "name"] = name
+        changes["name"] = name
     
     if email is not None:
-        employees_df.loc[employee.index, "email"] = email
+        changes["email"] = email
     
     if job_title is not None:
-        employees_df.loc[employee.index, "job_title"] = job_title
+        changes["job_title"] = job_title
     
     if job_level is not None:
-        employees_df.loc[employee.index, "job_level"] = job_level
+        changes["job_level"] = job_level
     
     if department is not None:
-        employees_df.loc[employee.index, "department"] = department
+        changes["department"] = department
     
     if manager_id is not None:
         # Check that we're not creating a circular management relationship
         if manager_id == employee_id:
             return False, "An employee cannot be their own manager"
-        employees_df.loc[employee.index, "manager_id"] = manager_id
+        changes["manager_id"] = manager_id
     
-    save_data("employees", employees_df)
+    if changes:
+        _update_rows("employees", {"employee_id": employee_id}, changes, expected_version)
     return True, "Employee updated successfully"
 
 # Competency Assessment functions
 def add_competency_assessment(employee_id, competency, score, assessment_type, notes="", organization_id=None):
     """Add a new competency assessment"""
-    comp_assessments_df = load_data("comp_assessments")
-    
     # Get employee's organization if not provided
     if organization_id is None and employee_id is not None:
-        employees_df = load_data("employees")
-        if not employees_df.empty:
-            employee = employees_df[employees_df["employee_id"] == employee_id]
-            if not employee.empty and "organization_id" in employee.columns:
-                organization_id = employee.iloc[0].get("organization_id")
+        employee = _find_rows("employees", {"employee_id": employee_id})
+        if not employee.empty and "organization_id" in employee.columns:
+            organization_id = employee.iloc[0].get("organization_id")
     
-    # Generate new assessment ID
-    if comp_assessments_df.empty:
-        new_id = 1
-    else:
-        new_id = comp_assessments_df["assessment_id"].max() + 1
+    ids = _framework_ids(organization_id, competency=competency)
+    if ids is None:
+        return False, f"Unknown competency: {competency}", None
     
     # Add new assessment
     new_assessment = pd.DataFrame({
-        "assessment_id": [new_id],
         "employee_id": [employee_id],
-        "competency": [competency],
+        "competency_id": [ids["competency_id"]],
         "score": [score],
         "assessment_type": [assessment_type],
         "assessment_date": [datetime.now().strftime("%Y-%m-%d")],
@@ -1095,10 +2853,32 @@ def add_competency_assessment(employee_id, competency, score, assessment_type, n
         "organization_id": [organization_id]
     })
     
-    comp_assessments_df = pd.concat([comp_assessments_df, new_assessment], ignore_index=True)
-    save_data("comp_assessments", comp_assessments_df)
+    new_id = _append_rows("comp_assessments", new_assessment)[0]
     return True, "Competency assessment added successfully", new_id
 
+def add_competency_assessments_bulk(records):
+    """Add several competency assessments with a single write
+    
+    All records are validated before anything is stored, so either every
+    assessment is added or none is.
+    
+    Args:
+        records: List of dicts with employee_id, competency, score, assessment_type
+                 and optionally notes and organization_id
+        
+    Returns:
+        Tuple of (success, message, list of new assessment IDs)
+    """
+    if not records:
+        return False, "No competency assessments to add", []
+    
+    rows_df, error = _build_assessment_rows("comp_assessments", records, ["competency"])
+    if error:
+        return False, error, []
+    
+    new_ids = _append_rows("comp_assessments", rows_df)
+    return True, f"{len(new_ids)} competency assessments added successfully", new_ids
+
 def get_employee_competency_assessments(employee_id, assessment_type=None, organization_id=None):
     """Get all competency assessments for an employee
     
@@ -1110,34 +2890,22 @@ def get_employee_competency_assessments(employee_id, assessment_type=None, organ
     Returns:
         DataFrame of competency assessments
     """
-    comp_assessments_df = load_data("comp_assessments")
-    
-    if comp_assessments_df.empty:
-        return pd.DataFrame()
-    
     # If no organization_id provided, get it from the employee record
-    if organization_id is None and employee_id is not None:
-        employees_df = load_data("employees")
-        if not employees_df.empty:
-            employee = employees_df[employees_df["employee_id"] == employee_id]
-            if not employee.empty and "organization_id" in employee.columns:
-                organization_id = employee.iloc[0].get("organization_id")
+    organization_id = _assessment_organization(employee_id, organization_id)
     
     # Base filter is always by employee ID
-    filtered = comp_assessments_df[comp_assessments_df["employee_id"] == employee_id]
+    filters = {"employee_id": employee_id}
     
     # Add assessment type filter if provided
     if assessment_type:
-        filtered = filtered[filtered["assessment_type"] == assessment_type]
+        filters["assessment_type"] = assessment_type
     
-    # Add organization filter if organization_id column exists
-    if organization_id is not None and "organization_id" in filtered.columns:
-        filtered = filtered[
-            (filtered["organization_id"] == organization_id) | 
-            (filtered["organization_id"].isna())
-        ]
+    # Add organization filter, keeping assessments without an organization
+    if organization_id is not None:
+        filters["organization_id"] = [organization_id, None]
     
-    return filtered
+    # Only the matching rows are read
+    return load_data("comp_assessments", filters=filters)
 
 def get_latest_competency_assessment(employee_id, competency, assessment_type, organization_id=None):
     """Get the latest assessment for a specific competency
@@ -1151,125 +2919,111 @@ def get_latest_competency_assessment(employee_id, competency, assessment_type, o
     Returns:
         Latest assessment record or None if not found
     """
-    comp_assessments_df = load_data("comp_assessments")
-    
-    if comp_assessments_df.empty:
+    ids = _framework_ids(_assessment_organization(employee_id, organization_id), competency=competency)
+    if ids is None:
         return None
     
-    # If no organization_id provided, get it from the employee record
-    if organization_id is None and employee_id is not None:
-        employees_df = load_data("employees")
-        if not employees_df.empty:
-            employee = employees_df[employees_df["employee_id"] == employee_id]
-            if not employee.empty and "organization_id" in employee.columns:
-                organization_id = employee.iloc[0].get("organization_id")
-    
-    # Base filter conditions
-    conditions = [
-        (comp_assessments_df["employee_id"] == employee_id),
-        (comp_assessments_df["competency"] == competency),
-        (comp_assessments_df["assessment_type"] == assessment_type)
-    ]
-    
-    # Add organization filter if needed
-    if organization_id is not None and "organization_id" in comp_assessments_df.columns:
-        conditions.append(
-            (comp_assessments_df["organization_id"] == organization_id) | 
-            (comp_assessments_df["organization_id"].isna())
-        )
-    
-    # Apply all filters
-    relevant = comp_assessments_df[pd.Series(True, index=comp_assessments_df.index)]
-    for condition in conditions:
-        relevant = relevant[condition]
+    # Only the latest scores table needs to be searched, not the full history
+    relevant = _latest_rows("comp_assessments", {
+        "employee_id": employee_id,
+        **ids,
+        "assessment_type": assessment_type
+    })
     
-    if relevant.empty:
+    latest = _select_latest(
+        relevant,
+        ["employee_id", "competency_id", "assessment_type"],
+        [employee_id], assessment_type, organization_id
+    )
+    if latest.empty:
         return None
+    return _with_names("comp_assessments", latest).iloc[0]
+
+def get_latest_competency_assessments(employee_ids, assessment_type=None, organization_id=None):
+    """Get the latest competency assessment of several employees in one pass
     
-    # Sort by date and get most recent
-    relevant["assessment_date"] = pd.to_datetime(relevant["assessment_date"])
-    latest = relevant.sort_values("assessment_date", ascending=False).iloc[0]
-    return latest
+    Args:
+        employee_ids: Employee ID or list of employee IDs (None for all employees)
+        assessment_type: Optional filter for assessment type (self/manager)
+        organization_id: Optional organization ID to filter assessments. If not
+                         provided, each employee's own organization is used.
+        
+    Returns:
+        DataFrame with the latest competency assessment record for every
+        (employee_id, competency, assessment_type)
+    """
+    where = None if employee_ids is None else {"employee_id": _id_list(employee_ids)}
+    latest = _select_latest(
+        _latest_rows("comp_assessments", where),
+        ["employee_id", "competency_id", "assessment_type"],
+        employee_ids, assessment_type, organization_id
+    )
+    return _with_names("comp_assessments", latest)
 
 def calculate_employee_comp_assessment_means(employee_id):
     """Calculate the mean scores for competency assessments"""
-    comp_assessments_df = load_data("comp_assessments")
-    
-    if comp_assessments_df.empty:
-        return pd.DataFrame()
-    
-    employee_assessments = comp_assessments_df[comp_assessments_df["employee_id"] == employee_id]
+    employee_assessments = load_data(
+        "comp_assessments",
+        columns=["competency", "assessment_type", "score"],
+        filters={"employee_id": employee_id}
+    )
     
     if employee_assessments.empty:
         return pd.DataFrame()
     
     # Group by competency and assessment_type and calculate mean
-    means = employee_assessments.groupby(["competency", "assessment_type"])["score"].mean().reset_index()
+    means = employee_assessments.groupby(["competency", "assessment_type"], observed=True)["score"].mean().reset_index()
     
     return means
 
-def get_team_comp_assessment_means(manager_id):
+def get_team_comp_assessment_means(manager_id, include_indirect=False):
     """Calculate team competency assessment means for a manager's team"""
-    employees_df = load_data("employees")
-    comp_assessments_df = load_data("comp_assessments")
-    
-    if employees_df.empty or comp_assessments_df.empty:
-        return pd.DataFrame()
-    
     # Get all employees under this manager
-    team_employees = employees_df[employees_df["manager_id"] == manager_id]["employee_id"].tolist()
+    hierarchy = get_reporting_hierarchy()
+    if include_indirect:
+        team_employees = hierarchy.descendants(manager_id)
+    else:
+        team_employees = hierarchy.direct_reports(manager_id)
     
     if not team_employees:
         return pd.DataFrame()
     
     # Get assessments for all team members
-    team_assessments = comp_assessments_df[comp_assessments_df["employee_id"].isin(team_employees)]
+    team_assessments = load_data(
+        "comp_assessments",
+        columns=["competency", "assessment_type", "score"],
+        filters={"employee_id": team_employees}
+    )
     
     if team_assessments.empty:
         return pd.DataFrame()
     
     # Group by competency and assessment_type and calculate mean
-    means = team_assessments.groupby(["competency", "assessment_type"])["score"].mean().reset_index()
+    means = team_assessments.groupby(["competency", "assessment_type"], observed=True)["score"].mean().reset_index()
     
     return means
 
 def delete_competency_assessment(assessment_id):
     """Delete a specific competency assessment"""
-    comp_assessments_df = load_data("comp_assessments")
-    
-    if comp_assessments_df.empty:
-        return False, "No competency assessment found"
-    
-    if assessment_id not in comp_assessments_df["assessment_id"].values:
+    if not _delete_rows("comp_assessments", {"assessment_id": assessment_id}):
+        if load_data("comp_assessments").empty:
+            return False, "No competency assessment found"
         return False, f"Competency assessment with ID {assessment_id} not found"
     
-    comp_assessments_df = comp_assessments_df[comp_assessments_df["assessment_id"] != assessment_id]
-    save_data("comp_assessments", comp_assessments_df)
-    
     return True, "Competency assessment deleted successfully"
 
 
 # Organization functions
 def add_organization(name, created_by):
     """Add a new organization"""
-    organizations_df = load_data("organizations")
-    
-    # Generate new organization ID
-    if organizations_df.empty:
-        new_id = 1
-    else:
-        new_id = organizations_df["organization_id"].max() + 1
-    
     # Add new organization
     new_organization = pd.DataFrame({
-        "organization_id": [new_id],
         "name": [name],
         "created_by": [created_by],
         "created_at": [datetime.now().strftime("%Y-%m-%d")]
     })
     
-    organizations_df = pd.concat([organizations_df, new_organization], ignore_index=True)
-    save_data("organizations", organizations_df)
+    new_id = _append_rows("organizations", new_organization)[0]
     return True, "Organization added successfully", new_id
 
 def get_organization(organization_id):
@@ -1336,25 +3090,44 @@ def get_user_organizations(username):
     # If no organizations found, return empty DataFrame
     return pd.DataFrame()
 
-def update_organization(organization_id, name=None):
-    """Update an organization's details"""
-    organizations_df = load_data("organizations")
-    
-    if organizations_df.empty:
-        return False, "No organizations found"
+def update_organization(organization_id, name=None, expected_version=None):
+    """Update an organization's details
     
+    Raises:
+        ConflictError: If the organization was changed since expected_version
+    """
     # Check if organization exists
-    organization_mask = organizations_df["organization_id"] == organization_id
-    if not any(organization_mask):
+    if _find_rows("organizations", {"organization_id": organization_id}).empty:
+        if load_data("organizations").empty:
+            return False, "No organizations found"
         return False, f"Organization with ID {organization_id} not found"
     
     # Update fields if provided
     if name is not None:
-        organizations_df.loc[organization_mask, "name"] = name
+        _update_rows("organizations", {"organization_id": organization_id}, {"name": name}, expected_version)
     
-    save_data("organizations", organizations_df)
     return True, "Organization updated successfully"
 
+def _drop_partition(data_type, organization_id):
+    """Delete every row of one organization from a partitioned data type
+    
+    Returns:
+        Number of rows deleted
+    """
+    if _storage.supports_row_writes:
+        return _delete_rows(data_type, {"organization_id": organization_id})
+    
+    with _storage.lock(data_type):
+        count = len(_read_partition(data_type, organization_id))
+        if count:
+            _storage.drop_partition(data_type, organization_id)
+            invalidate_cache(data_type)
+    
+    # The latest scores are keyed by organization too, so their partition goes as a whole
+    if count and data_type in LATEST_TABLES:
+        _drop_partition(LATEST_TABLES[data_type][0], organization_id)
+    return count
+
 def delete_organization(organization_id, force_delete=False):
     """Delete an organization
     
@@ -1365,16 +3138,6 @@ def delete_organization(organization_id, force_delete=False):
     Returns:
         Tuple of (success, message)
     """
-    # Check if this organization has associated records
-    employees_df = load_data("employees")
-    competencies_df = load_data("competencies")
-    skills_df = load_data("skills")
-    job_levels_df = load_data("levels")
-    assessments_df = load_data("assessments")
-    competency_assessments_df = load_data("comp_assessments")
-    expectations_df = load_data("expectations")
-    competency_expectations_df = load_data("comp_expectations")
-    
     # Convert organization_id to int for consistent comparison
     try:
         # Handle potential float strings like '1.0'
@@ -1387,87 +3150,37 @@ def delete_organization(organization_id, force_delete=False):
     except (ValueError, TypeError) as e:
         return False, f"Invalid organization ID format: {str(e)}"
     
-    # Helper function to safely compare organization IDs
-    def compare_org_ids(df_col, org_id):
-        if df_col.empty:
-            return False
-            
-        # Handle various data types that might be in the column
-        try:
-            # First convert to float to handle potential decimal values
-            return any(df_col.astype(float).astype(int) == org_id)
-        except (ValueError, TypeError):
-            try:
-                # Try direct string comparison if numeric conversion fails
-                return any(df_col.astype(str).str.replace('.0', '') == str(org_id))
-            except:
-                return False
-    
-    # Check if organization has associated records
-    has_employees = not employees_df.empty and "organization_id" in employees_df.columns and compare_org_ids(employees_df["organization_id"], organization_id)
-    has_competencies = not competencies_df.empty and "organization_id" in competencies_df.columns and compare_org_ids(competencies_df["organization_id"], organization_id)
-    has_skills = not skills_df.empty and "organization_id" in skills_df.columns and compare_org_ids(skills_df["organization_id"], organization_id)
-    has_job_levels = not job_levels_df.empty and "organization_id" in job_levels_df.columns and compare_org_ids(job_levels_df["organization_id"], organization_id)
-    has_assessments = not assessments_df.empty and "organization_id" in assessments_df.columns and compare_org_ids(assessments_df["organization_id"], organization_id)
-    has_comp_assessments = not competency_assessments_df.empty and "organization_id" in competency_assessments_df.columns and compare_org_ids(competency_assessments_df["organization_id"], organization_id)
+    # Check if organization has associated records, reading only its own partitions
+    checked_types = ["employees", "competencies", "skills", "levels", "assessments", "comp_assessments"]
+    has_records = any(not _read_partition(data_type, organization_id).empty for data_type in checked_types)
     
     # If there are associated records and force_delete is False, prevent deletion
-    if (has_employees or has_competencies or has_skills or has_job_levels or has_assessments or has_comp_assessments) and not force_delete:
+    if has_records and not force_delete:
         return False, "Cannot delete organization because it has associated records. Use force_delete to remove all associated data."
     
-    # If force_delete is True, delete all associated records
-    if force_delete:
-        # Helper function to filter dataframes by organization ID
-        def filter_by_org_id(df, org_id, match=True):
-            if df.empty or "organization_id" not in df.columns:
-                return df
-                
-            # Create a mask for records matching or not matching the organization ID
-            try:
-                # First try as float to handle decimal values
-                mask = df["organization_id"].astype(float).astype(int) == org_id
-            except:
-                try:
-                    # Try with string replacement if numeric conversion fails
-                    mask = df["organization_id"].astype(str).str.replace('.0', '') == str(org_id)
-                except:
-                    # Fall back to empty mask if all else fails
-                    mask = pd.Series(False, index=df.index)
+    # If force_delete is True, delete all associated records by dropping the
+    # organization's partition of every data type
+    counts = {}
+    with transaction():
+        if force_delete:
+            competency_ids = _read_partition("competencies", organization_id)["competency_id"]
+            derived_types = {latest_type for latest_type, _ in LATEST_TABLES.values()}
+            for data_type in PARTITIONED_TYPES:
+                count = _drop_partition(data_type, organization_id)
+                if data_type not in derived_types:
+                    counts[data_type] = count
             
-            # Return matching or non-matching records based on the match parameter
-            return df[mask] if match else df[~mask]
-            
-        # Delete employees and their assessments
-        if has_employees:
-            # Get all employee IDs in this organization
-            org_employees = filter_by_org_id(employees_df, organization_id)
-            for _, employee in org_employees.iterrows():
-                delete_employee(employee["employee_id"])
-        
-        # Delete competencies and their skills
-        if has_competencies:
-            org_competencies = filter_by_org_id(competencies_df, organization_id)
-            for _, competency in org_competencies.iterrows():
-                delete_competency(competency["competency_id"])
-        
-        # Delete job levels
-        if has_job_levels:
-            org_levels = filter_by_org_id(job_levels_df, organization_id)
-            for _, level in org_levels.iterrows():
-                delete_job_level(level["level_id"])
-        
-        # Delete any remaining assessments
-        if has_assessments:
-            assessments_df = filter_by_org_id(assessments_df, organization_id, match=False)
-            save_data("assessments", assessments_df)
-        
-        # Delete any remaining competency assessments
-        if has_comp_assessments:
-            competency_assessments_df = filter_by_org_id(competency_assessments_df, organization_id, match=False)
-            save_data("comp_assessments", competency_assessments_df)
-    
-    # Now delete the organization record
-    return delete_record("organizations", organization_id)
+            # Skills without an organization belong to the organization of their competency
+            unassigned = _read_partition("skills", None)
+            if not unassigned.empty:
+                unassigned = unassigned[unassigned["competency_id"].isin(competency_ids)]
+                counts["skills"] += _delete_found_rows("skills", unassigned)
+        
+        # Now delete the organization record
+        success, message = delete_record("organizations", organization_id)
+    if success and any(counts.values()):
+        message = f"Organization deleted along with {_describe_counts(counts)}"
+    return success, message
 
 def update_csv_structure(data_type, add_columns):
     """Add new columns to a CSV file structure
@@ -1480,7 +3193,7 @@ def update_csv_structure(data_type, add_columns):
         Success status and message
     """
     try:
-        df = load_data(data_type)
+        df = _load_table(data_type)
         
         # Check if columns already exist
         existing_columns = set(df.columns)
@@ -1495,48 +3208,179 @@ def update_csv_structure(data_type, add_columns):
             df[col] = add_columns[col]
         
         # Save the updated dataframe
-        save_data(data_type, df)
+        _write_table(data_type, df)
         return True, f"Added columns {', '.join(columns_to_add)} to {data_type}"
     
     except Exception as e:
         return False, f"Error updating {data_type} structure: {str(e)}"
 
-def update_schema_for_organizations():
-    """Update the schema of all relevant data types to include organization_id field
-    
-    This ensures all data structures can be properly associated with an organization.
-    """
+# Schema migrations
+
+def _migrate_add_missing_columns():
+    """Add every column in TABLE_COLUMNS that a stored table doesn't have yet"""
     results = []
+    migrated = set()
+    for data_type, columns in TABLE_COLUMNS.items():
+        table_key = _storage.table_key(data_type)
+        if table_key in migrated:
+            continue
+        migrated.add(table_key)
+        
+        stored_columns = _load_table(data_type).columns
+        missing = {col: None for col in columns if col not in stored_columns}
+        if missing:
+            success, message = update_csv_structure(data_type, missing)
+            if not success:
+                raise RuntimeError(message)
+            results.append(message)
+    return results
+
+def _migrate_split_partitions():
+    """Move each organization's rows into its own partition"""
+    for data_type in PARTITIONED_TYPES:
+        _storage.split_partitions(data_type)
+        invalidate_cache(data_type)
+    return [f"Split {len(PARTITIONED_TYPES)} data types into organization partitions"]
+
+def _migrate_build_latest_scores():
+    """Build the latest scores tables from the assessment history"""
+    counts = rebuild_latest_scores()
+    return [f"Built {latest_type} with {count} rows" for latest_type, count in counts.items()]
+
+def _migrate_row_versions():
+    """Give every row of the versioned data types its first version"""
+    results = []
+    for data_type in VERSIONED_TYPES:
+        df = _load_table(data_type)
+        if "version" in df.columns and not df["version"].isna().any():
+            continue
+        _write_table(data_type, _new_versions(data_type, df))
+        results.append(f"Added row versions to {data_type}")
+    return results
+
+def _migrate_reference_ids():
+    """Replace the competency, skill and job level names stored in expectations
+    and assessments with the IDs of the items they name"""
+    results = []
+    organization_ids = _load_table("organizations")["organization_id"].dropna().astype("Int64")
+    employee_orgs = _load_table("employees").drop_duplicates("employee_id").set_index("employee_id")["organization_id"]
+    
+    for data_type in ["expectations", "comp_expectations", "assessments", "comp_assessments"]:
+        references = REFERENCE_COLUMNS[data_type]
+        df = _load_table(data_type)
+        name_columns = [name for name, _ in references.values() if name in df.columns]
+        if not name_columns:
+            continue
+        
+        if data_type in ("expectations", "comp_expectations"):
+            # Shared expectations applied to every organization by name, so
+            # they become a copy per organization that has the named items
+            shared = df["organization_id"].isna()
+            copies = df[shared].drop(columns="organization_id").merge(
+                pd.DataFrame({"organization_id": organization_ids}), how="cross"
+            )
+            df = pd.concat([df[~shared], copies, df[shared]], ignore_index=True)
+            is_copy = pd.Series(False, index=df.index)
+            is_copy.iloc[(~shared).sum():(~shared).sum() + len(copies)] = True
+            lookup = df
+        else:
+            # Assessments are looked up in their employee's organization
+            is_copy = pd.Series(False, index=df.index)
+            lookup = df.copy()
+            lookup["organization_id"] = lookup["organization_id"].astype("Int64").fillna(
+                lookup["employee_id"].map(employee_orgs).astype("Int64")
+            )
+        
+        id_columns = list(references)
+        df[id_columns] = _with_ids(data_type, lookup)[id_columns]
+        resolved = df[id_columns].notna().all(axis=1)
+        # Copies for organizations without the named items aren't data loss
+        dropped = int((~resolved & ~is_copy).sum())
+        df = df[resolved].drop(columns=name_columns)
+        
+        # Organizations' own expectations win over the copies of shared ones,
+        # which win over shared rows that only matched by name
+        key_columns = KEY_COLUMNS.get(data_type)
+        if key_columns:
+            df = df.drop_duplicates(key_columns)
+        
+        columns = [col for col in TABLE_COLUMNS[data_type] if col in df.columns]
+        df = apply_schema(df[columns + [col for col in df.columns if col not in columns]], TABLE_SCHEMAS[data_type])
+        _storage.replace_table(data_type, df.reset_index(drop=True))
+        invalidate_cache(data_type)
+        
+        message = f"Replaced names with IDs in {data_type}"
+        if dropped:
+            message += f" (dropped {dropped} rows naming unknown items)"
+        results.append(message)
+    return results
+
+def _migrate_rebuild_latest_scores():
+    """Rebuild the latest scores tables keyed by the ID columns
+    
+    Migration 3 built them before migration 5 filled the competency and skill
+    IDs, keying every score by missing IDs."""
+    for latest_type in sorted({latest_type for latest_type, _ in LATEST_TABLES.values()}):
+        _storage.replace_table(latest_type, _empty_frame(latest_type))
+        invalidate_cache(latest_type)
+    counts = rebuild_latest_scores()
+    return [f"Rebuilt {latest_type} with {count} rows" for latest_type, count in counts.items()]
+
+# Ordered list of (version, description, function). Append new migrations with
+# the next version number; never renumber or edit one that has shipped.
+MIGRATIONS = [
+    (1, "Add missing columns (organization_id etc.)", _migrate_add_missing_columns),
+    (2, "Split organization partitions", _migrate_split_partitions),
+    (3, "Build latest scores tables", _migrate_build_latest_scores),
+    (4, "Add row versions", _migrate_row_versions),
+    (5, "Reference framework items by ID", _migrate_reference_ids),
+    (6, "Rebuild latest scores tables by ID", _migrate_rebuild_latest_scores)
+]
+
+SCHEMA_VERSION = MIGRATIONS[-1][0]
+
+def get_schema_version():
+    """Get the schema version the stored data was migrated to"""
+    return _storage.schema_version()
+
+_recovered = False
+
+def run_migrations():
+    """Bring the stored data up to SCHEMA_VERSION
     
-    # Primary entity schemas
-    success, message = update_csv_structure("employees", {"organization_id": None})
-    results.append(f"Employees: {message}")
-    
-    success, message = update_csv_structure("competencies", {"organization_id": None})
-    results.append(f"Competencies: {message}")
-    
-    success, message = update_csv_structure("levels", {"organization_id": None})
-    results.append(f"Job Levels: {message}")
-    
-    # Assessment schemas
-    success, message = update_csv_structure("assessments", {"organization_id": None})
-    results.append(f"Skill Assessments: {message}")
-    
-    success, message = update_csv_structure("comp_assessments", {"organization_id": None})
-    results.append(f"Competency Assessments: {message}")
-    
-    # Expectation schemas
-    success, message = update_csv_structure("expectations", {"organization_id": None})
-    results.append(f"Skill Expectations: {message}")
-    
-    success, message = update_csv_structure("comp_expectations", {"organization_id": None})
-    results.append(f"Competency Expectations: {message}")
+    Each migration runs once and the schema version is stamped after it, so
+    this is cheap to call on every startup. Reads assume the migrated schema
+    and never change stored data themselves. The first call in a process also
+    recovers a transaction interrupted by a crash.
     
-    # Skills schema (linked through competencies)
-    success, message = update_csv_structure("skills", {"organization_id": None})
-    results.append(f"Skills: {message}")
+    Returns:
+        List of messages describing what was migrated (empty if up to date)
+    """
+    global _recovered
+    results = []
     
+    # Finish or roll back a transaction interrupted by a crash of this or
+    # another process, before anything reads the data
+    if not _recovered:
+        if _storage.recover():
+            invalidate_cache()
+            results.append("Finished an interrupted transaction")
+        _recovered = True
+    
+    if _storage.schema_version() >= SCHEMA_VERSION:
+        return results
+    
+    with _storage.schema_lock():
+        # Another process may have migrated while we waited for the lock
+        current = _storage.schema_version()
+        for version, description, migrate in MIGRATIONS:
+            if version <= current:
+                continue
+            results.append(f"Migration {version}: {description}")
+            results.extend(migrate())
+            _storage.set_schema_version(version)
     return results
+
 def add_note(employee_id, author_id, author_type, content, is_shared, organization_id=None, related_skills=None, related_competencies=None):
     """Add a new note
     
@@ -1550,21 +3394,12 @@ def add_note(employee_id, author_id, author_type, content, is_shared, organizati
         related_skills: Optional list of skill names
         related_competencies: Optional list of competency names
     """
-    notes_df = load_data("notes")
-    
-    # Generate new note ID
-    if notes_df.empty:
-        new_id = 1
-    else:
-        new_id = notes_df["note_id"].max() + 1
-    
     # Convert lists to strings for storage
     skills_str = ",".join(related_skills) if related_skills else ""
     comp_str = ",".join(related_competencies) if related_competencies else ""
     
     # Add new note
     new_note = pd.DataFrame({
-        "note_id": [new_id],
         "employee_id": [employee_id],
         "author_id": [author_id],
         "author_type": [author_type],
@@ -1576,8 +3411,7 @@ def add_note(employee_id, author_id, author_type, content, is_shared, organizati
         "related_competencies": [comp_str]
     })
     
-    notes_df = pd.concat([notes_df, new_note], ignore_index=True)
-    save_data("notes", notes_df)
+    new_id = _append_rows("notes", new_note)[0]
     return True, "Note added successfully", new_id
 
 def get_employee_notes(employee_id, viewer_id, viewer_type):
@@ -0,0 +1,597 @@
+import contextlib
+import gzip
+import io
+import tempfile
+import pandas as pd
+import xlsxwriter
+from data_manager import (
+    get_gap_analysis, get_org_context, get_score_rollup, load_data, load_data_chunks, team_comparison_matrix
+)
+
+# Define the export formats as {format: (label, file extension, MIME type)}
+EXPORT_FORMATS = {
+    "csv": ("CSV", ".csv", "text/csv"),
+    "csv.gz": ("CSV (gzip)", ".csv.gz", "application/gzip"),
+    "jsonl": ("JSON Lines", ".jsonl", "application/x-ndjson"),
+    "xlsx": ("Excel Workbook", ".xlsx", "application/vnd.openxmlformats-officedocument.spreadsheetml.sheet")
+}
+
+# Formats written row by row with write_export; xlsx is written by export_workbook
+ROW_FORMATS = ["csv", "csv.gz", "jsonl"]
+
+# Exports are written to memory up to this size, then to a temporary file on disk
+SPOOL_MAX_BYTES = 32 * 1024 * 1024
+
+# Define the expectations each assessment data type is compared with, as
+# (expectations data type, key columns besides the employee's job level)
+EXPORT_EXPECTATIONS = {
+    "assessments": ("expectations", ["competency_id", "skill_id"]),
+    "comp_assessments": ("comp_expectations", ["competency_id"])
+}
+
+# Define the employee columns added to every exported assessment
+EXPORT_EMPLOYEE_COLUMNS = ["employee_id", "name", "job_title", "job_level", "department"]
+
+
+def assessment_export_chunks(organization_id, data_type="assessments", employee_ids=None, assessment_type=None,
+                             include_notes=False, chunk_rows=None, progress=None):
+    """Read an organization's assessments in chunks, joined with employee and expectation info
+
+    Each chunk is read, joined and yielded before the next one is read, so
+    only one chunk of the assessments is in memory at a time.
+
+    Args:
+        organization_id: Organization whose assessments are exported
+        data_type: "assessments" (skills) or "comp_assessments" (competencies)
+        employee_ids: Optional list of the employees to export (default: all)
+        assessment_type: Optional assessment type ("self" or "manager")
+        include_notes: Also export the free-text notes
+        chunk_rows: Optional number of assessments read at a time
+        progress: Optional callable taking the fraction of the assessments
+            exported so far and a message, called after every chunk
+
+    Yields:
+        DataFrames with the assessment, the employee's name, title, level and
+        department, the expected score for their level and the gap to it
+    """
+    if data_type not in EXPORT_EXPECTATIONS:
+        raise ValueError(f"Unknown assessment data type: {data_type}")
+    expectations_type, keys = EXPORT_EXPECTATIONS[data_type]
+
+    context = get_org_context(organization_id)
+    employees = context.employees[EXPORT_EMPLOYEE_COLUMNS].drop_duplicates("employee_id")
+    employees = employees.rename(columns={"name": "employee"}).astype({"job_level": object})
+
+    # The organization's own expectations come first, so they win over shared ones
+    expectations = getattr(context, expectations_type)[["job_level"] + keys + ["expected_score"]]
+    expectations = expectations.dropna(subset=["job_level"] + keys).astype({"job_level": object})
+    expectations = expectations.drop_duplicates(["job_level"] + keys)
+
+    filters = {"organization_id": organization_id}
+    if employee_ids is not None:
+        filters["employee_id"] = list(employee_ids)
+    if assessment_type is not None:
+        filters["assessment_type"] = assessment_type
+    columns = ["assessment_id", "assessment_date", "employee_id", "competency", "assessment_type", "score"]
+    if data_type == "assessments":
+        columns.insert(4, "skill")
+    if include_notes:
+        columns.append("notes")
+
+    # Counting the rows first only reads their IDs
+    total = len(load_data(data_type, columns=["assessment_id"], filters=filters)) if progress else 0
+    done = 0
+
+    for chunk in load_data_chunks(data_type, columns=columns, filters=filters, chunk_rows=chunk_rows):
+        chunk = chunk.merge(employees, on="employee_id", how="left")
+        chunk = chunk.merge(expectations, on=["job_level"] + keys, how="left")
+        chunk["gap"] = (chunk["score"] - chunk["expected_score"]).round(2)
+
+        # Put the employee info after the employee ID and the notes last
+        front = ["assessment_id", "assessment_date", "employee_id", "employee", "job_title", "job_level", "department"]
+        back = ["notes"] if include_notes else []
+        yield chunk[front + [col for col in chunk.columns if col not in front + back] + back]
+
+        if progress:
+            done += len(chunk)
+            progress(min(done / total, 1.0) if total else 1.0, f"Exported {done:,} of {total:,} assessments")
+
+
+def write_export(chunks, export_format="csv", spool_max_bytes=SPOOL_MAX_BYTES, output=None):
+    """Write chunks of rows to a file in an export format
+
+    Without an output file the rows go to a spooled temporary file: small
+    exports stay in memory, larger ones spill to disk, so the rows are never
+    held in memory all at once.
+
+    Args:
+        chunks: Iterable of DataFrames with the same columns
+        export_format: Format of ROW_FORMATS
+        spool_max_bytes: Size above which the spooled file moves from memory to disk
+        output: Optional binary file to write to instead. It is left open.
+
+    Returns:
+        The output file, or the spooled temporary file positioned at its
+        start. Close the spooled file when done.
+    """
+    if export_format not in ROW_FORMATS:
+        raise ValueError(f"Unknown export format: {export_format}")
+
+    spooled = output is None
+    if spooled:
+        output = tempfile.SpooledTemporaryFile(max_size=spool_max_bytes, mode="w+b")
+    stream = gzip.GzipFile(fileobj=output, mode="wb") if export_format == "csv.gz" else output
+    text = io.TextIOWrapper(stream, encoding="utf-8", newline="")
+    try:
+        header = True
+        for chunk in chunks:
+            if export_format == "jsonl":
+                if not chunk.empty:
+                    chunk.to_json(text, orient="records", lines=True, date_format="iso", date_unit="s")
+            else:
+                chunk.to_csv(text, index=False, header=header, date_format="%Y-%m-%d")
+                header = False
+        text.flush()
+    except BaseException:
+        if spooled:
+            output.close()
+        raise
+    # Closing the gzip stream writes its trailer without closing the output
+    text.detach()
+    if stream is not output:
+        stream.close()
+    if spooled:
+        output.seek(0)
+    return output
+
+
+def export_assessments(organization_id, export_format="csv", output=None, **options):
+    """Export an organization's assessments as a file
+
+    Args:
+        organization_id: Organization whose assessments are exported
+        export_format: Format of EXPORT_FORMATS. An Excel workbook holds both
+            skill and competency assessments, see export_workbook.
+        output: Optional binary file the export is streamed to
+        **options: data_type, employee_ids, assessment_type, include_notes,
+            chunk_rows and progress, see assessment_export_chunks
+
+    Returns:
+        Bytes of the exported file, or None if it was written to output
+    """
+    if export_format == "xlsx":
+        options.pop("data_type", None)
+        return export_workbook(organization_id, output=output, **options)
+    chunks = assessment_export_chunks(organization_id, **options)
+    if output is not None:
+        write_export(chunks, export_format, output=output)
+        return None
+    with write_export(chunks, export_format) as spooled:
+        return spooled.read()
+
+
+# Define the sheets of an exported workbook, in order
+WORKBOOK_SHEETS = [
+    "Summary", "Employees", "Skill Assessments", "Competency Assessments",
+    "Skill Expectations", "Competency Expectations", "Gaps by Skill", "Gaps by Employee"
+]
+
+# Define the number formats of exported columns
+DATE_COLUMNS = ["assessment_date", "hire_date"]
+SCORE_COLUMNS = ["score", "expected_score", "gap", "mean_gap", "min_gap"]
+SHARE_COLUMNS = ["below_share"]
+
+
+def _workbook_formats(workbook):
+    """Add the cell formats used by exported workbooks"""
+    return {
+        "title": workbook.add_format({"bold": True, "font_size": 14}),
+        "header": workbook.add_format({"bold": True, "bottom": 1}),
+        "date": workbook.add_format({"num_format": "yyyy-mm-dd"}),
+        "score": workbook.add_format({"num_format": "0.00"}),
+        "share": workbook.add_format({"num_format": "0%"})
+    }
+
+
+def _write_header(worksheet, row, columns, formats):
+    """Write the header row of a table and set the widths and formats of its columns"""
+    worksheet.write_row(row, 0, list(columns), formats["header"])
+    for col, name in enumerate(columns):
+        if name in DATE_COLUMNS:
+            worksheet.set_column(col, col, 12, formats["date"])
+        elif name in SCORE_COLUMNS:
+            worksheet.set_column(col, col, 12, formats["score"])
+        elif name in SHARE_COLUMNS:
+            worksheet.set_column(col, col, 12, formats["share"])
+        else:
+            worksheet.set_column(col, col, max(12, min(len(str(name)) + 4, 40)))
+
+
+def _write_rows(worksheet, row, df):
+    """Write the rows of a frame from a row on, with missing values left blank
+
+    Returns:
+        The row after the last one written
+    """
+    values = df.astype(object).where(df.notna(), None)
+    for record in values.itertuples(index=False, name=None):
+        worksheet.write_row(row, 0, record)
+        row += 1
+    return row
+
+
+def _write_table(worksheet, df, formats, row=0):
+    """Write a frame with its header as a filterable table
+
+    Returns:
+        The row after the last one written
+    """
+    _write_header(worksheet, row, df.columns, formats)
+    end = _write_rows(worksheet, row + 1, df)
+    if len(df.columns):
+        worksheet.autofilter(row, 0, max(end - 1, row), len(df.columns) - 1)
+    return end
+
+
+def _write_chunks(worksheet, chunks, formats):
+    """Stream chunks of rows into a worksheet, writing the header from the first chunk
+
+    Returns:
+        DataFrame with the count and total of the scores by competency and
+        assessment type, for the summary
+    """
+    row = 0
+    totals = []
+    for chunk in chunks:
+        if row == 0:
+            _write_header(worksheet, 0, chunk.columns, formats)
+            worksheet.freeze_panes(1, 0)
+            row = 1
+        row = _write_rows(worksheet, row, chunk)
+        totals.append(chunk.groupby(["competency", "assessment_type"], observed=True)["score"].agg(["count", "sum"]))
+    if row > 1:
+        worksheet.autofilter(0, 0, row - 1, len(chunk.columns) - 1)
+    if not totals:
+        return pd.DataFrame(columns=["count", "sum"])
+    return pd.concat(totals).groupby(level=[0, 1], observed=True).sum()
+
+
+def _column_chart(workbook, sheet_name, title, categories, series, first_row, last_row, bar=False, y_title="Score"):
+    """Build a native Excel column (or bar) chart of table columns
+
+    Args:
+        categories: Column index of the category labels
+        series: List of (name, column index) of the value columns
+        first_row, last_row: Rows of the table's values
+    """
+    chart = workbook.add_chart({"type": "bar" if bar else "column"})
+    for name, col in series:
+        chart.add_series({
+            "name": name,
+            "categories": [sheet_name, first_row, categories, last_row, categories],
+            "values": [sheet_name, first_row, col, last_row, col]
+        })
+    chart.set_title({"name": title})
+    chart.set_legend({"position": "bottom" if len(series) > 1 else "none"})
+    (chart.set_x_axis if bar else chart.set_y_axis)({"name": y_title})
+    return chart
+
+
+def _progress_range(progress, start, end):
+    """Map the progress of one step onto its share of a whole export"""
+    if progress is None:
+        return None
+    return lambda fraction, message: progress(start + (end - start) * fraction, message)
+
+
+def export_workbook(organization_id, employee_ids=None, assessment_type=None, include_notes=False, chunk_rows=None,
+                    progress=None, output=None):
+    """Export an organization's or team's data as a multi-sheet Excel workbook
+
+    The workbook has the sheets of WORKBOOK_SHEETS: a summary with the mean
+    competency scores and the gaps by department, the employees, their skill
+    and competency assessments, the expectations and the gap summaries, with
+    native Excel charts. xlsxwriter's constant_memory mode writes every row
+    to a temporary file as soon as the next one starts and the assessments
+    are read in chunks, so memory use doesn't grow with the number of rows.
+
+    Args:
+        organization_id: Organization whose data is exported
+        employee_ids: Optional list of the employees to export (default: all)
+        assessment_type: Optional assessment type ("self" or "manager")
+        include_notes: Also export the free-text notes of the assessments
+        chunk_rows: Optional number of assessments read at a time
+        progress: Optional callable taking the fraction of the workbook
+            written so far and a message
+        output: Optional binary file the workbook is written to
+
+    Returns:
+        Bytes of the .xlsx file, or None if it was written to output
+    """
+    context = get_org_context(organization_id)
+    employees = context.employees
+    if employee_ids is not None:
+        employees = employees[employees["employee_id"].isin(list(employee_ids))]
+    gap_analysis = get_gap_analysis(assessment_type, organization_id)
+    options = {"employee_ids": employee_ids, "assessment_type": assessment_type,
+               "include_notes": include_notes, "chunk_rows": chunk_rows}
+
+    spooled = output is None
+    with tempfile.SpooledTemporaryFile(max_size=SPOOL_MAX_BYTES) if spooled else contextlib.nullcontext(output) as output:
+        workbook = xlsxwriter.Workbook(output, {"constant_memory": True})
+        formats = _workbook_formats(workbook)
+        sheets = {name: workbook.add_worksheet(name) for name in WORKBOOK_SHEETS}
+
+        # Employees, with their manager's name
+        employee_df = employees[["employee_id", "name", "email", "job_title", "job_level", "department"]].copy()
+        employee_df["manager"] = employees["manager_id"].map(context.employee_names)
+        employee_df["hire_date"] = employees["hire_date"]
+        _write_table(sheets["Employees"], employee_df, formats)
+
+        # Assessments, streamed chunk by chunk
+        _write_chunks(
+            sheets["Skill Assessments"],
+            assessment_export_chunks(organization_id, "assessments", progress=_progress_range(progress, 0.0, 0.6),
+                                     **options),
+            formats
+        )
+        competency_totals = _write_chunks(
+            sheets["Competency Assessments"],
+            assessment_export_chunks(organization_id, "comp_assessments", progress=_progress_range(progress, 0.6, 0.85),
+                                     **options),
+            formats
+        )
+        if progress:
+            progress(0.85, "Writing expectations and gap summaries")
+
+        # Expectations
+        skill_expectations = context.expectations[["job_level", "competency", "skill", "expected_score"]]
+        _write_table(sheets["Skill Expectations"], skill_expectations.sort_values(["job_level", "competency", "skill"]), formats)
+        comp_expectations = context.comp_expectations[["job_level", "competency", "expected_score"]]
+        _write_table(sheets["Competency Expectations"], comp_expectations.sort_values(["job_level", "competency"]), formats)
+
+        # Gap summaries, with the mean gap of every skill as a bar chart
+        skill_gaps = gap_analysis.skill_summary(employee_ids)
+        skill_gaps = skill_gaps[["competency", "skill", "employees", "mean_gap", "min_gap", "below", "below_share"]]
+        end = _write_table(sheets["Gaps by Skill"], skill_gaps, formats)
+        if not skill_gaps.empty:
+            chart = _column_chart(workbook, "Gaps by Skill", "Mean Gap by Skill", 1, [("Mean Gap", 3)], 1, end - 1,
+                                  bar=True, y_title="Gap")
+            chart.set_size({"width": 720, "height": max(300, 22 * len(skill_gaps))})
+            sheets["Gaps by Skill"].insert_chart(0, 8, chart)
+        employee_gaps = gap_analysis.employee_summary(employee_ids)
+        employee_gaps = employee_gaps[["employee_id", "name", "department", "job_level", "skills", "mean_gap",
+                                       "below", "skill", "min_gap"]].rename(columns={"skill": "weakest_skill"})
+        _write_table(sheets["Gaps by Employee"], employee_gaps.sort_values("mean_gap"), formats)
+
+        # Summary: mean competency scores by assessment type and gaps by department
+        summary = sheets["Summary"]
+        summary.write(0, 0, "Skill Matrix Export", formats["title"])
+        summary.write_row(1, 0, ["Generated", pd.Timestamp.now().strftime("%Y-%m-%d %H:%M")])
+        summary.write_row(2, 0, ["Employees", len(employees)])
+        summary.write_row(3, 0, ["Assessment Type", assessment_type or "all"])
+
+        means = (competency_totals["sum"] / competency_totals["count"]).unstack("assessment_type")
+        row = 5
+        if not means.empty:
+            means = means.round(2).reset_index()
+            means.columns = [str(col) for col in means.columns]
+            end = _write_table(summary, means, formats, row)
+            chart = _column_chart(workbook, "Summary", "Mean Competency Scores", 0,
+                                  [(name, col) for col, name in enumerate(means.columns) if col > 0], row + 1, end - 1)
+            summary.insert_chart(row, 6, chart)
+            row = max(end, row + 16) + 1
+
+        department_gaps = gap_analysis.group_summary("department", employee_ids)
+        if not department_gaps.empty:
+            department_gaps = department_gaps[["department", "employees", "mean_gap", "below_share"]]
+            end = _write_table(summary, department_gaps, formats, row)
+            chart = _column_chart(workbook, "Summary", "Mean Gap by Department", 0, [("Mean Gap", 2)], row + 1, end - 1,
+                                  y_title="Gap")
+            summary.insert_chart(row, 6, chart)
+        summary.set_column(0, 0, 30)
+
+        if progress:
+            progress(0.95, "Saving the workbook")
+        workbook.close()
+        if not spooled:
+            return None
+        output.seek(0)
+        return output.read()
+
+
+# Report tables
+
+# Define the score bands of the skill distribution report as (label, lowest score, highest score)
+SCORE_BANDS = [
+    ("1.0-1.5", 1.0, 1.5),
+    ("2.0-2.5", 2.0, 2.5),
+    ("3.0-3.5", 3.0, 3.5),
+    ("4.0-4.5", 4.0, 4.5),
+    ("5.0", 5.0, 5.0)
+]
+
+
+def _team_assessments(organization_id, employee_ids, assessment_type, columns, data_type="assessments"):
+    """Read some columns of a team's skill assessments, or of their latest scores"""
+    filters = {"organization_id": [organization_id, None], "employee_id": list(employee_ids)}
+    if assessment_type is not None:
+        filters["assessment_type"] = assessment_type
+    return load_data(data_type, columns=columns, filters=filters)
+
+
+def team_competency_summary(organization_id, employee_ids, team_filters, assessment_type=None):
+    """Summarize a team's latest skill scores by competency
+
+    Every column is computed from the latest score of each employee, skill and
+    assessment type (the analytics cube and the latest scores table), not from
+    the full assessment history.
+
+    Args:
+        organization_id: Organization of the team
+        employee_ids: IDs of the team members
+        team_filters: Analytics cube filters selecting the team, e.g. {"department": "Engineering"}
+        assessment_type: Optional assessment type ("self" or "manager")
+
+    Returns:
+        DataFrame with one row per competency: the mean, min, max and range of
+        the latest scores, the number of latest scores and the number of skills
+        and employees having one
+    """
+    columns = ["Competency", "Mean Latest Score", "Min Latest Score", "Max Latest Score", "Range",
+               "Number of Latest Scores", "Number of Skills", "Number of Employees"]
+    rollup_filters = {**team_filters, "organization_id": [organization_id, None]}
+    if assessment_type is not None:
+        rollup_filters["assessment_type"] = assessment_type
+    comp_stats = get_score_rollup(["competency_id"], **rollup_filters)
+    if comp_stats.empty:
+        return pd.DataFrame(columns=columns)
+    skill_counts = get_score_rollup(["competency_id", "skill_id"], **rollup_filters)["competency"].value_counts()
+    latest_scores = _team_assessments(organization_id, employee_ids, assessment_type, ["employee_id", "competency"],
+                                      data_type="latest_assessments")
+    employee_counts = latest_scores.groupby("competency", observed=True)["employee_id"].nunique()
+    # Map plain names: a categorical maps to a categorical when the counts happen to be unique
+    competencies = comp_stats["competency"].astype(object)
+
+    return pd.DataFrame({
+        "Competency": comp_stats["competency"],
+        "Mean Latest Score": comp_stats["mean"].round(2),
+        "Min Latest Score": comp_stats["min"],
+        "Max Latest Score": comp_stats["max"],
+        "Range": (comp_stats["max"] - comp_stats["min"]).round(2),
+        "Number of Latest Scores": comp_stats["count"].astype(int),
+        "Number of Skills": competencies.map(skill_counts).fillna(0).astype(int),
+        "Number of Employees": competencies.map(employee_counts).fillna(0).astype(int)
+    })[columns]
+
+
+def team_skill_distribution(organization_id, employee_ids, competency, assessment_type=None):
+    """Count a team's skill assessments of one competency by score band
+
+    Args:
+        organization_id: Organization of the team
+        employee_ids: IDs of the team members
+        competency: Name of the competency
+        assessment_type: Optional assessment type ("self" or "manager")
+
+    Returns:
+        DataFrame with one row per skill: the mean score, the number of
+        employees and a "Score <band>" count for every band of SCORE_BANDS
+    """
+    columns = ["Skill", "Mean Score", "Number of Employees"] + [f"Score {label}" for label, _, _ in SCORE_BANDS]
+    assessments = _team_assessments(organization_id, employee_ids, assessment_type,
+                                    ["employee_id", "competency", "skill", "score"])
+    assessments = assessments[assessments["competency"].astype(object) == competency].dropna(subset=["skill"])
+    if assessments.empty:
+        return pd.DataFrame(columns=columns)
+
+    assessments = assessments.assign(skill=assessments["skill"].astype(object))
+    for label, low, high in SCORE_BANDS:
+        assessments[f"Score {label}"] = assessments["score"].between(low, high)
+    skills = assessments.groupby("skill", sort=False)
+    report = pd.DataFrame({
+        "Mean Score": skills["score"].mean().round(2),
+        "Number of Employees": skills["employee_id"].nunique()
+    })
+    for label, _, _ in SCORE_BANDS:
+        report[f"Score {label}"] = skills[f"Score {label}"].sum().astype(int)
+    return report.rename_axis("Skill").reset_index()[columns]
+
+
+def team_comparison(organization_id, employee_ids, assessment_type=None):
+    """Compare the mean scores of team members by competency, see data_manager.team_comparison_matrix
+
+    Competencies a member wasn't assessed on count as 0.
+
+    Returns:
+        DataFrame with the employee name and ID, overall mean, one "<competency>
+        Mean" column per competency and rank, sorted by overall mean
+    """
+    matrix = team_comparison_matrix(employee_ids, assessment_type, organization_id)
+    if matrix.empty:
+        return pd.DataFrame(columns=["Employee Name", "Employee ID", "Overall Mean", "Rank"])
+
+    comp_names = [c for c in matrix.columns if c not in ("employee_id", "name", "Overall Mean", "Rank")]
+    members = matrix["employee_id"].notna()
+    matrix.loc[members, comp_names] = matrix.loc[members, comp_names].fillna(0)
+    comparison = matrix[["name", "employee_id", "Overall Mean"] + comp_names + ["Rank"]].rename(columns={
+        "name": "Employee Name",
+        "employee_id": "Employee ID",
+        **{comp: f"{comp} Mean" for comp in comp_names}
+    }).round(2)
+    return comparison.sort_values("Overall Mean", ascending=False)
+
+
+def org_gap_detail(organization_id, assessment_type=None):
+    """List the gap of every employee and skill of an organization, see data_manager.GapAnalysis
+
+    Returns:
+        DataFrame with the employee, competency, skill, current and expected
+        score and the gap between them
+    """
+    gaps = get_gap_analysis(assessment_type, organization_id).to_frame()
+    return gaps.rename(columns={
+        "employee_id": "Employee ID",
+        "name": "Employee Name",
+        "department": "Department",
+        "job_level": "Job Level",
+        "competency": "Competency",
+        "skill": "Skill",
+        "score": "Current Score",
+        "expected_score": "Expected Score",
+        "gap": "Gap"
+    }).drop(columns=["competency_id", "skill_id"]).round(2)
+
+
+# Define the report tables as {report: function building the table from the report parameters}
+REPORT_TABLES = {
+    "team_competency_summary": team_competency_summary,
+    "team_skill_distribution": team_skill_distribution,
+    "team_comparison": team_comparison,
+    "org_gap_analysis": org_gap_detail
+}
+
+
+def export_report_table(report, export_format="csv", output=None, progress=None, **params):
+    """Build a report table and write it as a CSV file or a one-sheet Excel workbook
+
+    Args:
+        report: Report of REPORT_TABLES
+        export_format: "csv" or "xlsx"
+        output: Optional binary file the report is written to
+        progress: Optional callable taking the fraction of the report done and a message
+        **params: Parameters of the report's table function
+
+    Returns:
+        Bytes of the file, or None if it was written to output
+    """
+    if report not in REPORT_TABLES:
+        raise ValueError(f"Unknown report: {report}")
+    if export_format not in ("csv", "xlsx"):
+        raise ValueError(f"Unknown report format: {export_format}")
+
+    if progress:
+        progress(0.0, "Building the report")
+    df = REPORT_TABLES[report](**params)
+    if progress:
+        progress(0.8, f"Writing {len(df):,} rows")
+
+    if export_format == "csv":
+        if output is not None:
+            write_export([df], "csv", output=output)
+            return None
+        with write_export([df], "csv") as spooled:
+            return spooled.read()
+    spooled = output is None
+    with tempfile.SpooledTemporaryFile(max_size=SPOOL_MAX_BYTES) if spooled else contextlib.nullcontext(output) as output:
+        with pd.ExcelWriter(output, engine="xlsxwriter") as writer:
+            df.to_excel(writer, index=False, sheet_name="Data")
+        if not spooled:
+            return None
+        output.seek(0)
+        return output.read()
+
+
+def export_file_name(name, export_format):
+    """Build the file name of an export, with the date and the format's extension"""
+    return f"{name}_{pd.Timestamp.now().strftime('%Y%m%d')}{EXPORT_FORMATS[export_format][1]}"
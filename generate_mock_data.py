@@ -14,11 +14,11 @@ def generate_score_by_level(job_level, expected_score):
     return round(score, 1)
 
 def generate_assessments():
-    employees_df = pd.read_csv('employees.csv')
-    competencies_df = pd.read_csv('competencies.csv')
-    skills_df = pd.read_csv('skills.csv')
-    comp_expectations_df = pd.read_csv('competency_expectations.csv')
-    skill_expectations_df = pd.read_csv('skill_expectations.csv')
+    employees_df = data_manager.load_data("employees")
+    competencies_df = data_manager.load_data("competencies")
+    skills_df = data_manager.load_data("skills")
+    comp_expectations_df = data_manager.load_data("comp_expectations")
+    skill_expectations_df = data_manager.load_data("expectations")
 
     # Create empty DataFrames with correct columns
     skill_assessments_df = pd.DataFrame(columns=[
@@ -0,0 +1,12 @@
+"""
+Script to migrate the stored data to the current schema version.
+The app runs the same migrations at startup; use this to migrate ahead of a deploy.
+"""
+from data_manager import run_migrations, get_schema_version, SCHEMA_VERSION
+
+if __name__ == "__main__":
+    results = run_migrations()
+    for message in results:
+        print(message)
+    if not results:
+        print(f"Schema is up to date (version {get_schema_version()} of {SCHEMA_VERSION})")
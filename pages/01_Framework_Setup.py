@@ -10,11 +10,11 @@ st.set_page_config(
 
 import pandas as pd
 from data_manager import (
-    load_data, load_data_for_organization, save_data, add_competency, add_skill, 
-    add_job_level, set_skill_expectation, set_competency_expectation, get_competency_skills,
+    get_org_context, save_data, add_competency, add_skill, 
+    add_job_level, set_skill_expectation, set_competency_expectation,
     delete_competency, delete_skill, delete_job_level, delete_employee,
     delete_expectation, delete_competency_expectation, update_competency, update_skill, update_job_level,
-    update_employee
+    update_employee, ConflictError
 )
 from utils import get_current_organization_id, check_page_access, initialize_session_state, check_permission, track_page_load
 from ui_helpers import load_custom_css, create_custom_sidebar
@@ -41,6 +41,9 @@ if not check_page_access(["admin"]):
 # Check if user has access to this page (admin only)
 
 
+# Load the organization's employees and framework once for this run
+context = get_org_context(get_current_organization_id())
+
 st.title("Competency Framework Setup")
 st.write("Configure competencies, skills, job levels, and expected scores for your organization.")
 
@@ -119,7 +122,7 @@ with tab1:
     # Display add skill form as a modal if active
     if st.session_state.show_add_skill_form:
         organization_id = get_current_organization_id()
-        competencies_df = load_data_for_organization("competencies", organization_id)
+        competencies_df = context.competencies
         
         if competencies_df.empty:
             st.warning("You need to add competencies first.")
@@ -163,8 +166,8 @@ with tab1:
     # View existing competencies with edit/delete options
     st.subheader("Existing Competencies")
     organization_id = get_current_organization_id()
-    competencies_df = load_data_for_organization("competencies", organization_id)
-    skills_df = load_data_for_organization("skills", organization_id)
+    competencies_df = context.competencies
+    skills_df = context.skills
     
     # Add filter options
     filter_col1, filter_col2, filter_col3 = st.columns([1, 1, 1])
@@ -216,6 +219,8 @@ with tab1:
                 if st.button("✏️", key=f"edit_comp_{comp_id}"):
                     # Set session state to store the competency being edited
                     st.session_state[f"edit_comp_id_{comp_id}"] = True
+                    # Remember the version being edited, to detect changes made meanwhile
+                    st.session_state[f"edit_comp_version_{comp_id}"] = comp_row.get("version")
             
             with comp_cols[3]:
                 # Delete competency button
@@ -238,7 +243,12 @@ with tab1:
                     edit_col1, edit_col2 = st.columns([1, 1])
                     with edit_col1:
                         if st.button("Save", type="primary", key=f"save_comp_{comp_id}"):
-                            success, message = update_competency(comp_id, new_name, new_desc)
+                            try:
+                                success, message = update_competency(
+                                    comp_id, new_name, new_desc, expected_version=st.session_state.get(f"edit_comp_version_{comp_id}")
+                                )
+                            except ConflictError as e:
+                                success, message = False, str(e)
                             if success:
                                 st.success(message)
                                 # Clear the editing state
@@ -259,7 +269,7 @@ with tab1:
         # Display add skill form as a modal if active
         if st.session_state.show_add_skill_form:
             organization_id = get_current_organization_id()
-            competencies_df = load_data_for_organization("competencies", organization_id)
+            competencies_df = context.competencies
 
             if competencies_df.empty:
                 st.warning("You need to add competencies first.")
@@ -348,6 +358,8 @@ with tab1:
                     if st.button("✏️", key=f"edit_skill_{skill_id}"):
                         # Set session state to store the skill being edited
                         st.session_state[f"edit_skill_id_{skill_id}"] = True
+                        # Remember the version being edited, to detect changes made meanwhile
+                        st.session_state[f"edit_skill_version_{skill_id}"] = skill_row.get("version")
                 
                 with skill_cols[4]:
                     # Delete skill button
@@ -370,7 +382,12 @@ with tab1:
                         skill_edit_col1, skill_edit_col2 = st.columns([1, 1])
                         with skill_edit_col1:
                             if st.button("Save", type="primary", key=f"save_skill_{skill_id}"):
-                                success, message = update_skill(skill_id, new_skill_name, new_skill_desc)
+                                try:
+                                    success, message = update_skill(
+                                        skill_id, new_skill_name, new_skill_desc, expected_version=st.session_state.get(f"edit_skill_version_{skill_id}")
+                                    )
+                                except ConflictError as e:
+                                    success, message = False, str(e)
                                 if success:
                                     st.success(message)
                                     # Clear the editing state
@@ -438,7 +455,7 @@ with tab2:
     st.markdown("---")
     st.subheader("Existing Job Levels")
     organization_id = get_current_organization_id()
-    levels_df = load_data_for_organization("levels", organization_id)
+    levels_df = context.levels
     
     if not levels_df.empty:
         # Add filter options
@@ -447,9 +464,9 @@ with tab2:
             filter_type = st.selectbox("Filter By", ["All Levels", "Search by Name", "Filter by Skill"], key="level_filter_type")
         
         # Load skills data and expectations data for filtering
-        skills_df = load_data_for_organization("skills", organization_id)
-        competencies_df = load_data_for_organization("competencies", organization_id)
-        expectations_df = load_data_for_organization("expectations", organization_id)
+        skills_df = context.skills
+        competencies_df = context.competencies
+        expectations_df = context.expectations
         
         # Define selected_skill with a default value
         selected_skill = "All Skills"
@@ -514,6 +531,8 @@ with tab2:
                 if st.button("✏️", key=f"edit_level_{level_id}"):
                     # Set session state to store the level being edited
                     st.session_state[f"edit_level_id_{level_id}"] = True
+                    # Remember the version being edited, to detect changes made meanwhile
+                    st.session_state[f"edit_level_version_{level_id}"] = level_row.get("version")
             
             with level_cols[3]:
                 # Delete level button
@@ -536,7 +555,12 @@ with tab2:
                     edit_col1, edit_col2 = st.columns([1, 1])
                     with edit_col1:
                         if st.button("Save", type="primary", key=f"save_level_{level_id}"):
-                            success, message = update_job_level(level_id, new_name, new_desc)
+                            try:
+                                success, message = update_job_level(
+                                    level_id, new_name, new_desc, expected_version=st.session_state.get(f"edit_level_version_{level_id}")
+                                )
+                            except ConflictError as e:
+                                success, message = False, str(e)
                             if success:
                                 st.success(message)
                                 # Clear the editing state
@@ -559,9 +583,9 @@ with tab3:
     st.write("Set the expected skill scores for each job level.")
     
     organization_id = get_current_organization_id()
-    levels_df = load_data_for_organization("levels", organization_id)
-    competencies_df = load_data_for_organization("competencies", organization_id)
-    skills_df = load_data_for_organization("skills", organization_id)
+    levels_df = context.levels
+    competencies_df = context.competencies
+    skills_df = context.skills
     
     if levels_df.empty or competencies_df.empty or skills_df.empty:
         st.warning("You need to set up job levels, competencies, and skills first.")
@@ -594,7 +618,7 @@ with tab3:
                 selected_comp_id = competencies_df[competencies_df["name"] == selected_comp]["competency_id"].iloc[0]
                 
                 # Get skills for selected competency
-                comp_skills = get_competency_skills(selected_comp_id)
+                comp_skills = context.skills_of(selected_comp_id)
                 
                 if not comp_skills.empty:
                     # Select skill
@@ -621,7 +645,8 @@ with tab3:
                             selected_level, 
                             selected_comp, 
                             selected_skill, 
-                            expected_score
+                            expected_score,
+                            organization_id=organization_id
                         )
                         if success:
                             st.success(message)
@@ -641,7 +666,7 @@ with tab3:
         # Display Current Expectations section
         st.subheader("Current Expectations")
         organization_id = get_current_organization_id()
-        expectations_df = load_data_for_organization("expectations", organization_id)
+        expectations_df = context.expectations
         
         if not expectations_df.empty:
             # Show filter options
@@ -703,12 +728,15 @@ with tab3:
                         with exp_cols[3]:
                             if st.button("✏️", key=f"edit_btn_exp_{i}"):
                                 st.session_state[f"edit_exp_{i}"] = True
+                                # Remember the version being edited, to detect changes made meanwhile
+                                st.session_state[f"edit_exp_version_{i}"] = row.get("version")
                         with exp_cols[4]:
                             if st.button("🗑️", key=f"del_exp_{i}", type="secondary"):
                                 success, message = delete_expectation(
                                     row["job_level"], 
                                     row["competency"], 
-                                    row["skill"]
+                                    row["skill"],
+                                    organization_id=organization_id
                                 )
                                 if success:
                                     st.success(message)
@@ -732,12 +760,17 @@ with tab3:
                                 edit_col1, edit_col2 = st.columns([1, 5])
                                 with edit_col1:
                                     if st.button("Save", type="primary", key=f"save_exp_{i}"):
-                                        success, message = set_skill_expectation(
-                                            row["job_level"],
-                                            row["competency"],
-                                            row["skill"],
-                                            new_score
-                                        )
+                                        try:
+                                            success, message = set_skill_expectation(
+                                                row["job_level"],
+                                                row["competency"],
+                                                row["skill"],
+                                                new_score,
+                                                organization_id=organization_id,
+                                                expected_version=st.session_state.get(f"edit_exp_version_{i}")
+                                            )
+                                        except ConflictError as e:
+                                            success, message = False, str(e)
                                         if success:
                                             st.success(message)
                                             st.session_state[f"edit_exp_{i}"] = False
@@ -798,6 +831,8 @@ with tab3:
                         edit_btn_key = f"edit_btn_exp_all_{row['job_level']}_{row['competency']}_{row['skill']}_{i}"
                         if st.button("✏️", key=edit_btn_key):
                             st.session_state[f"edit_exp_all_{i}"] = True
+                            # Remember the version being edited, to detect changes made meanwhile
+                            st.session_state[f"edit_exp_all_version_{i}"] = row.get("version")
                     with exp_cols[5]:
                         # Create a unique key by combining job level, competency, skill and index
                         del_btn_key = f"del_exp_all_{row['job_level']}_{row['competency']}_{row['skill']}_{i}"
@@ -805,7 +840,8 @@ with tab3:
                             success, message = delete_expectation(
                                 row["job_level"], 
                                 row["competency"], 
-                                row["skill"]
+                                row["skill"],
+                                organization_id=organization_id
                             )
                             if success:
                                 st.success(message)
@@ -829,12 +865,17 @@ with tab3:
                             edit_col1, edit_col2 = st.columns([1, 5])
                             with edit_col1:
                                 if st.button("Save", type="primary", key=f"save_exp_all_{i}"):
-                                    success, message = set_skill_expectation(
-                                        row["job_level"],
-                                        row["competency"],
-                                        row["skill"],
-                                        new_score
-                                    )
+                                    try:
+                                        success, message = set_skill_expectation(
+                                            row["job_level"],
+                                            row["competency"],
+                                            row["skill"],
+                                            new_score,
+                                            organization_id=organization_id,
+                                            expected_version=st.session_state.get(f"edit_exp_all_version_{i}")
+                                        )
+                                    except ConflictError as e:
+                                        success, message = False, str(e)
                                     if success:
                                         st.success(message)
                                         st.session_state[f"edit_exp_all_{i}"] = False
@@ -855,8 +896,8 @@ with tab4:
     st.write("Set the expected competency scores for each job level (separate from skills).")
     
     organization_id = get_current_organization_id()
-    levels_df = load_data_for_organization("levels", organization_id)
-    competencies_df = load_data_for_organization("competencies", organization_id)
+    levels_df = context.levels
+    competencies_df = context.competencies
     
     if levels_df.empty or competencies_df.empty:
         st.warning("You need to set up job levels and competencies first.")
@@ -905,7 +946,8 @@ with tab4:
                     success, message = set_competency_expectation(
                         selected_level, 
                         selected_comp, 
-                        expected_score
+                        expected_score,
+                        organization_id=organization_id
                     )
                     if success:
                         st.success(message)
@@ -923,7 +965,7 @@ with tab4:
         # Display Current Competency Expectations section
         st.subheader("Current Competency Expectations")
         organization_id = get_current_organization_id()
-        comp_expectations_df = load_data_for_organization("comp_expectations", organization_id)
+        comp_expectations_df = context.comp_expectations
         
         if not comp_expectations_df.empty:
             # Show filter options
@@ -982,13 +1024,16 @@ with tab4:
                             edit_btn_key = f"edit_btn_comp_exp_{row['job_level']}_{row['competency']}_{i}"
                             if st.button("✏️", key=edit_btn_key):
                                 st.session_state[f"edit_comp_exp_{i}"] = True
+                                # Remember the version being edited, to detect changes made meanwhile
+                                st.session_state[f"edit_comp_exp_version_{i}"] = row.get("version")
                         with exp_cols[3]:
                             # Create a unique key by combining job level, competency and index
                             del_btn_key = f"del_comp_exp_{row['job_level']}_{row['competency']}_{i}"
                             if st.button("🗑️", key=del_btn_key, type="secondary"):
                                 success, message = delete_competency_expectation(
                                     row["job_level"],
-                                    row["competency"]
+                                    row["competency"],
+                                    organization_id=organization_id
                                 )
                                 if success:
                                     st.success(message)
@@ -1012,11 +1057,16 @@ with tab4:
                                 edit_col1, edit_col2 = st.columns([1, 5])
                                 with edit_col1:
                                     if st.button("Save", type="primary", key=f"save_comp_exp_{i}"):
-                                        success, message = set_competency_expectation(
-                                            row["job_level"],
-                                            row["competency"],
-                                            new_score
-                                        )
+                                        try:
+                                            success, message = set_competency_expectation(
+                                                row["job_level"],
+                                                row["competency"],
+                                                new_score,
+                                                organization_id=organization_id,
+                                                expected_version=st.session_state.get(f"edit_comp_exp_version_{i}")
+                                            )
+                                        except ConflictError as e:
+                                            success, message = False, str(e)
                                         if success:
                                             st.success(message)
                                             st.session_state[f"edit_comp_exp_{i}"] = False
@@ -1073,13 +1123,16 @@ with tab4:
                         edit_btn_key = f"edit_btn_comp_exp_all_{row['job_level']}_{row['competency']}_{i}"
                         if st.button("✏️", key=edit_btn_key):
                             st.session_state[f"edit_comp_exp_all_{i}"] = True
+                            # Remember the version being edited, to detect changes made meanwhile
+                            st.session_state[f"edit_comp_exp_all_version_{i}"] = row.get("version")
                     with exp_cols[4]:
                         # Create a unique key by combining job level, competency and index
                         del_btn_key = f"del_comp_exp_all_{row['job_level']}_{row['competency']}_{i}"
                         if st.button("🗑️", key=del_btn_key, type="secondary"):
                             success, message = delete_competency_expectation(
                                 row["job_level"],
-                                row["competency"]
+                                row["competency"],
+                                organization_id=organization_id
                             )
                             if success:
                                 st.success(message)
@@ -1103,11 +1156,16 @@ with tab4:
                             edit_col1, edit_col2 = st.columns([1, 5])
                             with edit_col1:
                                 if st.button("Save", type="primary", key=f"save_comp_exp_all_{i}"):
-                                    success, message = set_competency_expectation(
-                                        row["job_level"],
-                                        row["competency"],
-                                        new_score
-                                    )
+                                    try:
+                                        success, message = set_competency_expectation(
+                                            row["job_level"],
+                                            row["competency"],
+                                            new_score,
+                                            organization_id=organization_id,
+                                            expected_version=st.session_state.get(f"edit_comp_exp_all_version_{i}")
+                                        )
+                                    except ConflictError as e:
+                                        success, message = False, str(e)
                                     if success:
                                         st.success(message)
                                         st.session_state[f"edit_comp_exp_all_{i}"] = False
@@ -1144,11 +1202,11 @@ with tab5:
             
             # Get job levels for dropdown
             organization_id = get_current_organization_id()
-            levels_df = load_data_for_organization("levels", organization_id)
+            levels_df = context.levels
             level_options = [""] + levels_df["name"].tolist() if not levels_df.empty else [""]
             
             # Get managers for dropdown
-            employees_df = load_data_for_organization("employees", organization_id)
+            employees_df = context.employees
             manager_options = [("", "None")] + [
                 (str(row["employee_id"]), row["name"]) 
                 for _, row in employees_df.iterrows()
@@ -1218,7 +1276,7 @@ with tab5:
     # Manage Existing Employees section
     st.subheader("Manage Existing Employees")
     organization_id = get_current_organization_id()
-    employees_df = load_data_for_organization("employees", organization_id)
+    employees_df = context.employees
     
     if not employees_df.empty:
         # Create a mapping of employee IDs to names for manager display
@@ -1289,6 +1347,8 @@ with tab5:
             with emp_cols[4]:
                 if st.button("✏️", key=f"edit_btn_emp_{emp_id}"):
                     st.session_state[f"edit_emp_{emp_id}"] = True
+                    # Remember the version being edited, to detect changes made meanwhile
+                    st.session_state[f"edit_emp_version_{emp_id}"] = row.get("version")
             with emp_cols[5]:
                 if st.button("🗑️", key=f"del_emp_btn_{emp_id}", type="secondary"):
                     success, message = delete_employee(emp_id)
@@ -1304,7 +1364,7 @@ with tab5:
                     st.markdown("### Edit Employee")
                     
                     # Get job levels for dropdown
-                    levels_df = load_data("levels")
+                    levels_df = context.levels
                     level_options = levels_df["name"].tolist() if not levels_df.empty else []
                     
                     # Get managers for dropdown (exclude the current employee)
@@ -1356,15 +1416,19 @@ with tab5:
                     action_col1, action_col2 = st.columns([1, 5])
                     with action_col1:
                         if st.button("Save", type="primary", key=f"save_emp_{emp_id}"):
-                            success, message = update_employee(
-                                emp_id,
-                                new_name,
-                                new_email,
-                                new_title,
-                                new_level,
-                                new_dept,
-                                new_manager_id
-                            )
+                            try:
+                                success, message = update_employee(
+                                    emp_id,
+                                    new_name,
+                                    new_email,
+                                    new_title,
+                                    new_level,
+                                    new_dept,
+                                    new_manager_id,
+                                    expected_version=st.session_state.get(f"edit_emp_version_{emp_id}")
+                                )
+                            except ConflictError as e:
+                                success, message = False, str(e)
                             if success:
                                 st.success(message)
                                 # Clear the editing state
@@ -11,9 +11,9 @@ st.set_page_config(
 import pandas as pd
 from datetime import datetime
 from data_manager import (
-    load_data, load_data_for_organization, add_assessment, get_employee_assessments,
-    get_latest_assessment, get_competency_skills,
-    add_competency_assessment, get_employee_competency_assessments,
+    get_org_context, add_assessments_bulk, get_employee_assessments,
+    get_latest_assessment,
+    add_competency_assessments_bulk, get_employee_competency_assessments,
     get_latest_competency_assessment, add_note, get_employee_notes
 )
 from utils import check_permission, check_page_access, get_user_id, is_manager_of, get_employees_for_manager
@@ -42,6 +42,9 @@ if not check_page_access(["admin", "manager", "employee", "email_user"]):
 # This page is accessible to all roles: admin, manager, employee, email_user
 
 
+# Load the organization's employees and framework once for this run
+context = get_org_context(get_current_organization_id())
+
 st.title("Employee Skill & Competency Assessment")
 
 # Get current employee ID (for self-assessment)
@@ -49,8 +52,8 @@ employee_id = get_user_id(st.session_state.username)
 
 # Check if framework is set up
 organization_id = get_current_organization_id()
-competencies_df = load_data_for_organization("competencies", organization_id)
-skills_df = load_data_for_organization("skills", organization_id)
+competencies_df = context.competencies
+skills_df = context.skills
 
 if competencies_df.empty or skills_df.empty:
     st.error("The competency framework has not been set up yet. Please ask an administrator to set it up.")
@@ -65,7 +68,7 @@ if st.session_state.user_role == "email_user":
         st.warning("Your user account is not linked to an employee record. Please contact an administrator.")
     else:
         organization_id = get_current_organization_id()
-        employees_df = load_data_for_organization("employees", organization_id)
+        employees_df = context.employees
         employee_info = employees_df[employees_df["employee_id"] == employee_id]
 
         if not employee_info.empty:
@@ -94,7 +97,7 @@ if st.session_state.user_role == "email_user":
                 selected_comp_id = competencies_df[competencies_df["name"] == selected_comp]["competency_id"].iloc[0]
 
                 # Get skills for selected competency
-                comp_skills = get_competency_skills(selected_comp_id)
+                comp_skills = context.skills_of(selected_comp_id)
 
                 if not comp_skills.empty:
                     st.write(f"Rate your proficiency in these skills from 1 to 5:")
@@ -132,20 +135,22 @@ if st.session_state.user_role == "email_user":
 
                     # Submit button for all skills in this competency
                     if st.button("Submit Skill Assessments", key="submit_self_skills"):
-                        for skill_name, score in skill_scores.items():
-                            success, message, _ = add_assessment(
-                                employee_id,
-                                selected_comp,
-                                skill_name,
-                                score,
-                                "self",
-                                skill_notes[skill_name]
-                            )
+                        success, message, _ = add_assessments_bulk([
+                            {
+                                "employee_id": employee_id,
+                                "competency": selected_comp,
+                                "skill": skill_name,
+                                "score": score,
+                                "assessment_type": "self",
+                                "notes": skill_notes[skill_name]
+                            }
+                            for skill_name, score in skill_scores.items()
+                        ])
 
-                            if success:
-                                st.success(f"Assessment for {skill_name} submitted successfully.")
-                            else:
-                                st.error(f"Error submitting assessment for {skill_name}: {message}")
+                        if success:
+                            st.success(f"Assessments for {len(skill_scores)} skills submitted successfully.")
+                        else:
+                            st.error(f"Error submitting skill assessments: {message}")
                 else:
                     st.info(f"No skills found for {selected_comp}. Please contact an administrator.")
 
@@ -191,19 +196,21 @@ if st.session_state.user_role == "email_user":
 
                 # Submit button for all competency assessments
                 if st.button("Submit Competency Assessments", key="submit_self_comps"):
-                    for comp_name, score in comp_scores.items():
-                        success, message, _ = add_competency_assessment(
-                            employee_id,
-                            comp_name,
-                            score,
-                            "self",
-                            comp_notes[comp_name]
-                        )
+                    success, message, _ = add_competency_assessments_bulk([
+                        {
+                            "employee_id": employee_id,
+                            "competency": comp_name,
+                            "score": score,
+                            "assessment_type": "self",
+                            "notes": comp_notes[comp_name]
+                        }
+                        for comp_name, score in comp_scores.items()
+                    ])
 
-                        if success:
-                            st.success(f"Assessment for {comp_name} competency submitted successfully.")
-                        else:
-                            st.error(f"Error submitting competency assessment for {comp_name}: {message}")
+                    if success:
+                        st.success(f"Assessments for {len(comp_scores)} competencies submitted successfully.")
+                    else:
+                        st.error(f"Error submitting competency assessments: {message}")
         else:
             st.warning("Employee record not found. Please contact an administrator.")
 
@@ -219,7 +226,7 @@ else:
             st.warning("Your user account is not linked to an employee record. Please contact an administrator.")
         else:
             organization_id = get_current_organization_id()
-            employees_df = load_data_for_organization("employees", organization_id)
+            employees_df = context.employees
             employee_info = employees_df[employees_df["employee_id"] == employee_id]
 
             if not employee_info.empty:
@@ -253,7 +260,7 @@ else:
                         selected_comp_id = competencies_df[competencies_df["name"] == selected_comp]["competency_id"].iloc[0]
 
                         # Get skills for selected competency
-                        comp_skills = get_competency_skills(selected_comp_id)
+                        comp_skills = context.skills_of(selected_comp_id)
 
                         if not comp_skills.empty:
                             # Create a better rating legend with columns
@@ -314,20 +321,22 @@ else:
                             submit_col1, submit_col2 = st.columns([1, 5])
                             with submit_col1:
                                 if st.button("Submit Assessment", type="primary", key="submit_self"):
-                                    for skill_name, score in skill_scores.items():
-                                        success, message, _ = add_assessment(
-                                            employee_id,
-                                            selected_comp,
-                                            skill_name,
-                                            score,
-                                            "self",
-                                            skill_notes[skill_name]
-                                        )
+                                    success, message, _ = add_assessments_bulk([
+                                        {
+                                            "employee_id": employee_id,
+                                            "competency": selected_comp,
+                                            "skill": skill_name,
+                                            "score": score,
+                                            "assessment_type": "self",
+                                            "notes": skill_notes[skill_name]
+                                        }
+                                        for skill_name, score in skill_scores.items()
+                                    ])
 
-                                        if success:
-                                            st.success(f"Assessment for {skill_name} submitted successfully.")
-                                        else:
-                                            st.error(f"Error submitting assessment for {skill_name}: {message}")
+                                    if success:
+                                        st.success(f"Assessments for {len(skill_scores)} skills submitted successfully.")
+                                    else:
+                                        st.error(f"Error submitting skill assessments: {message}")
                         else:
                             st.warning(f"No skills found for {selected_comp}. Please contact an administrator.")
 
@@ -398,19 +407,21 @@ else:
                         submit_col1, submit_col2 = st.columns([1, 5])
                         with submit_col1:
                             if st.button("Submit Assessment", type="primary", key="submit_self_comp"):
-                                for comp_name, score in comp_scores.items():
-                                    success, message, _ = add_competency_assessment(
-                                        employee_id,
-                                        comp_name,
-                                        score,
-                                        "self",
-                                        comp_notes[comp_name]
-                                    )
-
-                                    if success:
-                                        st.success(f"Assessment for {comp_name} competency submitted successfully.")
-                                    else:
-                                        st.error(f"Error submitting competency assessment for {comp_name}: {message}")
+                                success, message, _ = add_competency_assessments_bulk([
+                                    {
+                                        "employee_id": employee_id,
+                                        "competency": comp_name,
+                                        "score": score,
+                                        "assessment_type": "self",
+                                        "notes": comp_notes[comp_name]
+                                    }
+                                    for comp_name, score in comp_scores.items()
+                                ])
+
+                                if success:
+                                    st.success(f"Assessments for {len(comp_scores)} competencies submitted successfully.")
+                                else:
+                                    st.error(f"Error submitting competency assessments: {message}")
             else:
                 st.warning("Employee record not found. Please contact an administrator.")
 
@@ -421,7 +432,7 @@ else:
         # Check if user is a manager
         if st.session_state.user_role in ["admin", "manager"]:
             organization_id = get_current_organization_id()
-            employees_df = load_data_for_organization("employees", organization_id)
+            employees_df = context.employees
 
             # Get employees that this user manages
             if st.session_state.user_role == "admin":
@@ -480,7 +491,7 @@ else:
                             selected_comp_id = competencies_df[competencies_df["name"] == selected_comp]["competency_id"].iloc[0]
 
                             # Get skills for selected competency
-                            comp_skills = get_competency_skills(selected_comp_id)
+                            comp_skills = context.skills_of(selected_comp_id)
 
                             if not comp_skills.empty:
                                 # Create a better rating legend with columns
@@ -550,20 +561,22 @@ else:
                                 submit_col1, submit_col2 = st.columns([1, 5])
                                 with submit_col1:
                                     if st.button("Submit Assessment", type="primary", key="submit_manager"):
-                                        for skill_name, score in skill_scores.items():
-                                            success, message, _ = add_assessment(
-                                                selected_emp_id,
-                                                selected_comp,
-                                                skill_name,
-                                                score,
-                                                "manager",
-                                                skill_notes[skill_name]
-                                            )
-
-                                            if success:
-                                                st.success(f"Assessment for {skill_name} submitted successfully.")
-                                            else:
-                                                st.error(f"Error submitting assessment for {skill_name}: {message}")
+                                        success, message, _ = add_assessments_bulk([
+                                            {
+                                                "employee_id": selected_emp_id,
+                                                "competency": selected_comp,
+                                                "skill": skill_name,
+                                                "score": score,
+                                                "assessment_type": "manager",
+                                                "notes": skill_notes[skill_name]
+                                            }
+                                            for skill_name, score in skill_scores.items()
+                                        ])
+
+                                        if success:
+                                            st.success(f"Assessments for {len(skill_scores)} skills submitted successfully.")
+                                        else:
+                                            st.error(f"Error submitting skill assessments: {message}")
                             else:
                                 st.warning(f"No skills found for {selected_comp}. Please contact an administrator.")
 
@@ -643,19 +656,21 @@ else:
                             submit_col1, submit_col2 = st.columns([1, 5])
                             with submit_col1:
                                 if st.button("Submit Assessment", type="primary", key="submit_manager_comp"):
-                                    for comp_name, score in comp_scores.items():
-                                        success, message, _ = add_competency_assessment(
-                                            selected_emp_id,
-                                            comp_name,
-                                            score,
-                                            "manager",
-                                            comp_notes[comp_name]
-                                        )
+                                    success, message, _ = add_competency_assessments_bulk([
+                                        {
+                                            "employee_id": selected_emp_id,
+                                            "competency": comp_name,
+                                            "score": score,
+                                            "assessment_type": "manager",
+                                            "notes": comp_notes[comp_name]
+                                        }
+                                        for comp_name, score in comp_scores.items()
+                                    ])
 
-                                        if success:
-                                            st.success(f"Assessment for {comp_name} competency submitted successfully.")
-                                        else:
-                                            st.error(f"Error submitting competency assessment for {comp_name}: {message}")
+                                    if success:
+                                        st.success(f"Assessments for {len(comp_scores)} competencies submitted successfully.")
+                                    else:
+                                        st.error(f"Error submitting competency assessments: {message}")
                 else:
                     st.warning("Employee record not found.")
             else:
@@ -12,8 +12,8 @@ import pandas as pd
 import numpy as np
 from datetime import datetime
 from data_manager import (
-    load_data, load_data_for_organization, get_employee_assessments, calculate_employee_skill_means,
-    calculate_employee_competency_means, get_competency_skills, get_latest_assessment
+    load_data, get_org_context, get_employee_assessments, calculate_employee_skill_means,
+    calculate_employee_competency_means, get_latest_assessment, get_gap_analysis
 )
 from utils import check_permission, check_page_access, get_user_id, is_manager_of, get_employees_for_manager, get_current_organization_id, initialize_session_state
 from ui_helpers import load_custom_css
@@ -46,6 +46,9 @@ if not state["organization_selected"]:
 if not check_page_access(["admin", "manager", "employee"]):
     st.stop()
 
+# Load the organization's employees and framework once for this run
+context = get_org_context(get_current_organization_id())
+
 st.title("Individual Performance")
 
 # Select employee to view
@@ -59,7 +62,7 @@ if st.session_state.user_role == "employee":
 else:
     # Managers and admins can view employees
     organization_id = get_current_organization_id()
-    employees_df = load_data_for_organization("employees", organization_id)
+    employees_df = context.employees
     
     if employees_df.empty:
         st.warning("No employees found in the system.")
@@ -89,7 +92,7 @@ else:
 # If we have a valid employee ID, show their performance
 if employee_id:
     organization_id = get_current_organization_id()
-    employees_df = load_data_for_organization("employees", organization_id)
+    employees_df = context.employees
     employee_info = employees_df[employees_df["employee_id"] == employee_id]
     
     if not employee_info.empty:
@@ -136,7 +139,7 @@ if employee_id:
                 
                 # Combined competency radar chart
                 if not self_assessments.empty or not manager_assessments.empty:
-                    fig, error = combined_competency_radar(employee_id)
+                    fig, error = combined_competency_radar(employee_id, context=context)
                     if fig:
                         st.plotly_chart(fig, use_container_width=True)
                     else:
@@ -149,7 +152,7 @@ if employee_id:
                 
                 # Combined skill radar chart
                 if not self_assessments.empty or not manager_assessments.empty:
-                    fig, error = combined_skill_radar(employee_id)
+                    fig, error = combined_skill_radar(employee_id, context=context)
                     if fig:
                         st.plotly_chart(fig, use_container_width=True)
                     else:
@@ -174,7 +177,7 @@ if employee_id:
                 
                 # Use the combined comparison chart function that shows the mean of self and manager assessments
                 # together with next level expected values
-                fig, error = combined_comparison_radar_chart(employee_id, employee_level, comparison_view_type)
+                fig, error = combined_comparison_radar_chart(employee_id, employee_level, comparison_view_type, context=context)
                 if fig:
                     st.plotly_chart(fig, use_container_width=True)
                 else:
@@ -188,8 +191,8 @@ if employee_id:
             
             # Load data
             organization_id = get_current_organization_id()
-            competencies_df = load_data_for_organization("competencies", organization_id)
-            skills_df = load_data_for_organization("skills", organization_id)
+            competencies_df = context.competencies
+            skills_df = context.skills
             
             if not competencies_df.empty:
                 # Select competency to view
@@ -200,11 +203,15 @@ if employee_id:
                 selected_comp_id = competencies_df[competencies_df["name"] == selected_comp]["competency_id"].iloc[0]
                 
                 # Get skills for this competency
-                comp_skills = get_competency_skills(selected_comp_id)
+                comp_skills = context.skills_of(selected_comp_id)
                 
                 if not comp_skills.empty:
-                    # Get expected scores
-                    expectations_df = load_data_for_organization("expectations", organization_id)
+                    # Get the latest self and manager scores and the expected scores of every skill in one pass
+                    self_gaps = get_gap_analysis("self", organization_id).employee_gaps(employee_id).set_index("skill_id")
+                    manager_gaps = get_gap_analysis("manager", organization_id).employee_gaps(employee_id).set_index("skill_id")
+                    self_scores = self_gaps["score"].dropna().to_dict()
+                    manager_scores = manager_gaps["score"].dropna().to_dict()
+                    expected_scores = self_gaps["expected_score"].dropna().to_dict()
                     
                     # Create a table with skill details and assessments
                     skill_data = []
@@ -213,28 +220,20 @@ if employee_id:
                         skill_name = skill_row["name"]
                         
                         # Get the latest assessments
-                        self_assessment = get_latest_assessment(employee_id, selected_comp, skill_name, "self")
-                        manager_assessment = get_latest_assessment(employee_id, selected_comp, skill_name, "manager")
+                        self_score = self_scores.get(skill_row["skill_id"])
+                        manager_score = manager_scores.get(skill_row["skill_id"])
                         
                         # Get expected score for this skill
-                        expected_score = None
-                        if not expectations_df.empty:
-                            exp_row = expectations_df[
-                                (expectations_df["job_level"] == employee_level) &
-                                (expectations_df["competency"] == selected_comp) &
-                                (expectations_df["skill"] == skill_name)
-                            ]
-                            if not exp_row.empty:
-                                expected_score = exp_row.iloc[0]["expected_score"]
+                        expected_score = expected_scores.get(skill_row["skill_id"])
                         
                         skill_data.append({
                             "Skill": skill_name,
                             "Description": skill_row["description"],
-                            "Self Score": float(self_assessment["score"]) if self_assessment is not None else None,
-                            "Manager Score": float(manager_assessment["score"]) if manager_assessment is not None else None,
+                            "Self Score": float(self_score) if self_score is not None else None,
+                            "Manager Score": float(manager_score) if manager_score is not None else None,
                             "Expected Score": expected_score,
-                            "Gap to Expected (Self)": (float(self_assessment["score"]) - expected_score) if self_assessment is not None and expected_score is not None else None,
-                            "Gap to Expected (Manager)": (float(manager_assessment["score"]) - expected_score) if manager_assessment is not None and expected_score is not None else None,
+                            "Gap to Expected (Self)": (float(self_score) - expected_score) if self_score is not None and expected_score is not None else None,
+                            "Gap to Expected (Manager)": (float(manager_score) - expected_score) if manager_score is not None and expected_score is not None else None,
                         })
                     
                     # Convert to DataFrame for display
@@ -297,8 +296,8 @@ if employee_id:
             
             # Load competencies and skills
             organization_id = get_current_organization_id()
-            competencies_df = load_data_for_organization("competencies", organization_id)
-            skills_df = load_data_for_organization("skills", organization_id)
+            competencies_df = context.competencies
+            skills_df = context.skills
             
             if not competencies_df.empty and not skills_df.empty:
                 # Select competency and skill
@@ -312,7 +311,7 @@ if employee_id:
                 selected_comp_id = competencies_df[competencies_df["name"] == selected_comp]["competency_id"].iloc[0]
                 
                 # Get skills for this competency
-                comp_skills = get_competency_skills(selected_comp_id)
+                comp_skills = context.skills_of(selected_comp_id)
                 
                 with col2:
                     if not comp_skills.empty:
@@ -324,7 +323,7 @@ if employee_id:
                 
                 if selected_skill:
                     # Show progress chart
-                    fig, error = skill_improvement_chart(employee_id, selected_comp, selected_skill)
+                    fig, error = skill_improvement_chart(employee_id, selected_comp, selected_skill, context=context)
                     if fig:
                         st.plotly_chart(fig, use_container_width=True)
                     else:
@@ -332,7 +331,7 @@ if employee_id:
                     
                     # Show assessment history
                     st.subheader("Assessment History")
-                    assessments_df = load_data("assessments")
+                    assessments_df = load_data("assessments", filters={"employee_id": employee_id})
                     
                     if not assessments_df.empty:
                         skill_history = assessments_df[
@@ -351,7 +350,7 @@ if employee_id:
                             
                             # Group by date and type, keeping the latest assessment for each
                             latest_day_assessments = []
-                            for (day, assess_type), group in skill_history.groupby(["assessment_day", "assessment_type"]):
+                            for (day, assess_type), group in skill_history.groupby(["assessment_day", "assessment_type"], observed=True):
                                 # Get the one with highest assessment_id within the group (most recent)
                                 latest_day_assessments.append(group.iloc[0])
                             
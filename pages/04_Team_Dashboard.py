@@ -11,14 +11,15 @@ st.set_page_config(
 import pandas as pd
 import numpy as np
 from data_manager import (
-    load_data, load_data_for_organization, get_employees_for_manager, get_employee_assessments,
-    get_team_competency_means
+    load_data, get_org_context, get_employees_for_manager, get_employee_assessments,
+    get_team_competency_means, get_reporting_hierarchy, get_score_rollup, team_comparison_matrix
 )
 from utils import check_permission, check_page_access, get_user_id, calculate_mean, get_current_organization_id, initialize_session_state
 from ui_helpers import load_custom_css
 from visualizations import (
     team_skill_radar, team_competency_radar, competency_bar_chart, team_heatmap,
-    create_radar_chart, combined_team_skill_radar, combined_team_competency_radar
+    create_radar_chart, combined_team_skill_radar, combined_team_competency_radar,
+    HEATMAP_GROUPS, HEATMAP_SKILL_ORDERS
 )
 
 # Load custom CSS for consistent styling
@@ -49,6 +50,9 @@ if not check_permission("manager"):
     st.error("You don't have permission to access this page.")
     st.stop()
 
+# Load the organization's employees and framework once for this run
+context = get_org_context(get_current_organization_id())
+
 st.title("Team Skills Dashboard")
 
 # For managers, show their team
@@ -59,7 +63,7 @@ manager_id = None
 if st.session_state.user_role == "admin":
     # Allow filtering by department or manager
     organization_id = get_current_organization_id()
-    employees_df = load_data_for_organization("employees", organization_id)
+    employees_df = context.employees
     
     if not employees_df.empty:
         filter_type = st.radio("Filter by", ["Department", "Manager"], horizontal=True)
@@ -92,13 +96,18 @@ else:
 
 # Get team members based on filters
 organization_id = get_current_organization_id()
-employees_df = load_data_for_organization("employees", organization_id)
+employees_df = context.employees
 team_members = pd.DataFrame()
 
 if department_filter:
     team_members = employees_df[employees_df["department"] == department_filter]
 elif manager_id:
-    team_members = get_employees_for_manager(manager_id)
+    include_indirect = st.checkbox(
+        "Include indirect reports",
+        key="team_dashboard_include_indirect",
+        help="Also include the employees reporting to this manager through other managers"
+    )
+    team_members = get_employees_for_manager(manager_id, include_indirect=include_indirect)
 else:
     st.warning("Please select a department or manager.")
     st.stop()
@@ -109,14 +118,26 @@ if team_members.empty:
 
 # Display team overview
 st.header(f"Team Overview: {department_filter or team_members.iloc[0]['department']}")
-st.write(f"Team size: {len(team_members)}")
+if manager_id and not department_filter:
+    hierarchy = get_reporting_hierarchy()
+    st.write(f"Team size: {len(team_members)} ({hierarchy.span_of_control(manager_id)} direct reports)")
+else:
+    st.write(f"Team size: {len(team_members)}")
 
-# Get all assessments for team members
-assessments_df = load_data_for_organization("assessments", organization_id)
-team_assessments = pd.DataFrame()
+# Select the team's cells of the analytics cube: its department, or the
+# employees reporting to the manager (or to anyone below them)
+if department_filter:
+    team_filters = {"department": department_filter}
+else:
+    team_filters = {"manager_id": [manager_id] + (hierarchy.descendants(manager_id) if include_indirect else [])}
+if organization_id is not None:
+    team_filters["organization_id"] = organization_id
 
-if not assessments_df.empty:
-    team_assessments = assessments_df[assessments_df["employee_id"].isin(team_members["employee_id"])]
+# Get all assessments for team members, reading only their rows of the organization's partition
+team_assessments = load_data(
+    "assessments",
+    filters={"organization_id": organization_id, "employee_id": team_members["employee_id"].tolist()}
+)
 
 if team_assessments.empty:
     st.warning("No assessment data available for this team.")
@@ -144,7 +165,7 @@ with tab1:
     # Create team skills radar chart
     if visual_type == "Skills":
         st.subheader("Team Skills Radar")
-        fig, error = combined_team_skill_radar(team_assessments)
+        fig, error = combined_team_skill_radar(team_assessments, context=context)
         if fig:
             st.plotly_chart(fig, use_container_width=True)
         else:
@@ -152,17 +173,33 @@ with tab1:
     else:
         # Create team competencies radar chart
         st.subheader("Team Competencies")
-        fig, error = combined_team_competency_radar(team_assessments)
+        fig, error = combined_team_competency_radar(team_assessments, context=context)
         if fig:
             st.plotly_chart(fig, use_container_width=True)
         else:
             st.info(error or "Could not create team competencies radar chart.")
     
     # Team skills heatmap
-    st.subheader("Skills by Job Level")
+    st.subheader("Skills Heatmap")
+    heatmap_cols = st.columns(2)
+    with heatmap_cols[0]:
+        heatmap_group = st.selectbox(
+            "Rows",
+            list(HEATMAP_GROUPS),
+            format_func=HEATMAP_GROUPS.get,
+            key="team_heatmap_group"
+        )
+    with heatmap_cols[1]:
+        heatmap_order = st.selectbox(
+            "Order Skills By",
+            list(HEATMAP_SKILL_ORDERS),
+            format_func=HEATMAP_SKILL_ORDERS.get,
+            key="team_heatmap_skill_order"
+        )
+    
     # Display the heatmap for the selected assessment type (for now use "self")
     filtered_assessments = team_assessments[team_assessments["assessment_type"] == "self"]
-    fig, error = team_heatmap(filtered_assessments)
+    fig, error = team_heatmap(filtered_assessments, group_by=heatmap_group, skill_order=heatmap_order, context=context)
     if fig:
         st.plotly_chart(fig, use_container_width=True)
     else:
@@ -173,16 +210,16 @@ with tab2:
     st.header("Competency Analysis")
     
     # Load skill expectations
-    expectations_df = load_data_for_organization("expectations", organization_id)
+    expectations_df = context.expectations
     
     # Select job level for expectations comparison
-    levels_df = load_data_for_organization("levels", organization_id)
+    levels_df = context.levels
     if not levels_df.empty and not expectations_df.empty:
         level_options = sorted(expectations_df["job_level"].unique())
         selected_level = st.selectbox("Compare Against Job Level", level_options, key="team_dashboard_job_level_select")
         
         # Filter expectations for selected level
-        level_expectations = expectations_df[expectations_df["job_level"] == selected_level]
+        level_expectations = context.expectations_for(selected_level)
     else:
         level_expectations = None
         selected_level = None
@@ -206,23 +243,25 @@ with tab2:
     competencies = sorted(filtered_assessments["competency"].unique())
     
     # Create chart
-    fig, error = competency_bar_chart(filtered_assessments, level_expectations)
+    fig, error = competency_bar_chart(filtered_assessments, level_expectations, context=context)
     if fig:
         st.plotly_chart(fig, use_container_width=True)
     else:
         st.info(error or "Could not create competency bar chart.")
     
-    # Table of mean scores by competency
-    st.subheader("Mean Scores by Competency")
+    # Table of mean latest scores by competency
+    st.subheader("Mean Latest Scores by Competency")
+    st.caption("Means of each team member's latest score per skill; the chart above includes every assessment.")
     
     if not filtered_assessments.empty:
-        # Calculate mean scores
-        competency_means = filtered_assessments.groupby(["competency"])["score"].mean().reset_index()
+        # Look up the mean latest scores in the analytics cube
+        competency_means = get_score_rollup(["competency_id"], assessment_type=assessment_type, **team_filters)
+        competency_means = competency_means[["competency", "mean"]].rename(columns={"mean": "score"})
         competency_means["score"] = competency_means["score"].round(2)
         
         # Add expectations if available
         if level_expectations is not None:
-            expected_means = level_expectations.groupby(["competency"])["expected_score"].mean().reset_index()
+            expected_means = level_expectations.groupby(["competency"], observed=True)["expected_score"].mean().reset_index()
             
             # Merge with actual scores
             competency_means = competency_means.merge(
@@ -239,7 +278,7 @@ with tab2:
             # Format for display
             competency_means = competency_means.rename(columns={
                 "competency": "Competency",
-                "score": f"Actual Score ({assessment_type})",
+                "score": f"Latest Score ({assessment_type})",
                 "expected_score": f"Expected Score (Level {selected_level})",
                 "gap": "Gap"
             })
@@ -247,7 +286,7 @@ with tab2:
             # Format for display
             competency_means = competency_means.rename(columns={
                 "competency": "Competency",
-                "score": f"Mean Score ({assessment_type})"
+                "score": f"Mean Latest Score ({assessment_type})"
             })
         
         st.dataframe(competency_means)
@@ -256,9 +295,6 @@ with tab2:
 with tab3:
     st.header("Individual Member Comparison")
     
-    # Create data for comparison
-    comparison_data = []
-    
     # Get all competencies
     competencies = sorted(team_assessments["competency"].unique()) if not team_assessments.empty else []
     
@@ -271,54 +307,14 @@ with tab3:
         format_func=lambda x: "Self Assessment" if x == "self" else "Manager Assessment"
     )
     
-    # For each team member, calculate mean scores by competency
-    for _, employee_row in team_members.iterrows():
-        emp_id = employee_row["employee_id"]
-        emp_name = employee_row["name"]
-        
-        employee_assessments = team_assessments[
-            (team_assessments["employee_id"] == emp_id) &
-            (team_assessments["assessment_type"] == assessment_type)
-        ]
-        
-        if not employee_assessments.empty:
-            # Calculate mean for each competency
-            emp_data = {"Employee": emp_name}
-            
-            for comp in competencies:
-                comp_assessments = employee_assessments[employee_assessments["competency"] == comp]
-                if not comp_assessments.empty:
-                    emp_data[comp] = round(comp_assessments["score"].mean(), 2)
-                else:
-                    emp_data[comp] = None
-            
-            # Calculate overall mean
-            emp_data["Overall Mean"] = round(employee_assessments["score"].mean(), 2)
-            
-            comparison_data.append(emp_data)
+    # Mean scores of every team member by competency, with the team averages
+    comparison_df = team_comparison_matrix(team_members["employee_id"].tolist(), assessment_type, organization_id)
     
-    if comparison_data:
-        # Create DataFrame for display
-        comparison_df = pd.DataFrame(comparison_data)
-        
-        # Calculate team means for each competency
-        team_means = {"Employee": "TEAM AVERAGE"}
-        
-        for comp in competencies:
-            comp_assessments = team_assessments[
-                (team_assessments["competency"] == comp) &
-                (team_assessments["assessment_type"] == assessment_type)
-            ]
-            if not comp_assessments.empty:
-                team_means[comp] = round(comp_assessments["score"].mean(), 2)
-            else:
-                team_means[comp] = None
-        
-        # Calculate overall team mean
-        team_means["Overall Mean"] = round(team_assessments[team_assessments["assessment_type"] == assessment_type]["score"].mean(), 2)
-        
-        # Add team means to comparison data
-        comparison_df = pd.concat([comparison_df, pd.DataFrame([team_means])], ignore_index=True)
+    if not comparison_df.empty:
+        # Format for display
+        comparison_df = comparison_df.rename(columns={"name": "Employee"})
+        comparison_df = comparison_df.reindex(columns=["Employee"] + competencies + ["Overall Mean", "Rank"])
+        comparison_df[competencies + ["Overall Mean"]] = comparison_df[competencies + ["Overall Mean"]].round(2)
         
         # Sort by overall mean
         comparison_df = comparison_df.sort_values("Overall Mean", ascending=False)
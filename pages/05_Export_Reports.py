@@ -16,11 +16,13 @@ from io import BytesIO
 import base64
 from datetime import datetime
 from data_manager import (
-    load_data, load_data_for_organization, get_employee_assessments, calculate_employee_skill_means,
-    get_competency_skills, get_latest_assessment
+    load_data_for_organization, get_org_context, get_employee_assessments, calculate_employee_skill_means,
+    get_latest_assessment, get_reporting_hierarchy, get_gap_analysis
 )
 from utils import check_permission, check_page_access, get_user_id, is_manager_of, get_employees_for_manager, get_current_organization_id, initialize_session_state
 from ui_helpers import load_custom_css
+from exports import EXPORT_FORMATS, export_file_name
+from report_jobs import FAILED, get_report_queue, submit_export, submit_report_table
 from visualizations import (
     employee_skill_radar, comparison_radar_chart, team_skill_radar, team_competency_radar
 )
@@ -53,6 +55,9 @@ if not check_permission("manager"):
     st.error("You don't have permission to access this page.")
     st.stop()
 
+# Load the organization's employees and framework once for this run
+context = get_org_context(get_current_organization_id())
+
 st.title("Export Reports")
 st.write("Generate and export reports for individuals or teams")
 
@@ -73,11 +78,36 @@ def get_excel_download_link(df, filename):
     href = f'<a href="data:application/vnd.openxmlformats-officedocument.spreadsheetml.sheet;base64,{b64}" download="{filename}">Download Excel</a>'
     return href
 
+# Seconds to wait for a background report before showing its progress instead
+REPORT_WAIT_SECONDS = 0.5
+
+# Show the progress of a background report, checking it every second until it finishes
+@st.fragment(run_every=1)
+def report_job_progress(job_id):
+    job = get_report_queue().get(job_id)
+    if job is None or job.done:
+        st.rerun()
+    st.progress(job.progress, text=job.message)
+
+# Generate a report table in the background, returning its job once it has finished
+def finished_report(report, organization_id, export_format="csv", **params):
+    job = submit_report_table(report, organization_id, export_format, **params)
+    # Reports that are stored or quick to build are shown in this run
+    job.wait(REPORT_WAIT_SECONDS)
+    if not job.done:
+        report_job_progress(job.job_id)
+        return None
+    if job.status == FAILED:
+        st.error(f"The report failed: {job.message}")
+        return None
+    return job
+
 # Create tabs for different report types
-tab1, tab2, tab3 = st.tabs([
+tab1, tab2, tab3, tab4 = st.tabs([
     "Individual Reports", 
     "Team Reports",
-    "Framework Reports"
+    "Framework Reports",
+    "Data Export"
 ])
 
 # Individual Reports Tab
@@ -86,7 +116,7 @@ with tab1:
     
     # Get list of employees the user can access
     organization_id = get_current_organization_id()
-    employees_df = load_data_for_organization("employees", organization_id)
+    employees_df = context.employees
     
     if employees_df.empty:
         st.warning("No employees found in the system.")
@@ -135,55 +165,24 @@ with tab1:
                     # Create full assessment report
                     st.subheader(f"Full Assessment Report: {employee_info['name']}")
                     
-                    # Prepare data
-                    report_data = []
-                    
-                    competencies_df = load_data_for_organization("competencies", organization_id)
-                    skills_df = load_data_for_organization("skills", organization_id)
-                    expectations_df = load_data_for_organization("expectations", organization_id)
+                    # Get the expected score of every skill for the employee's level
+                    expected_scores = get_gap_analysis(organization_id=organization_id).employee_gaps(selected_emp_id).set_index("skill_id")["expected_score"]
                     
                     # Get all assessments and organize by competency and skill
                     all_assessments = pd.concat([self_assessments, manager_assessments])
-                    if not all_assessments.empty:
-                        for _, assessment in all_assessments.iterrows():
-                            competency = assessment["competency"]
-                            skill = assessment["skill"]
-                            assessment_type = assessment["assessment_type"]
-                            score = assessment["score"]
-                            date = pd.to_datetime(assessment["assessment_date"]).strftime("%Y-%m-%d")
-                            notes = assessment["notes"]
-                            
-                            # Get expected score if available
-                            expected_score = None
-                            if not expectations_df.empty:
-                                exp_row = expectations_df[
-                                    (expectations_df["job_level"] == employee_info["job_level"]) &
-                                    (expectations_df["competency"] == competency) &
-                                    (expectations_df["skill"] == skill)
-                                ]
-                                if not exp_row.empty:
-                                    expected_score = exp_row.iloc[0]["expected_score"]
-                            
-                            # Calculate gap
-                            gap = None
-                            if expected_score is not None:
-                                gap = float(score) - float(expected_score)
-                            
-                            report_data.append({
-                                "Competency": competency,
-                                "Skill": skill,
-                                "Assessment Type": assessment_type.capitalize(),
-                                "Score": score,
-                                "Expected Score": expected_score,
-                                "Gap": gap,
-                                "Assessment Date": date,
-                                "Notes": notes
-                            })
+                    expected = all_assessments["skill_id"].map(expected_scores).astype(float)
+                    report_df = pd.DataFrame({
+                        "Competency": all_assessments["competency"],
+                        "Skill": all_assessments["skill"],
+                        "Assessment Type": all_assessments["assessment_type"].astype(str).str.capitalize(),
+                        "Score": all_assessments["score"],
+                        "Expected Score": expected,
+                        "Gap": all_assessments["score"].astype(float) - expected,
+                        "Assessment Date": pd.to_datetime(all_assessments["assessment_date"]).dt.strftime("%Y-%m-%d"),
+                        "Notes": all_assessments["notes"]
+                    }).reset_index(drop=True)
                     
-                    if report_data:
-                        # Convert to DataFrame
-                        report_df = pd.DataFrame(report_data)
-                        
+                    if not report_df.empty:
                         # Display preview
                         st.dataframe(report_df)
                         
@@ -201,19 +200,19 @@ with tab1:
                         with col1:
                             # Radar chart for self assessment
                             if not self_assessments.empty:
-                                fig, _ = employee_skill_radar(selected_emp_id, "self")
+                                fig, _ = employee_skill_radar(selected_emp_id, "self", context=context)
                                 if fig:
                                     st.plotly_chart(fig, use_container_width=True)
                         
                         with col2:
                             # Radar chart for manager assessment
                             if not manager_assessments.empty:
-                                fig, _ = employee_skill_radar(selected_emp_id, "manager")
+                                fig, _ = employee_skill_radar(selected_emp_id, "manager", context=context)
                                 if fig:
                                     st.plotly_chart(fig, use_container_width=True)
                         
                         # Comparison radar chart
-                        fig, _ = comparison_radar_chart(selected_emp_id, employee_info["job_level"], "manager" if not manager_assessments.empty else "self")
+                        fig, _ = comparison_radar_chart(selected_emp_id, employee_info["job_level"], "manager" if not manager_assessments.empty else "self", context=context)
                         if fig:
                             st.plotly_chart(fig, use_container_width=True)
                     else:
@@ -285,97 +284,73 @@ with tab1:
                     # Create skills gap analysis report
                     st.subheader(f"Skills Gap Analysis: {employee_info['name']}")
                     
-                    # Get expected scores
-                    expectations_df = load_data_for_organization("expectations", organization_id)
+                    # Get the expected score of every skill for the employee's level
+                    expected_scores = get_gap_analysis(organization_id=organization_id).employee_gaps(selected_emp_id).set_index("skill_id")["expected_score"].dropna()
                     
-                    if expectations_df.empty:
-                        st.warning("No skill expectations defined in the system.")
+                    if expected_scores.empty:
+                        st.warning(f"No skill expectations defined for job level: {employee_info['job_level']}")
                     else:
-                        # Filter expectations for this employee's job level
-                        level_expectations = expectations_df[expectations_df["job_level"] == employee_info["job_level"]]
+                        # Prefer manager assessments if available, otherwise use self
+                        assessment_type = "manager" if not manager_assessments.empty else "self"
+                        assessments = manager_assessments if assessment_type == "manager" else self_assessments
                         
-                        if level_expectations.empty:
-                            st.warning(f"No skill expectations defined for job level: {employee_info['job_level']}")
-                        else:
-                            # Prepare gap analysis data
-                            gap_data = []
-                            
-                            # Prefer manager assessments if available, otherwise use self
-                            assessment_type = "manager" if not manager_assessments.empty else "self"
-                            assessments = manager_assessments if assessment_type == "manager" else self_assessments
-                            
-                            if not assessments.empty:
-                                for _, assessment in assessments.iterrows():
-                                    competency = assessment["competency"]
-                                    skill = assessment["skill"]
-                                    score = float(assessment["score"])
-                                    
-                                    # Find matching expectation
-                                    expected_row = level_expectations[
-                                        (level_expectations["competency"] == competency) &
-                                        (level_expectations["skill"] == skill)
-                                    ]
-                                    
-                                    if not expected_row.empty:
-                                        expected_score = float(expected_row.iloc[0]["expected_score"])
-                                        gap = score - expected_score
-                                        
-                                        gap_data.append({
-                                            "Competency": competency,
-                                            "Skill": skill,
-                                            "Current Score": score,
-                                            "Expected Score": expected_score,
-                                            "Gap": round(gap, 2),
-                                            "Assessment Type": assessment_type.capitalize(),
-                                            "Assessment Date": pd.to_datetime(assessment["assessment_date"]).strftime("%Y-%m-%d")
-                                        })
+                        if not assessments.empty:
+                            # Match every assessment with its expectation in one pass
+                            assessments = assessments[assessments["skill_id"].isin(expected_scores.index)]
+                            expected = assessments["skill_id"].map(expected_scores).astype(float)
+                            gap_df = pd.DataFrame({
+                                "Competency": assessments["competency"],
+                                "Skill": assessments["skill"],
+                                "Current Score": assessments["score"].astype(float),
+                                "Expected Score": expected,
+                                "Gap": (assessments["score"].astype(float) - expected).round(2),
+                                "Assessment Type": assessment_type.capitalize(),
+                                "Assessment Date": pd.to_datetime(assessments["assessment_date"]).dt.strftime("%Y-%m-%d")
+                            }).reset_index(drop=True)
+                            
+                            if not gap_df.empty:
+                                # Sort by gap (ascending to show biggest gaps first)
+                                gap_df = gap_df.sort_values("Gap")
                                 
-                                if gap_data:
-                                    # Convert to DataFrame
-                                    gap_df = pd.DataFrame(gap_data)
-                                    
-                                    # Sort by gap (ascending to show biggest gaps first)
-                                    gap_df = gap_df.sort_values("Gap")
-                                    
-                                    # Display preview
-                                    st.dataframe(gap_df)
-                                    
-                                    # Create download links
-                                    st.markdown("### Download Report")
-                                    filename = f"Skills_Gap_Analysis_{employee_info['name'].replace(' ', '_')}_{datetime.now().strftime('%Y%m%d')}"
-                                    
-                                    st.markdown(get_csv_download_link(gap_df, f"{filename}.csv"), unsafe_allow_html=True)
-                                    st.markdown(get_excel_download_link(gap_df, f"{filename}.xlsx"), unsafe_allow_html=True)
-                                    
-                                    # Show visualization
-                                    st.subheader("Visualization")
-                                    
-                                    # Create bar chart of skill gaps
-                                    fig = px.bar(
-                                        gap_df,
-                                        x="Skill",
-                                        y="Gap",
-                                        color="Competency",
-                                        hover_data=["Current Score", "Expected Score"],
-                                        title="Skill Gaps Analysis",
-                                        labels={"Skill": "Skill", "Gap": "Gap (Current - Expected)", "Competency": "Competency"}
-                                    )
-                                    
-                                    # Add zero line
-                                    fig.add_shape(
-                                        type="line",
-                                        x0=-0.5,
-                                        x1=len(gap_df)-0.5,
-                                        y0=0,
-                                        y1=0,
-                                        line=dict(color="black", width=1, dash="dash")
-                                    )
-                                    
-                                    st.plotly_chart(fig, use_container_width=True)
-                                else:
-                                    st.info("No matching skill expectations found for this employee's assessments.")
+                                # Display preview
+                                st.dataframe(gap_df)
+                                
+                                # Create download links
+                                st.markdown("### Download Report")
+                                filename = f"Skills_Gap_Analysis_{employee_info['name'].replace(' ', '_')}_{datetime.now().strftime('%Y%m%d')}"
+                                
+                                st.markdown(get_csv_download_link(gap_df, f"{filename}.csv"), unsafe_allow_html=True)
+                                st.markdown(get_excel_download_link(gap_df, f"{filename}.xlsx"), unsafe_allow_html=True)
+                                
+                                # Show visualization
+                                st.subheader("Visualization")
+                                
+                                # Create bar chart of skill gaps
+                                fig = px.bar(
+                                    gap_df,
+                                    x="Skill",
+                                    y="Gap",
+                                    color="Competency",
+                                    hover_data=["Current Score", "Expected Score"],
+                                    title="Skill Gaps Analysis",
+                                    labels={"Skill": "Skill", "Gap": "Gap (Current - Expected)", "Competency": "Competency"}
+                                )
+                                
+                                # Add zero line
+                                fig.add_shape(
+                                    type="line",
+                                    x0=-0.5,
+                                    x1=len(gap_df)-0.5,
+                                    y0=0,
+                                    y1=0,
+                                    line=dict(color="black", width=1, dash="dash")
+                                )
+                                
+                                st.plotly_chart(fig, use_container_width=True)
                             else:
-                                st.info("No assessment data available for gap analysis.")
+                                st.info("No matching skill expectations found for this employee's assessments.")
+                        else:
+                            st.info("No assessment data available for gap analysis.")
         else:
             st.info("You don't have access to any employee records.")
 
@@ -384,7 +359,7 @@ with tab2:
     st.header("Team Performance Reports")
     
     # Get department or team data
-    employees_df = load_data_for_organization("employees", organization_id)
+    employees_df = context.employees
     assessments_df = load_data_for_organization("assessments", organization_id)
     
     if employees_df.empty or assessments_df.empty:
@@ -402,6 +377,7 @@ with tab2:
                 # Filter employees by department
                 team_members = employees_df[employees_df["department"] == selected_filter]
                 team_name = f"Department: {selected_filter}"
+                team_filters = {"department": selected_filter}
             else:
                 # Get all managers
                 managers_df = employees_df[employees_df["employee_id"].isin(employees_df["manager_id"].dropna().unique())]
@@ -415,9 +391,21 @@ with tab2:
                     selected_manager_idx = manager_names.index(selected_manager)
                     selected_manager_id = manager_ids[selected_manager_idx]
                     
+                    include_indirect = st.checkbox(
+                        "Include indirect reports",
+                        key="team_report_include_indirect",
+                        help="Also include the employees reporting to this manager through other managers"
+                    )
+                    
                     # Filter employees by manager
-                    team_members = employees_df[employees_df["manager_id"] == selected_manager_id]
+                    hierarchy = get_reporting_hierarchy()
+                    if include_indirect:
+                        report_ids = hierarchy.descendants(selected_manager_id)
+                    else:
+                        report_ids = hierarchy.direct_reports(selected_manager_id)
+                    team_members = employees_df[employees_df["employee_id"].isin(report_ids)]
                     team_name = f"Team: {selected_manager}"
+                    team_filters = {"manager_id": [selected_manager_id] + (report_ids if include_indirect else [])}
                 else:
                     st.warning("No managers found in the system.")
                     team_members = pd.DataFrame()
@@ -433,9 +421,21 @@ with tab2:
                 # Get manager name
                 manager_name = employees_df[employees_df["employee_id"] == manager_id]["name"].iloc[0]
                 
+                include_indirect = st.checkbox(
+                    "Include indirect reports",
+                    key="team_report_include_indirect",
+                    help="Also include the employees reporting to you through other managers"
+                )
+                
                 # Get team members
-                team_members = employees_df[employees_df["manager_id"] == manager_id]
+                hierarchy = get_reporting_hierarchy()
+                if include_indirect:
+                    report_ids = hierarchy.descendants(manager_id)
+                else:
+                    report_ids = hierarchy.direct_reports(manager_id)
+                team_members = employees_df[employees_df["employee_id"].isin(report_ids)]
                 team_name = f"Team: {manager_name}"
+                team_filters = {"manager_id": [manager_id] + (report_ids if include_indirect else [])}
         
         if not team_members.empty:
             # Get team member IDs
@@ -464,39 +464,27 @@ with tab2:
                 
                 if assessment_type != "both":
                     filtered_assessments = team_assessments[team_assessments["assessment_type"] == assessment_type]
+                    report_assessment_type = assessment_type
                 else:
                     filtered_assessments = team_assessments
+                    report_assessment_type = None
                 
                 if report_type == "Team Competency Summary":
                     # Create team competency summary report
                     st.subheader(f"Team Competency Summary: {team_name}")
                     
                     if not filtered_assessments.empty:
-                        # Group by competency
-                        competency_data = []
+                        # The latest score statistics of each competency, from the analytics cube
+                        job = finished_report(
+                            "team_competency_summary",
+                            organization_id,
+                            employee_ids=team_ids,
+                            team_filters=team_filters,
+                            assessment_type=report_assessment_type
+                        )
+                        comp_df = pd.read_csv(job.path) if job is not None else None
                         
-                        for comp in filtered_assessments["competency"].unique():
-                            comp_assessments = filtered_assessments[filtered_assessments["competency"] == comp]
-                            
-                            mean_score = comp_assessments["score"].mean()
-                            min_score = comp_assessments["score"].min()
-                            max_score = comp_assessments["score"].max()
-                            
-                            competency_data.append({
-                                "Competency": comp,
-                                "Mean Score": round(mean_score, 2),
-                                "Min Score": min_score,
-                                "Max Score": max_score,
-                                "Range": round(max_score - min_score, 2),
-                                "Number of Assessments": len(comp_assessments),
-                                "Number of Skills": len(comp_assessments["skill"].unique()),
-                                "Number of Employees": len(comp_assessments["employee_id"].unique())
-                            })
-                        
-                        if competency_data:
-                            # Convert to DataFrame
-                            comp_df = pd.DataFrame(competency_data)
-                            
+                        if comp_df is not None and not comp_df.empty:
                             # Display preview
                             st.dataframe(comp_df)
                             
@@ -511,7 +499,7 @@ with tab2:
                             st.subheader("Visualization")
                             
                             # Team radar chart
-                            fig, _ = team_competency_radar(filtered_assessments, f"Team Competency Summary ({assessment_type.capitalize()})")
+                            fig, _ = team_competency_radar(filtered_assessments, f"Team Competency Summary ({assessment_type.capitalize()})", context=context)
                             if fig:
                                 st.plotly_chart(fig, use_container_width=True)
                                 
@@ -520,25 +508,25 @@ with tab2:
                             
                             fig.add_trace(go.Bar(
                                 x=comp_df["Competency"],
-                                y=comp_df["Mean Score"],
+                                y=comp_df["Mean Latest Score"],
                                 error_y=dict(
                                     type='data',
-                                    array=[(max - mean) for max, mean in zip(comp_df["Max Score"], comp_df["Mean Score"])],
-                                    arrayminus=[(mean - min) for min, mean in zip(comp_df["Min Score"], comp_df["Mean Score"])],
+                                    array=[(max - mean) for max, mean in zip(comp_df["Max Latest Score"], comp_df["Mean Latest Score"])],
+                                    arrayminus=[(mean - min) for min, mean in zip(comp_df["Min Latest Score"], comp_df["Mean Latest Score"])],
                                     visible=True
                                 ),
-                                name='Mean Score'
+                                name='Mean Latest Score'
                             ))
                             
                             fig.update_layout(
-                                title="Team Competency Scores with Range",
+                                title="Team Competency Latest Scores with Range",
                                 xaxis_title="Competency",
                                 yaxis_title="Score",
                                 yaxis=dict(range=[0, 5])
                             )
                             
                             st.plotly_chart(fig, use_container_width=True)
-                        else:
+                        elif comp_df is not None:
                             st.info("No competency data available for reporting.")
                     else:
                         st.info("No assessment data available after filtering.")
@@ -552,43 +540,18 @@ with tab2:
                         competencies = sorted(filtered_assessments["competency"].unique())
                         selected_comp = st.selectbox("Select Competency", competencies, key="export_comp_select")
                         
-                        # Filter by competency
-                        comp_assessments = filtered_assessments[filtered_assessments["competency"] == selected_comp]
-                        
-                        if not comp_assessments.empty:
-                            # Group by skill
-                            skill_data = []
+                        # Count the competency's scores of every skill by band
+                        job = finished_report(
+                            "team_skill_distribution",
+                            organization_id,
+                            employee_ids=team_ids,
+                            competency=selected_comp,
+                            assessment_type=report_assessment_type
+                        )
+                        if job is not None:
+                            skill_df = pd.read_csv(job.path)
                             
-                            for skill in comp_assessments["skill"].unique():
-                                skill_assessments = comp_assessments[comp_assessments["skill"] == skill]
-                                
-                                # Calculate distribution of scores
-                                scores = skill_assessments["score"].tolist()
-                                
-                                # Count scores in each band
-                                score_counts = {
-                                    "1.0-1.5": len([s for s in scores if 1.0 <= float(s) <= 1.5]),
-                                    "2.0-2.5": len([s for s in scores if 2.0 <= float(s) <= 2.5]),
-                                    "3.0-3.5": len([s for s in scores if 3.0 <= float(s) <= 3.5]),
-                                    "4.0-4.5": len([s for s in scores if 4.0 <= float(s) <= 4.5]),
-                                    "5.0": len([s for s in scores if float(s) == 5.0])
-                                }
-                                
-                                skill_data.append({
-                                    "Skill": skill,
-                                    "Mean Score": round(skill_assessments["score"].mean(), 2),
-                                    "Number of Employees": len(skill_assessments["employee_id"].unique()),
-                                    "Score 1.0-1.5": score_counts["1.0-1.5"],
-                                    "Score 2.0-2.5": score_counts["2.0-2.5"],
-                                    "Score 3.0-3.5": score_counts["3.0-3.5"],
-                                    "Score 4.0-4.5": score_counts["4.0-4.5"],
-                                    "Score 5.0": score_counts["5.0"]
-                                })
-                            
-                            if skill_data:
-                                # Convert to DataFrame
-                                skill_df = pd.DataFrame(skill_data)
-                                
+                            if not skill_df.empty:
                                 # Display preview
                                 st.dataframe(skill_df)
                                 
@@ -627,9 +590,7 @@ with tab2:
                                 
                                 st.plotly_chart(fig, use_container_width=True)
                             else:
-                                st.info("No skill data available for reporting.")
-                        else:
-                            st.info(f"No assessment data available for {selected_comp}.")
+                                st.info(f"No assessment data available for {selected_comp}.")
                     else:
                         st.info("No assessment data available after filtering.")
                 
@@ -638,53 +599,16 @@ with tab2:
                     st.subheader(f"Individual Comparison: {team_name}")
                     
                     if not filtered_assessments.empty:
-                        # Calculate means for each employee and competency
-                        comparison_data = []
-                        
-                        for emp_id in team_ids:
-                            emp_name = team_members[team_members["employee_id"] == emp_id]["name"].iloc[0]
-                            emp_assessments = filtered_assessments[filtered_assessments["employee_id"] == emp_id]
-                            
-                            if not emp_assessments.empty:
-                                # Calculate overall mean
-                                overall_mean = emp_assessments["score"].mean()
-                                
-                                # Calculate means by competency
-                                comp_means = {}
-                                for comp in emp_assessments["competency"].unique():
-                                    comp_assessments = emp_assessments[emp_assessments["competency"] == comp]
-                                    comp_means[comp] = comp_assessments["score"].mean()
-                                
-                                # Create record
-                                record = {
-                                    "Employee Name": emp_name,
-                                    "Employee ID": emp_id,
-                                    "Overall Mean": round(overall_mean, 2)
-                                }
-                                
-                                # Add competency means
-                                for comp in filtered_assessments["competency"].unique():
-                                    record[f"{comp} Mean"] = round(comp_means.get(comp, 0), 2)
-                                
-                                comparison_data.append(record)
+                        # Mean scores of every team member by competency, with the team averages
+                        job = finished_report(
+                            "team_comparison",
+                            organization_id,
+                            employee_ids=team_ids,
+                            assessment_type=report_assessment_type
+                        )
+                        comparison_df = pd.read_csv(job.path) if job is not None else None
                         
-                        if comparison_data:
-                            # Convert to DataFrame
-                            comparison_df = pd.DataFrame(comparison_data)
-                            
-                            # Calculate team averages
-                            team_avgs = {"Employee Name": "TEAM AVERAGE", "Employee ID": None, "Overall Mean": round(filtered_assessments["score"].mean(), 2)}
-                            
-                            for comp in filtered_assessments["competency"].unique():
-                                comp_assessments = filtered_assessments[filtered_assessments["competency"] == comp]
-                                team_avgs[f"{comp} Mean"] = round(comp_assessments["score"].mean(), 2)
-                            
-                            # Add team averages to DataFrame
-                            comparison_df = pd.concat([comparison_df, pd.DataFrame([team_avgs])], ignore_index=True)
-                            
-                            # Sort by overall mean
-                            comparison_df = comparison_df.sort_values("Overall Mean", ascending=False)
-                            
+                        if comparison_df is not None and not comparison_df.empty:
                             # Display preview
                             st.dataframe(comparison_df)
                             
@@ -752,7 +676,7 @@ with tab2:
                                 st.plotly_chart(fig, use_container_width=True)
                             else:
                                 st.info("Please select at least one employee to visualize.")
-                        else:
+                        elif comparison_df is not None:
                             st.info("No comparison data available for reporting.")
                     else:
                         st.info("No assessment data available after filtering.")
@@ -768,9 +692,9 @@ with tab3:
         st.info("Only administrators can access framework reports.")
     else:
         # Load framework data
-        competencies_df = load_data_for_organization("competencies", organization_id)
-        skills_df = load_data_for_organization("skills", organization_id)
-        expectations_df = load_data_for_organization("expectations", organization_id)
+        competencies_df = context.competencies
+        skills_df = context.skills
+        expectations_df = context.expectations
         
         if competencies_df.empty or skills_df.empty:
             st.warning("Competency framework not fully set up.")
@@ -778,7 +702,7 @@ with tab3:
             # Select report type
             report_type = st.selectbox(
                 "Report Type",
-                ["Competency Framework Overview", "Skill Expectations by Level"],
+                ["Competency Framework Overview", "Skill Expectations by Level", "Org Gap Analysis"],
                 key="framework_report_type"
             )
             
@@ -795,7 +719,7 @@ with tab3:
                     comp_desc = comp_row["description"]
                     
                     # Count skills for this competency
-                    comp_skills = skills_df[skills_df["competency_id"] == comp_id]
+                    comp_skills = context.skills_of(comp_id)
                     skill_count = len(comp_skills)
                     
                     # Create record
@@ -851,7 +775,7 @@ with tab3:
                     selected_level = st.selectbox("Select Job Level", job_levels, key="framework_job_level_select")
                     
                     # Filter expectations by level
-                    level_expectations = expectations_df[expectations_df["job_level"] == selected_level]
+                    level_expectations = context.expectations_for(selected_level)
                     
                     if not level_expectations.empty:
                         # Prepare data in a more usable format
@@ -935,6 +859,222 @@ with tab3:
                             st.info("No expectations data available for reporting.")
                     else:
                         st.info(f"No expectations defined for level {selected_level}.")
+            
+            elif report_type == "Org Gap Analysis":
+                # Create organization-wide gap analysis report
+                st.subheader("Org Gap Analysis")
+                
+                gap_source = st.radio("Assessment Type", ["Combined", "Self", "Manager"], horizontal=True, key="org_gap_assessment_type")
+                
+                # Every employee's gaps come from one pass over the score and expectation matrices
+                analysis = get_gap_analysis(None if gap_source == "Combined" else gap_source.lower(), organization_id)
+                skill_summary = analysis.skill_summary()
+                
+                if skill_summary.empty:
+                    st.info("No employees have both assessments and expectations for their job level.")
+                else:
+                    gaps_df = analysis.to_frame()
+                    employee_summary = analysis.employee_summary()
+                    
+                    col1, col2, col3 = st.columns(3)
+                    
+                    with col1:
+                        st.metric("Employees Compared", len(employee_summary))
+                    
+                    with col2:
+                        st.metric("Mean Gap", f"{gaps_df['gap'].mean():.2f}")
+                    
+                    with col3:
+                        st.metric("Below Expectations", f"{(gaps_df['gap'] < 0).mean():.0%}")
+                    
+                    # Gaps by skill, largest shortfall first
+                    st.markdown("### Gaps by Skill")
+                    skill_report = skill_summary.sort_values("mean_gap").rename(columns={
+                        "competency": "Competency",
+                        "skill": "Skill",
+                        "employees": "Employees",
+                        "mean_gap": "Mean Gap",
+                        "min_gap": "Largest Shortfall",
+                        "below": "Below Expectation",
+                        "below_share": "Share Below"
+                    })[["Competency", "Skill", "Employees", "Mean Gap", "Largest Shortfall", "Below Expectation", "Share Below"]].round(2)
+                    st.dataframe(skill_report)
+                    
+                    fig = px.bar(
+                        skill_report,
+                        x="Skill",
+                        y="Mean Gap",
+                        color="Competency",
+                        hover_data=["Employees", "Share Below"],
+                        title="Mean Gap by Skill",
+                        labels={"Skill": "Skill", "Mean Gap": "Mean Gap (Current - Expected)", "Competency": "Competency"}
+                    )
+                    st.plotly_chart(fig, use_container_width=True)
+                    
+                    # Gaps by department or job level
+                    st.markdown("### Gaps by Group")
+                    group_by = st.selectbox("Group By", ["Department", "Job Level"], key="org_gap_group")
+                    group_column = "department" if group_by == "Department" else "job_level"
+                    group_report = analysis.group_summary(group_column).sort_values("mean_gap").rename(columns={
+                        group_column: group_by,
+                        "employees": "Employees",
+                        "gaps": "Skills Compared",
+                        "mean_gap": "Mean Gap",
+                        "below": "Below Expectation",
+                        "below_share": "Share Below"
+                    }).round(2)
+                    st.dataframe(group_report)
+                    
+                    # Employees with the largest mean shortfall
+                    st.markdown("### Employees Furthest Below Expectations")
+                    employee_report = employee_summary.sort_values("mean_gap").rename(columns={
+                        "employee_id": "Employee ID",
+                        "name": "Employee Name",
+                        "department": "Department",
+                        "job_level": "Job Level",
+                        "skills": "Skills Compared",
+                        "mean_gap": "Mean Gap",
+                        "below": "Below Expectation",
+                        "skill": "Largest Shortfall Skill",
+                        "min_gap": "Largest Shortfall"
+                    })[["Employee ID", "Employee Name", "Department", "Job Level", "Skills Compared", "Mean Gap",
+                        "Below Expectation", "Largest Shortfall Skill", "Largest Shortfall"]].round(2)
+                    st.dataframe(employee_report.head(20))
+                    
+                    # The gap of every employee and skill is written in the background
+                    st.markdown("### Download Report")
+                    gap_format = st.radio(
+                        "Format",
+                        ["csv", "xlsx"],
+                        horizontal=True,
+                        format_func=lambda x: EXPORT_FORMATS[x][0],
+                        key="org_gap_format"
+                    )
+                    job = finished_report(
+                        "org_gap_analysis",
+                        organization_id,
+                        gap_format,
+                        assessment_type=None if gap_source == "Combined" else gap_source.lower()
+                    )
+                    if job is not None:
+                        file_name = export_file_name(f"Org_Gap_Analysis_{gap_source}", gap_format)
+                        st.download_button(
+                            f"Download {file_name}",
+                            data=job.result(),
+                            file_name=file_name,
+                            mime=EXPORT_FORMATS[gap_format][2],
+                            key="org_gap_download"
+                        )
+
+# Data Export Tab
+with tab4:
+    st.header("Assessment Data Export")
+    st.write("Export the full assessment history with employee details, expected scores and gaps. "
+             "Assessments are read and written in chunks, so large organizations can be exported.")
+    
+    organization_id = get_current_organization_id()
+    employees_df = context.employees
+    
+    # Admins export the organization or a department, managers their team
+    if st.session_state.user_role == "admin":
+        export_scope = st.radio("Scope", ["Whole Organization", "Department"], horizontal=True, key="export_scope")
+        if export_scope == "Department":
+            departments = sorted(employees_df["department"].dropna().unique())
+            selected_department = st.selectbox("Select Department", departments, key="export_department_select")
+            export_ids = employees_df[employees_df["department"] == selected_department]["employee_id"].tolist()
+            export_name = f"Assessments_{selected_department.replace(' ', '_')}"
+        else:
+            export_ids = None
+            export_name = "Assessments_Organization"
+    else:
+        manager_id = get_user_id(st.session_state.username)
+        if manager_id is None:
+            st.warning("Your user account is not linked to an employee record.")
+            export_ids = []
+        else:
+            include_indirect = st.checkbox(
+                "Include indirect reports",
+                key="export_include_indirect",
+                help="Also include the employees reporting to you through other managers"
+            )
+            hierarchy = get_reporting_hierarchy()
+            if include_indirect:
+                export_ids = hierarchy.descendants(manager_id)
+            else:
+                export_ids = hierarchy.direct_reports(manager_id)
+        export_name = "Assessments_Team"
+    
+    if export_ids is not None and not export_ids:
+        st.info("No employees to export.")
+    else:
+        col1, col2 = st.columns(2)
+        
+        with col1:
+            export_data_type = st.selectbox(
+                "Data",
+                ["assessments", "comp_assessments"],
+                format_func=lambda x: "Skill Assessments" if x == "assessments" else "Competency Assessments",
+                key="export_data_type"
+            )
+            export_assessment_type = st.radio(
+                "Assessment Type",
+                ["both", "self", "manager"],
+                horizontal=True,
+                format_func=lambda x: "Self Assessment" if x == "self" else "Manager Assessment" if x == "manager" else "Combined",
+                key="export_assessment_type"
+            )
+        
+        with col2:
+            export_format = st.radio(
+                "Format",
+                list(EXPORT_FORMATS),
+                horizontal=True,
+                format_func=lambda x: EXPORT_FORMATS[x][0],
+                key="export_format"
+            )
+            include_notes = st.checkbox("Include notes", key="export_include_notes")
+        
+        if export_format == "xlsx":
+            st.caption("The Excel workbook has sheets for the employees, skill and competency assessments, "
+                       "expectations and gap summaries, with charts of the mean competency scores and gaps.")
+        
+        export_options = {
+            "data_type": export_data_type,
+            "employee_ids": export_ids,
+            "assessment_type": None if export_assessment_type == "both" else export_assessment_type,
+            "include_notes": include_notes
+        }
+        if export_format == "xlsx":
+            # The workbook holds both skill and competency assessments
+            export_options.pop("data_type")
+        export_key = (organization_id, export_format, repr(sorted(export_options.items())))
+        
+        # Exports are generated in the background and stored, so they survive widget changes
+        # and identical requests reuse the stored file until the data changes
+        export_jobs = st.session_state.setdefault("export_jobs", {})
+        if st.button("Generate Export", key="export_prepare"):
+            job = submit_export(organization_id, export_format, **export_options)
+            export_jobs[export_key] = (job.job_id, export_file_name(export_name, export_format))
+        
+        if export_key in export_jobs:
+            job_id, file_name = export_jobs[export_key]
+            job = get_report_queue().get(job_id)
+            if job is None:
+                st.info("This export has expired. Generate it again.")
+            elif not job.done:
+                report_job_progress(job_id)
+            elif job.status == FAILED:
+                st.error(f"The export failed: {job.message}")
+            else:
+                data = job.result()
+                st.download_button(
+                    f"Download {file_name}",
+                    data=data,
+                    file_name=file_name,
+                    mime=EXPORT_FORMATS[export_format][2],
+                    key="export_download"
+                )
+                st.caption(f"{len(data) / 1024:,.1f} KB" + (" (stored report, the data hasn't changed since it was generated)" if job.cached else ""))
 
 # Add explanatory text at the bottom
 st.markdown("---")
@@ -956,6 +1096,11 @@ These reports allow you to analyze and export various aspects of the skill matri
 **Framework Reports:**
 - Competency Framework Overview: Summary of the competency framework structure
 - Skill Expectations by Level: Expected skill scores for different job levels
+- Org Gap Analysis: Gaps between current and expected skill scores across the organization, by skill, group and employee
+
+**Data Export:**
+- Every skill or competency assessment of the organization, a department or your team, with employee details, expected scores and gaps, as CSV, gzip-compressed CSV or JSON Lines
+- An Excel workbook with the employees, assessments, expectations and gap summaries on separate sheets, with native Excel charts
 
-Reports can be downloaded in CSV or Excel format for further analysis or sharing.
+Reports can be downloaded in CSV or Excel format for further analysis or sharing. Team reports, the org gap analysis download and data exports are generated in the background, so you can keep using the page while they run, and an identical report is served from the stored file until the data changes.
 """)
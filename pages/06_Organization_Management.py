@@ -11,7 +11,7 @@ st.set_page_config(
 import pandas as pd
 import os
 from utils import initialize_session_state, check_permission, check_page_access, get_current_organization_id
-from data_manager import get_organizations, add_organization, update_organization, delete_organization, get_user_organizations
+from data_manager import get_organizations, add_organization, update_organization, delete_organization, get_user_organizations, ConflictError
 
 # Load custom CSS
 with open(os.path.join('.streamlit', 'style.css')) as f:
@@ -55,15 +55,16 @@ with tab1:
         st.subheader("Organization Statistics")
         
         try:
-            from data_manager import load_data_for_organization
+            from data_manager import get_org_context
             
             for _, org in orgs_df.iterrows():
                 org_id = org["organization_id"]
                 org_name = org["name"]
                 
-                employees = load_data_for_organization("employees", org_id)
-                competencies = load_data_for_organization("competencies", org_id)
-                skills = load_data_for_organization("skills", org_id)
+                context = get_org_context(org_id)
+                employees = context.employees
+                competencies = context.competencies
+                skills = context.skills
                 
                 col1, col2, col3 = st.columns(3)
                 
@@ -122,6 +123,11 @@ with tab3:
             org_id = int(selected_org[0])
             org_name = selected_org[1]
             
+            # A submitted form shows what the previous run loaded, so changes
+            # are checked against the version that run saw
+            seen_version = st.session_state.get(f"org_version_{org_id}")
+            st.session_state[f"org_version_{org_id}"] = orgs_df.loc[orgs_df["organization_id"] == org_id].iloc[0].get("version")
+            
             st.subheader(f"Managing: {org_name}")
             
             # Management options
@@ -140,9 +146,14 @@ with tab3:
                         elif new_name == org_name:
                             st.info("No changes made to organization name.")
                         else:
-                            success, message = update_organization(org_id, new_name)
+                            try:
+                                success, message = update_organization(org_id, new_name, expected_version=seen_version)
+                            except ConflictError as e:
+                                success, message = False, str(e)
                             
                             if success:
+                                # The version loaded by this run is now outdated
+                                st.session_state.pop(f"org_version_{org_id}", None)
                                 st.success(f"Organization updated to '{new_name}' successfully!")
                             else:
                                 st.error(f"Failed to update organization: {message}")
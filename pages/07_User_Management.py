@@ -11,7 +11,7 @@ st.set_page_config(
 import pandas as pd
 import os
 from utils import initialize_session_state, check_permission, check_page_access, get_current_organization_id
-from data_manager import load_data, save_data, get_organization
+from data_manager import load_data, get_org_context, get_organization, update_user, delete_record, ConflictError
 from email_manager import (
     create_invitation, send_invitation_email, get_pending_invitations
 )
@@ -53,6 +53,9 @@ if not check_permission("admin"):
     st.error("You don't have permission to access this page. Admin access required.")
     st.stop()
 
+# Load the employees and job levels of all organizations once for this run
+context = get_org_context()
+
 st.title("User Management")
 st.write("Manage users in the system. Add, update, or delete user accounts, and send invitations to new users.")
 
@@ -75,7 +78,7 @@ with tab1:
         st.subheader("Employee Associations")
         
         try:
-            employees_df = load_data("employees")
+            employees_df = context.employees
             
             if not employees_df.empty:
                 # Join users with employees on email
@@ -126,14 +129,14 @@ with tab2:
             job_title = st.text_input("Job Title", key="new_job_title")
             
             # Get job levels for dropdown
-            job_levels_df = load_data("levels")
+            job_levels_df = context.levels
             job_level_options = [""] + job_levels_df["name"].tolist() if not job_levels_df.empty else [""]
             job_level = st.selectbox("Job Level", options=job_level_options, key="new_job_level")
             
             department = st.text_input("Department", key="new_department")
             
             # Get managers for dropdown
-            employees_df = load_data("employees")
+            employees_df = context.employees
             managers = employees_df[["employee_id", "name"]].copy()
             manager_options = [("", "None")] + list(zip(managers["employee_id"].astype(str), managers["name"])) if not employees_df.empty else [("", "None")]
             manager_id = st.selectbox("Manager", options=manager_options, format_func=lambda x: x[1], key="new_manager_id")
@@ -232,6 +235,11 @@ with tab3:
         if selected_username:
             user = users_df[users_df["username"] == selected_username].iloc[0]
             
+            # A submitted form shows what the previous run loaded, so changes
+            # are checked against the version that run saw
+            seen_version = st.session_state.get(f"user_version_{selected_username}")
+            st.session_state[f"user_version_{selected_username}"] = user.get("version")
+            
             st.subheader(f"Managing: {user['name']} ({selected_username})")
             
             # Management options
@@ -270,19 +278,21 @@ with tab3:
                             elif "@" not in update_email or "." not in update_email:
                                 st.error("Please enter a valid email address.")
                             else:
-                                # Update user record
-                                user_copy = users_df.copy()
-                                user_idx = user_copy.index[user_copy["username"] == selected_username].tolist()[0]
-                                
-                                user_copy.at[user_idx, "name"] = update_name
-                                user_copy.at[user_idx, "email"] = update_email
-                                user_copy.at[user_idx, "role"] = update_role
-                                
-                                if update_password:
-                                    user_copy.at[user_idx, "password"] = new_password
+                                # Update only this user's record
+                                update_user(
+                                    selected_username,
+                                    password=new_password if update_password else None,
+                                    role=update_role,
+                                    name=update_name,
+                                    email=update_email,
+                                    expected_version=seen_version
+                                )
                                 
-                                save_data("users", user_copy)
+                                # The version loaded by this run is now outdated
+                                st.session_state.pop(f"user_version_{selected_username}", None)
                                 st.success(f"User '{selected_username}' updated successfully!")
+                        except ConflictError as e:
+                            st.error(str(e))
                         except Exception as e:
                             st.error(f"Error updating user: {str(e)}")
             
@@ -302,7 +312,7 @@ with tab3:
                     )
                     
                     # Check if user has associated employee record
-                    employees_df = load_data("employees")
+                    employees_df = context.employees
                     has_employee = not employees_df.empty and any(employees_df["email"] == user["email"])
                     
                     delete_employee_too = st.checkbox("Also delete associated employee record", value=True) if has_employee else False
@@ -336,10 +346,8 @@ with tab3:
                                     if not employee_success:
                                         st.error("Failed to delete associated employee record.")
                                 
-                                # Delete user
-                                user_copy = users_df.copy()
-                                user_copy = user_copy[user_copy["username"] != selected_username]
-                                save_data("users", user_copy)
+                                # Delete only this user's record, leaving concurrent edits of others intact
+                                delete_record("users", selected_username)
                                 
                                 st.success(f"User '{selected_username}' deleted successfully!")
                                 st.rerun()
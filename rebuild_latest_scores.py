@@ -0,0 +1,10 @@
+"""
+Script to rebuild the latest scores tables from the full assessment history.
+Run it after editing the assessment CSV files outside the app (e.g. with fix_data.py).
+"""
+from data_manager import rebuild_latest_scores
+
+if __name__ == "__main__":
+    counts = rebuild_latest_scores()
+    for latest_type, count in counts.items():
+        print(f"Rebuilt {latest_type}: {count} rows")
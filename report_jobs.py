@@ -0,0 +1,294 @@
+import hashlib
+import json
+import os
+import tempfile
+import threading
+import time
+import traceback
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+from functools import partial
+from data_manager import CONTEXT_TYPES, get_data_version
+from exports import EXPORT_FORMATS, export_assessments, export_report_table, export_workbook
+
+# Finished reports are stored in this directory, keyed by report type, parameters and data version
+REPORT_DIR = os.environ.get("SKILLMATRIX_REPORT_DIR", "report_cache")
+
+# Number of reports generated at the same time
+REPORT_WORKERS = int(os.environ.get("SKILLMATRIX_REPORT_WORKERS", "2"))
+
+# The oldest stored reports are removed once the directory grows above this size
+REPORT_CACHE_MAX_BYTES = 512 * 1024 * 1024
+
+# Finished jobs are forgotten after this many seconds; their reports stay stored
+JOB_RETENTION_SECONDS = 60 * 60
+
+# Define the report types as {report type: (build function, data types the report reads)}.
+# The build function takes the report parameters, the binary file to write the report to
+# (output) and a progress callable, so reports are streamed to disk as they are built.
+REPORT_TYPES = {
+    "assessment_export": (export_assessments, ["assessments", "comp_assessments"] + CONTEXT_TYPES),
+    "assessment_workbook": (export_workbook, ["assessments", "comp_assessments", "latest_assessments"] + CONTEXT_TYPES),
+    "team_competency_summary": (
+        partial(export_report_table, "team_competency_summary"),
+        ["latest_assessments"] + CONTEXT_TYPES
+    ),
+    "team_skill_distribution": (partial(export_report_table, "team_skill_distribution"), ["assessments"] + CONTEXT_TYPES),
+    "team_comparison": (partial(export_report_table, "team_comparison"), ["assessments"] + CONTEXT_TYPES),
+    "org_gap_analysis": (partial(export_report_table, "org_gap_analysis"), ["latest_assessments"] + CONTEXT_TYPES)
+}
+
+# Job states
+QUEUED = "queued"
+RUNNING = "running"
+DONE = "done"
+FAILED = "failed"
+
+
+def report_key(report_type, params, data_version):
+    """Build the cache key of a report from its type, parameters and data version
+
+    Args:
+        report_type: Report type of REPORT_TYPES
+        params: Dict of the report parameters. Lists and tuples are compared
+            as sorted, so the same employees in another order give the same key.
+        data_version: Version token of the data the report reads
+
+    Returns:
+        Hex digest identifying the report
+    """
+    normalized = {
+        name: sorted(value) if isinstance(value, (list, tuple, set)) else value
+        for name, value in params.items()
+    }
+    payload = json.dumps([report_type, normalized, repr(data_version)], sort_keys=True, default=str)
+    return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+
+class ReportJob:
+    """A report request and its progress
+
+    Attributes:
+        job_id: Unique ID of the job
+        report_type: Report type of REPORT_TYPES
+        params: Dict of the report parameters
+        key: Cache key of the report, see report_key
+        path: Path of the stored report file
+        status: QUEUED, RUNNING, DONE or FAILED
+        progress: Fraction of the report generated so far
+        message: Description of the current step, or the error of a failed job
+        cached: Whether the report was served from the stored reports
+        submitted, finished: Times the job was submitted and finished
+    """
+
+    def __init__(self, report_type, params, key, path):
+        self.job_id = uuid.uuid4().hex
+        self.report_type = report_type
+        self.params = params
+        self.key = key
+        self.path = path
+        self.status = QUEUED
+        self.progress = 0.0
+        self.message = "Waiting for a worker"
+        self.cached = False
+        self.submitted = time.time()
+        self.finished = None
+        self._finished = threading.Event()
+
+    @property
+    def done(self):
+        """Whether the job has finished, successfully or not"""
+        return self.status in (DONE, FAILED)
+
+    def wait(self, timeout=None):
+        """Wait up to timeout seconds for the job to finish, returning whether it has"""
+        return self._finished.wait(timeout)
+
+    def update(self, fraction, message=None):
+        """Record the progress of a running job"""
+        self.progress = max(0.0, min(float(fraction), 1.0))
+        if message is not None:
+            self.message = message
+
+    def result(self):
+        """Read the bytes of the finished report
+
+        Raises:
+            RuntimeError: If the job hasn't finished successfully
+        """
+        if self.status != DONE:
+            raise RuntimeError(f"Report job {self.job_id} is {self.status}")
+        with open(self.path, "rb") as f:
+            return f.read()
+
+
+class ReportQueue:
+    """A local worker pool generating reports in the background
+
+    Finished reports are stored as files named by their key in report_dir.
+    The key includes the version of the data the report reads, so an
+    identical request is served from the stored file until that data
+    changes, while a request made after a change generates a new report.
+    Identical requests submitted while a report is being generated share its
+    job. Jobs run in threads of this process; the stored reports are shared
+    with other processes using the same directory.
+    """
+
+    def __init__(self, report_dir=REPORT_DIR, workers=REPORT_WORKERS, max_bytes=REPORT_CACHE_MAX_BYTES):
+        self.report_dir = report_dir
+        self.max_bytes = max_bytes
+        self._executor = ThreadPoolExecutor(max_workers=workers, thread_name_prefix="report")
+        self._jobs = {}
+        self._running = {}
+        self._lock = threading.Lock()
+
+    def _path(self, key, extension):
+        return os.path.join(self.report_dir, key + extension)
+
+    def submit(self, report_type, extension, **params):
+        """Request a report, returning its job
+
+        Args:
+            report_type: Report type of REPORT_TYPES
+            extension: File extension of the report, e.g. ".csv"
+            **params: Parameters passed to the report's build function
+
+        Returns:
+            ReportJob, already DONE if the report is stored for the current data
+        """
+        if report_type not in REPORT_TYPES:
+            raise ValueError(f"Unknown report type: {report_type}")
+        _, data_types = REPORT_TYPES[report_type]
+        key = report_key(report_type, params, get_data_version(data_types))
+        path = self._path(key, extension)
+
+        with self._lock:
+            job = self._running.get(key)
+            if job is not None:
+                return job
+
+            expired = time.time() - JOB_RETENTION_SECONDS
+            for job_id in [job_id for job_id, job in self._jobs.items() if job.done and job.finished < expired]:
+                del self._jobs[job_id]
+
+            job = ReportJob(report_type, params, key, path)
+            self._jobs[job.job_id] = job
+            if os.path.exists(path):
+                # Touch the file so pruning keeps the reports in use
+                os.utime(path)
+                job.status = DONE
+                job.progress = 1.0
+                job.message = "Loaded the stored report"
+                job.cached = True
+                job.finished = time.time()
+                job._finished.set()
+                return job
+
+            self._running[key] = job
+        self._executor.submit(self._run, job)
+        return job
+
+    def get(self, job_id):
+        """Get a job by ID, or None if there is no such job"""
+        with self._lock:
+            return self._jobs.get(job_id)
+
+    def _run(self, job):
+        build, _ = REPORT_TYPES[job.report_type]
+        job.status = RUNNING
+        job.update(0.0, "Generating the report")
+        try:
+            self._build(job, build)
+        except Exception as e:
+            traceback.print_exc()
+            job.message = str(e) or type(e).__name__
+            status = FAILED
+        else:
+            job.update(1.0, "Report ready")
+            status = DONE
+        with self._lock:
+            job.finished = time.time()
+            job.status = status
+            self._running.pop(job.key, None)
+        job._finished.set()
+        self.prune()
+
+    def _build(self, job, build):
+        """Build a report into a temporary file and move it into place once it is complete"""
+        os.makedirs(self.report_dir, exist_ok=True)
+        fd, temp_path = tempfile.mkstemp(dir=self.report_dir, suffix=".tmp")
+        try:
+            with os.fdopen(fd, "wb") as output:
+                build(output=output, progress=job.update, **job.params)
+            os.replace(temp_path, job.path)
+        except BaseException:
+            os.remove(temp_path)
+            raise
+
+    def prune(self):
+        """Remove the least recently used reports until the stored ones fit in max_bytes"""
+        try:
+            entries = [entry for entry in os.scandir(self.report_dir) if entry.is_file() and not entry.name.endswith(".tmp")]
+        except FileNotFoundError:
+            return
+        with self._lock:
+            in_use = {job.path for job in self._running.values()}
+        files = sorted((entry.stat().st_mtime, entry.stat().st_size, entry.path) for entry in entries)
+        total = sum(size for _, size, _ in files)
+        for _, size, path in files:
+            if total <= self.max_bytes:
+                break
+            if path in in_use:
+                continue
+            try:
+                os.remove(path)
+            except FileNotFoundError:
+                pass
+            total -= size
+
+
+_report_queue = None
+_report_queue_lock = threading.Lock()
+
+
+def get_report_queue():
+    """Get the report queue of this process, starting it on first use"""
+    global _report_queue
+    with _report_queue_lock:
+        if _report_queue is None:
+            _report_queue = ReportQueue()
+        return _report_queue
+
+
+def submit_export(organization_id, export_format, **options):
+    """Request an assessment export (see exports.export_assessments) as a background report
+
+    Returns:
+        ReportJob of the export
+    """
+    if export_format == "xlsx":
+        options.pop("data_type", None)
+        return get_report_queue().submit("assessment_workbook", EXPORT_FORMATS["xlsx"][1],
+                                         organization_id=organization_id, **options)
+    return get_report_queue().submit(
+        "assessment_export",
+        EXPORT_FORMATS[export_format][1],
+        organization_id=organization_id,
+        export_format=export_format,
+        **options
+    )
+
+
+def submit_report_table(report, organization_id, export_format="csv", **params):
+    """Request a report table (see exports.REPORT_TABLES) as a background report
+
+    Returns:
+        ReportJob of the report
+    """
+    return get_report_queue().submit(
+        report,
+        EXPORT_FORMATS[export_format][1],
+        organization_id=organization_id,
+        export_format=export_format,
+        **params
+    )
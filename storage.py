@@ -0,0 +1,1285 @@
+import glob
+import io
+import itertools
+import json
+import os
+import sqlite3
+import threading
+from contextlib import ExitStack, contextmanager
+import numpy as np
+import pandas as pd
+
+try:
+    import fcntl
+except ImportError:  # Not available on Windows
+    fcntl = None
+
+# Let sqlite3 bind the numpy/pandas scalars that end up in our DataFrames
+sqlite3.register_adapter(np.int64, int)
+sqlite3.register_adapter(np.int32, int)
+sqlite3.register_adapter(np.float64, float)
+sqlite3.register_adapter(np.float32, float)
+sqlite3.register_adapter(np.bool_, bool)
+sqlite3.register_adapter(pd.Timestamp, lambda ts: ts.strftime("%Y-%m-%d"))
+
+
+def partition_name(organization_id):
+    """Return the name of the partition holding an organization's rows
+
+    Rows without an organization live in the unnamed partition "".
+    """
+    if organization_id is None:
+        return ""
+    if not isinstance(organization_id, str) and pd.isna(organization_id):
+        return ""
+    if organization_id == "":
+        return ""
+    try:
+        return str(int(float(organization_id)))
+    except (TypeError, ValueError):
+        return str(organization_id)
+
+
+def apply_schema(df, schema):
+    """Cast the columns of a frame to the types given by a schema
+
+    A schema maps column names to a pandas dtype, "datetime" for dates or None
+    to keep the type the reader inferred. Columns the frame doesn't have are
+    skipped, and the frame passed in is left unchanged.
+    """
+    if not schema:
+        return df
+    typed = None
+    for col, dtype in schema.items():
+        if dtype is None or col not in df.columns:
+            continue
+        series = df[col]
+        if dtype == "datetime":
+            if pd.api.types.is_datetime64_any_dtype(series):
+                continue
+            series = pd.to_datetime(series, format="mixed", errors="coerce")
+        elif series.dtype == dtype:
+            continue
+        elif dtype == "Int64":
+            series = pd.to_numeric(series, errors="coerce").astype("Int64")
+        else:
+            series = series.astype(dtype)
+        if typed is None:
+            typed = df.copy(deep=False)
+        typed[col] = series
+    return df if typed is None else typed
+
+
+def match_rows(df, where):
+    """Build a boolean mask of the rows of a frame matching a {column: value} filter
+
+    List, tuple and set values match any of their members; None matches
+    missing values. Rows never match a filter on a column the frame doesn't have.
+    """
+    mask = pd.Series(True, index=df.index)
+    for col, value in (where or {}).items():
+        if col not in df.columns:
+            return pd.Series(False, index=df.index)
+        values = list(value) if isinstance(value, (list, tuple, set, np.ndarray, pd.Series, pd.Index)) else [value]
+        present = [item for item in values if item is not None]
+        matches = df[col].isin(present).fillna(False).astype(bool)
+        if len(present) < len(values):
+            matches |= df[col].isna()
+        mask &= matches
+    return mask
+
+class _FileSnapshot(io.RawIOBase):
+    """The contents of a data file as of when it was opened
+
+    Data files are only replaced by a new file (os.replace) or appended to,
+    so the open file keeps the replaced contents, and the bytes up to its
+    size when opened never change. Open it under the table's read lock; it
+    can then be read after the lock is released.
+    """
+
+    def __init__(self, path):
+        super().__init__()
+        self._file = open(path, "rb")
+        self._remaining = os.fstat(self._file.fileno()).st_size
+
+    def readable(self):
+        return True
+
+    def readinto(self, buffer):
+        size = min(len(buffer), self._remaining)
+        if size <= 0:
+            return 0
+        data = self._file.read(size)
+        buffer[:len(data)] = data
+        self._remaining -= len(data)
+        return len(data)
+
+    def close(self):
+        self._file.close()
+        super().close()
+
+
+class CSVStorage:
+    """Store each data type in its own CSV file (the default backend)
+
+    CSV files can only be rewritten as a whole, so this backend has no
+    row-level updates or deletes; data_manager falls back to read-modify-write.
+    New rows can be appended to the end of a file without rewriting it, with
+    IDs taken from a sequence counter kept next to the file.
+
+    Partitioned data types keep each organization's rows in their own file,
+    <partition_dir>/<organization_id>/<file>, so reading or rewriting one
+    organization doesn't touch the others. Rows without an organization stay
+    in the data type's main file.
+
+    Columns are parsed with the types in schemas ({data_type: {column: dtype}},
+    see apply_schema), and dates are written back as YYYY-MM-DD.
+
+    Writes made inside transaction() are staged in memory and committed
+    together through a write-ahead journal, see transaction() and recover().
+    """
+
+    name = "csv"
+    supports_row_writes = False
+    # Rows parsed at a time by iter_query()
+    chunk_rows = 50000
+
+    def __init__(self, data_files, id_columns=None, partitioned=(), partition_column="organization_id",
+                 partition_dir="org_data", schema_file=".schema_version", schemas=None, journal_file=".journal"):
+        self.data_files = data_files
+        self.id_columns = id_columns or {}
+        self.partitioned = set(partitioned)
+        self.partition_column = partition_column
+        self.partition_dir = partition_dir
+        self.schema_file = schema_file
+        self.schemas = schemas or {}
+        self.journal_file = journal_file
+        self._local = threading.local()
+        self._serials = itertools.count(1)
+
+    def _sidecar_path(self, data_type, suffix):
+        """Return the path of a hidden helper file stored next to a data file"""
+        directory, filename = os.path.split(self.data_files[data_type])
+        return os.path.join(directory, f".{filename}.{suffix}")
+
+    @contextmanager
+    def lock(self, data_type, shared=False):
+        """Hold a lock on a data type's files across processes and threads
+
+        Readers take a shared lock and never block each other; writers take an
+        exclusive one, so they wait for each other and for running reads.
+        """
+        with self._lock_file(self._sidecar_path(data_type, "lock"), shared):
+            yield
+
+    @contextmanager
+    def _lock_file(self, path, shared=False):
+        """Hold an fcntl lock on a lock file
+
+        Locks are re-entrant within a thread: nested calls for a lock the thread
+        already holds don't wait. A thread holding only the shared lock can't
+        take the exclusive one, as two threads doing so would wait on each other.
+        """
+        held = getattr(self._local, "locks", None)
+        if held is None:
+            held = self._local.locks = {}
+        if path in held:
+            if not shared and held[path][0] == "shared":
+                raise RuntimeError(f"Cannot take a write lock while holding a read lock on {path}")
+            held[path][1] += 1
+            try:
+                yield
+            finally:
+                held[path][1] -= 1
+            return
+
+        if fcntl is None:
+            yield
+            return
+        with open(path, "a") as lock_file:
+            fcntl.flock(lock_file, fcntl.LOCK_SH if shared else fcntl.LOCK_EX)
+            held[path] = ["shared" if shared else "exclusive", 1]
+            try:
+                yield
+            finally:
+                del held[path]
+                fcntl.flock(lock_file, fcntl.LOCK_UN)
+
+    def _read_sequence(self, data_type):
+        """Return the last ID handed out for a data type, or None if not tracked yet"""
+        try:
+            with open(self._sidecar_path(data_type, "seq")) as seq_file:
+                return int(seq_file.read().strip())
+        except (FileNotFoundError, ValueError):
+            return None
+
+    def _write_sequence(self, data_type, value):
+        seq_path = self._sidecar_path(data_type, "seq")
+        tmp_path = seq_path + ".tmp"
+        with open(tmp_path, "w") as seq_file:
+            seq_file.write(str(int(value)))
+        os.replace(tmp_path, seq_path)
+
+    def _bump_sequence(self, data_type, df):
+        """Keep the ID sequence ahead of any IDs written by a rewrite"""
+        id_column = self.id_columns.get(data_type)
+        last_id = self._read_sequence(data_type)
+        if last_id is not None and id_column in df.columns and not df[id_column].dropna().empty:
+            max_id = int(df[id_column].max())
+            if max_id > last_id:
+                self._write_sequence(data_type, max_id)
+
+    def _reserve_ids(self, data_type, id_column, count):
+        """Reserve a block of new IDs, initializing the counter from the files if needed
+
+        Must be called while holding the data type's lock.
+        """
+        last_id = self._read_sequence(data_type)
+        if last_id is None:
+            last_id = 0
+            for path in self._paths(data_type):
+                try:
+                    if path in self._staged():
+                        ids = self._read_csv(data_type, path)[id_column]
+                    else:
+                        ids = pd.read_csv(path, usecols=[id_column])[id_column]
+                    if not ids.dropna().empty:
+                        last_id = max(last_id, int(ids.max()))
+                except (FileNotFoundError, ValueError, pd.errors.EmptyDataError):
+                    pass
+        self._write_sequence(data_type, last_id + count)
+        return list(range(last_id + 1, last_id + count + 1))
+
+    def _read_header(self, path):
+        """Return the column names of a data file, or None if it has no header"""
+        staged = self._staged()
+        if path in staged:
+            df = staged[path][2]
+            return None if df is None else list(df.columns)
+        try:
+            return pd.read_csv(path, nrows=0).columns.tolist()
+        except (FileNotFoundError, pd.errors.EmptyDataError):
+            return None
+
+    def _read_csv(self, data_type, path):
+        """Read one data file, parsing its columns with the data type's schema"""
+        staged = self._staged()
+        if path in staged:
+            if staged[path][2] is None:
+                raise FileNotFoundError(f"No such file: {path}")
+            return staged[path][2].copy()
+
+        schema = self.schemas.get(data_type, {})
+        dtypes = {col: dtype for col, dtype in schema.items() if dtype not in (None, "datetime")}
+        dates = [col for col, dtype in schema.items() if dtype == "datetime"]
+        if dates:
+            # read_csv rejects date columns the file doesn't have
+            header = self._read_header(path) or []
+            dates = [col for col in dates if col in header]
+        df = pd.read_csv(path, dtype=dtypes, parse_dates=dates)
+        return apply_schema(df, schema)
+
+    def _date_schema(self, data_type):
+        return {col: dtype for col, dtype in self.schemas.get(data_type, {}).items() if dtype == "datetime"}
+
+    def _to_csv(self, data_type, df, path_or_buf, **kwargs):
+        """Write rows of a data type, with its date columns as YYYY-MM-DD"""
+        # Rows added as strings next to parsed dates are made dates first, so
+        # the column isn't written as a mix of formats
+        df = apply_schema(df, self._date_schema(data_type))
+        df.to_csv(path_or_buf, index=False, date_format="%Y-%m-%d", **kwargs)
+
+    def _file_exists(self, path):
+        staged = self._staged()
+        if path in staged:
+            return staged[path][2] is not None
+        return os.path.exists(path)
+
+    def _file_version(self, path):
+        """Return a token that changes whenever a data file changes
+
+        Raises FileNotFoundError if the file doesn't exist.
+        """
+        staged = self._staged()
+        if path in staged:
+            if staged[path][2] is None:
+                raise FileNotFoundError(f"No such file: {path}")
+            return ("staged", staged[path][0])
+        stat = os.stat(path)
+        return (stat.st_mtime_ns, stat.st_size, stat.st_ino)
+
+    def _write_file(self, data_type, df, path):
+        """Replace a data file, or stage the new contents inside a transaction
+
+        The file is written under a temporary name and moved into place with
+        os.replace, so readers see either the old or the new file, never a
+        partly written one.
+        """
+        if self._in_transaction():
+            self._local.staged[path] = (next(self._serials), data_type, apply_schema(df.copy(), self.schemas.get(data_type)))
+            return
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        tmp_path = f"{path}.{os.getpid()}.{threading.get_ident()}.tmp"
+        try:
+            with open(tmp_path, "w", newline="") as f:
+                self._to_csv(data_type, df, f)
+            os.replace(tmp_path, path)
+        except BaseException:
+            try:
+                os.remove(tmp_path)
+            except FileNotFoundError:
+                pass
+            raise
+
+    def _remove_file(self, data_type, path):
+        """Delete a data file, or stage its deletion inside a transaction"""
+        if self._in_transaction():
+            self._local.staged[path] = (next(self._serials), data_type, None)
+            return
+        try:
+            os.remove(path)
+        except FileNotFoundError:
+            pass
+
+    def _append_file(self, data_type, path, df):
+        """Append rows to a CSV file, rewriting it if the rows have columns it doesn't"""
+        header = self._read_header(path)
+        if header is None or any(col not in header for col in df.columns) or self._in_transaction():
+            if header is not None:
+                df = pd.concat([self._read_csv(data_type, path), df], ignore_index=True)
+            self._write_file(data_type, df, path)
+            return
+
+        with open(path, "rb+") as f:
+            # Make sure the new rows start on their own line
+            f.seek(0, os.SEEK_END)
+            if f.tell() > 0:
+                f.seek(-1, os.SEEK_END)
+                if f.read(1) not in (b"\n", b"\r"):
+                    f.write(b"\n")
+        with open(path, "a", newline="") as f:
+            self._to_csv(data_type, df.reindex(columns=header), f, header=False)
+
+    # Partitions
+
+    def _partition_path(self, data_type, organization_id):
+        """Return the file holding one organization's rows of a partitioned data type"""
+        name = partition_name(organization_id)
+        if not name:
+            return self.data_files[data_type]
+        return os.path.join(self.partition_dir, name, os.path.basename(self.data_files[data_type]))
+
+    def _split_rows(self, df):
+        """Group rows by the name of the partition they belong to"""
+        if self.partition_column not in df.columns:
+            return [("", df)]
+        names = df[self.partition_column].map(partition_name)
+        return list(df.groupby(names, sort=False))
+
+    def split_partitions(self, data_type):
+        """Move organization rows out of a partitioned data type's main file
+
+        Files written before partitioning was introduced keep every organization
+        in the main file; the schema migrations split them once.
+        """
+        if data_type not in self.partitioned:
+            return
+        path = self.data_files[data_type]
+        with self.lock(data_type):
+            try:
+                df = self._read_csv(data_type, path)
+            except (FileNotFoundError, pd.errors.EmptyDataError):
+                df = None
+            if df is not None and self.partition_column in df.columns and df[self.partition_column].notna().any():
+                id_column = self.id_columns.get(data_type)
+                for name, rows in self._split_rows(df):
+                    if not name:
+                        continue
+                    partition_path = self._partition_path(data_type, name)
+                    if self._file_exists(partition_path):
+                        rows = pd.concat([self._read_csv(data_type, partition_path), rows], ignore_index=True)
+                        if id_column in rows.columns:
+                            rows = rows.drop_duplicates(id_column, keep="last")
+                    self._write_file(data_type, rows, partition_path)
+                self._write_file(data_type, df[df[self.partition_column].isna()], path)
+
+    def _partition_names(self, data_type):
+        """Return the names of the partitions of a data type that have a file"""
+        names = [""] if self._file_exists(self.data_files[data_type]) else []
+        if data_type in self.partitioned:
+            candidates = set(os.listdir(self.partition_dir)) if os.path.isdir(self.partition_dir) else set()
+            candidates.update(os.path.basename(os.path.dirname(path)) for path in self._staged()
+                              if os.path.dirname(os.path.dirname(path)) == self.partition_dir)
+            filename = os.path.basename(self.data_files[data_type])
+            for name in sorted(candidates):
+                if self._file_exists(os.path.join(self.partition_dir, name, filename)):
+                    names.append(name)
+        return names
+
+    def partitions(self, data_type):
+        """Return the names of the partitions of a data type that exist"""
+        return self._partition_names(data_type)
+
+    def _paths(self, data_type):
+        """Return every file holding rows of a data type"""
+        if data_type not in self.partitioned:
+            return [self.data_files[data_type]]
+        return [self._partition_path(data_type, name) for name in self._partition_names(data_type)]
+
+    def partition_version(self, data_type, organization_id):
+        """Return a token that changes whenever one organization's rows change
+
+        Raises FileNotFoundError if the partition doesn't exist.
+        """
+        return self._file_version(self._partition_path(data_type, organization_id))
+
+    def read_partition(self, data_type, organization_id):
+        """Read one organization's rows of a partitioned data type"""
+        with self.lock(data_type, shared=True):
+            return self._read_csv(data_type, self._partition_path(data_type, organization_id))
+
+    def write_partition(self, data_type, organization_id, df):
+        """Replace one organization's rows of a partitioned data type"""
+        path = self._partition_path(data_type, organization_id)
+        if df.empty and partition_name(organization_id):
+            self.drop_partition(data_type, organization_id)
+            return
+        with self.lock(data_type):
+            self._write_file(data_type, df, path)
+            self._bump_sequence(data_type, df)
+
+    def drop_partition(self, data_type, organization_id):
+        """Delete one organization's rows of a partitioned data type"""
+        path = self._partition_path(data_type, organization_id)
+        with self.lock(data_type):
+            if not partition_name(organization_id):
+                header = self._read_header(path)
+                if header is not None:
+                    self._write_file(data_type, pd.DataFrame(columns=header), path)
+                return
+            self._remove_file(data_type, path)
+
+    # Transactions
+
+    def _staged(self):
+        """Return the files staged by the current thread's transaction ({} outside one)
+
+        Maps each path to (serial, data type, contents), where the contents are
+        None for a deleted file.
+        """
+        staged = getattr(self._local, "staged", None)
+        return {} if staged is None else staged
+
+    def _in_transaction(self):
+        return getattr(self._local, "staged", None) is not None
+
+    def _journal_lock(self):
+        """Hold an exclusive lock while committing or recovering across processes"""
+        return self._lock_file(self.journal_file + ".lock")
+
+    @contextmanager
+    def transaction(self):
+        """Stage the writes made by the current thread and commit them together
+
+        Staged files are only visible to the current thread until the commit.
+        If the block raises, nothing is written. Nested transactions join the
+        outer one.
+        """
+        if self._in_transaction():
+            yield
+            return
+        self._local.staged = {}
+        try:
+            yield
+            staged = self._local.staged
+        finally:
+            self._local.staged = None
+        self._commit(staged)
+
+    def _commit(self, staged):
+        """Write staged files through the journal
+
+        The new contents are first written to temporary files next to their
+        targets. Writing the journal, which lists them, is the commit point:
+        afterwards each file is moved into place with os.replace, and the
+        journal is removed. A crash before the journal exists leaves the old
+        files untouched; a crash after it is finished by recover().
+        """
+        if not staged:
+            return
+        with ExitStack() as stack:
+            # Readers of the tables involved wait until every file is in place.
+            # The locks are taken in a fixed order so two commits can't wait on each other.
+            for lock_path in sorted({self._sidecar_path(data_type, "lock") for _, data_type, _ in staged.values()}):
+                stack.enter_context(self._lock_file(lock_path))
+            stack.enter_context(self._journal_lock())
+
+            journal = {"replace": [], "remove": []}
+            for path, (_, data_type, df) in staged.items():
+                if df is None:
+                    journal["remove"].append(path)
+                    continue
+                directory = os.path.dirname(path)
+                if directory:
+                    os.makedirs(directory, exist_ok=True)
+                tmp_path = path + ".txn"
+                with open(tmp_path, "w", newline="") as f:
+                    self._to_csv(data_type, df, f)
+                    f.flush()
+                    os.fsync(f.fileno())
+                journal["replace"].append([tmp_path, path])
+
+            tmp_journal = self.journal_file + ".tmp"
+            with open(tmp_journal, "w") as f:
+                json.dump(journal, f)
+                f.flush()
+                os.fsync(f.fileno())
+            os.replace(tmp_journal, self.journal_file)
+
+            self._apply_journal(journal)
+
+    def _apply_journal(self, journal):
+        """Move the files of a committed journal into place, then drop the journal"""
+        for tmp_path, path in journal["replace"]:
+            if os.path.exists(tmp_path):
+                os.replace(tmp_path, path)
+        for path in journal["remove"]:
+            try:
+                os.remove(path)
+            except FileNotFoundError:
+                pass
+        os.remove(self.journal_file)
+
+    def recover(self):
+        """Finish or roll back a transaction interrupted by a crash
+
+        A committed journal is applied again; temporary files of a transaction
+        that never wrote its journal, or of an interrupted write, are discarded.
+
+        Returns:
+            True if an interrupted commit was finished
+        """
+        with self._journal_lock():
+            try:
+                with open(self.journal_file) as f:
+                    journal = json.load(f)
+            except FileNotFoundError:
+                journal = None
+            if journal is not None:
+                self._apply_journal(journal)
+
+            leftovers = [self.journal_file + ".tmp"]
+            names = os.listdir(self.partition_dir) if os.path.isdir(self.partition_dir) else []
+            for path in set(self.data_files.values()):
+                paths = [path] + [os.path.join(self.partition_dir, name, os.path.basename(path)) for name in names]
+                for data_path in paths:
+                    leftovers.append(data_path + ".txn")
+                    leftovers += glob.glob(glob.escape(data_path) + ".*.tmp")
+            for path in leftovers:
+                try:
+                    os.remove(path)
+                except FileNotFoundError:
+                    pass
+        return journal is not None
+
+    # Schema version
+
+    def schema_version(self):
+        """Return the schema version the stored data was migrated to (0 if never stamped)"""
+        try:
+            with open(self.schema_file) as f:
+                return int(f.read().strip())
+        except (FileNotFoundError, ValueError):
+            return 0
+
+    def set_schema_version(self, version):
+        """Stamp the stored data with a schema version"""
+        tmp_path = self.schema_file + ".tmp"
+        with open(tmp_path, "w") as f:
+            f.write(str(int(version)))
+        os.replace(tmp_path, self.schema_file)
+
+    @contextmanager
+    def schema_lock(self):
+        """Hold an exclusive lock while migrating the schema across processes"""
+        if fcntl is None:
+            yield
+            return
+        with open(self.schema_file + ".lock", "a") as lock_file:
+            fcntl.flock(lock_file, fcntl.LOCK_EX)
+            try:
+                yield
+            finally:
+                fcntl.flock(lock_file, fcntl.LOCK_UN)
+
+    # Backend interface
+
+    def table_key(self, data_type):
+        """Return the key identifying the storage location of a data type"""
+        return self.data_files[data_type]
+
+    def version(self, data_type):
+        """Return a token that changes whenever the stored table changes
+
+        Raises FileNotFoundError if the table has never been written.
+        """
+        if data_type not in self.partitioned:
+            return self._file_version(self.data_files[data_type])
+
+        paths = self._paths(data_type)
+        if not paths:
+            raise FileNotFoundError(f"No files for data type: {data_type}")
+        return tuple((path,) + self._file_version(path) for path in paths)
+
+    def read(self, data_type):
+        """Read the full table for a data type, combining all of its partitions"""
+        with self.lock(data_type, shared=True):
+            if data_type not in self.partitioned:
+                return self._read_csv(data_type, self.data_files[data_type])
+
+            paths = self._paths(data_type)
+            if not paths:
+                raise FileNotFoundError(f"No files for data type: {data_type}")
+            frames = [self._read_csv(data_type, path) for path in paths]
+        non_empty = [df for df in frames if not df.empty]
+        if not non_empty:
+            return frames[0]
+        if len(non_empty) == 1:
+            return non_empty[0]
+        # Categories differ between files, so they are rebuilt for the combined frame
+        return apply_schema(pd.concat(non_empty, ignore_index=True), self.schemas.get(data_type))
+
+    def _query_paths(self, data_type, where):
+        """Return the files that can hold rows matching a filter
+
+        A filter on the partition column only needs the matching partitions.
+        """
+        if data_type not in self.partitioned or self.partition_column not in (where or {}):
+            return self._paths(data_type)
+        value = where[self.partition_column]
+        values = list(value) if isinstance(value, (list, tuple, set, np.ndarray, pd.Series, pd.Index)) else [value]
+        names = sorted({partition_name(item) for item in values})
+        return [path for path in (self._partition_path(data_type, name) for name in names) if self._file_exists(path)]
+
+    def iter_query(self, data_type, columns=None, where=None, chunk_rows=None):
+        """Read some columns of the rows of a data type matching a filter, in chunks
+
+        Only the requested and filtered columns are parsed, chunk_rows rows at
+        a time, and each chunk is filtered as it is read, so the full table is
+        never held in memory. See match_rows for the filter.
+
+        The read lock is only held while the files are opened: the rows are
+        then read from snapshots of the files (see _FileSnapshot), so writers
+        don't wait for a slow consumer, and the consumer can write while it
+        iterates.
+
+        Args:
+            data_type: Data type to read
+            columns: Columns to return (those the table has), or None for all columns
+            where: Optional {column: value} filter
+            chunk_rows: Rows parsed at a time (default: the chunk_rows attribute)
+
+        Yields:
+            DataFrames of the matching rows of each chunk
+        """
+        schema = self.schemas.get(data_type, {})
+        where = where or {}
+        # Each source is a staged frame, or the header and snapshot of a file
+        sources = []
+        try:
+            with self.lock(data_type, shared=True):
+                paths = self._paths(data_type)
+                if not paths:
+                    raise FileNotFoundError(f"No files for data type: {data_type}")
+                for path in self._query_paths(data_type, where):
+                    if path in self._staged():
+                        sources.append((self._read_csv(data_type, path), None))
+                        continue
+                    file_columns = self._read_header(path)
+                    if file_columns is None or any(col not in file_columns for col in where):
+                        continue
+                    sources.append((file_columns, _FileSnapshot(path)))
+                # Like a query matching no rows, a filter matching no file gives an empty frame
+                header = self._read_header(paths[0]) or []
+
+            empty = True
+            for source, snapshot in sources:
+                if snapshot is None:
+                    df = source[match_rows(source, where)]
+                    empty = False
+                    yield df if columns is None else df[[col for col in columns if col in df.columns]]
+                    continue
+
+                file_columns = source
+                keep = [col for col in (file_columns if columns is None else columns) if col in file_columns]
+                usecols = [col for col in file_columns if col in keep or col in where]
+                dtypes = {col: dtype for col, dtype in schema.items() if col in usecols and dtype not in (None, "datetime")}
+                dates = [col for col in usecols if schema.get(col) == "datetime"]
+                reader = pd.read_csv(snapshot, usecols=usecols, dtype=dtypes, parse_dates=dates,
+                                     chunksize=chunk_rows or self.chunk_rows)
+                for chunk in reader:
+                    if where:
+                        chunk = chunk[match_rows(chunk, where)]
+                    empty = False
+                    yield apply_schema(chunk[keep], schema)
+                snapshot.close()
+
+            if empty:
+                yield apply_schema(pd.DataFrame(columns=[col for col in (header if columns is None else columns)
+                                                         if col in header]), schema)
+        finally:
+            for _, snapshot in sources:
+                if snapshot is not None:
+                    snapshot.close()
+
+    def query(self, data_type, columns=None, where=None):
+        """Read some columns of the rows of a data type matching a filter
+
+        The rows are read with iter_query, so only the result is held in memory.
+
+        Args:
+            data_type: Data type to read
+            columns: Columns to return (those the table has), or None for all columns
+            where: Optional {column: value} filter, see match_rows
+
+        Returns:
+            DataFrame of the matching rows
+        """
+        frames = list(self.iter_query(data_type, columns, where))
+        non_empty = [df for df in frames if not df.empty]
+        if non_empty:
+            df = pd.concat(non_empty, ignore_index=True) if len(non_empty) > 1 else non_empty[0].reset_index(drop=True)
+        else:
+            df = frames[0] if frames else pd.DataFrame(columns=columns or [])
+        # Categories differ between chunks and files, so they are rebuilt for the combined frame
+        df = apply_schema(df, self.schemas.get(data_type))
+        if columns is not None:
+            df = df[[col for col in columns if col in df.columns]]
+        return df
+
+    def write(self, data_type, df):
+        """Replace the full table for a data type"""
+        with self.lock(data_type):
+            if data_type not in self.partitioned:
+                self._write_file(data_type, df, self.data_files[data_type])
+                self._bump_sequence(data_type, df)
+                return
+
+            existing = set(self._partition_names(data_type)) - {""}
+            groups = dict(self._split_rows(df))
+
+            # The main file is always written so the table keeps its columns
+            groups.setdefault("", df.iloc[0:0])
+            for name, rows in groups.items():
+                self.write_partition(data_type, name, rows)
+            for name in existing - set(groups):
+                self.drop_partition(data_type, name)
+            self._bump_sequence(data_type, df)
+
+    def replace_table(self, data_type, df):
+        """Replace the full table for a data type, dropping the columns df doesn't have
+
+        Files are always rewritten with the frame's columns, so this is the
+        same as write.
+        """
+        self.write(data_type, df)
+
+    def append(self, data_type, df, id_column):
+        """Append new rows to a data type's files, assigning their IDs
+
+        Only the new rows are written, so the cost doesn't depend on the size
+        of the files. If the rows have columns a file doesn't, that file is
+        rewritten instead.
+
+        Returns:
+            List of the IDs assigned to the new rows
+        """
+        df = df.drop(columns=[id_column], errors="ignore")
+
+        with self.lock(data_type):
+            ids = self._reserve_ids(data_type, id_column, len(df))
+            df.insert(0, id_column, ids)
+
+            if data_type not in self.partitioned:
+                self._append_file(data_type, self.data_files[data_type], df)
+            else:
+                for name, rows in self._split_rows(df):
+                    self._append_file(data_type, self._partition_path(data_type, name), rows)
+        return ids
+
+
+class SQLiteStorage:
+    """Store all data types as tables in a single SQLite database
+
+    Tables are named after the CSV files in DATA_FILES, so data types that share
+    a file also share a table. Existing CSV files (read through csv_storage, so
+    partitioned files are combined) are imported the first time their table is
+    created. Columns are added on demand when a write contains a column the
+    table doesn't have yet.
+
+    Organization partitions are the rows with a given organization_id, which
+    is indexed on every partitioned table.
+
+    Selected rows are cast with the same schemas as the CSV backend.
+    """
+
+    name = "sqlite"
+    supports_row_writes = True
+    # Rows fetched at a time by iter_query()
+    chunk_rows = 50000
+
+    def __init__(self, db_path, data_files, id_columns, key_columns=None, table_columns=None, index_columns=None,
+                 csv_storage=None, partition_column="organization_id", schemas=None):
+        self.db_path = db_path
+        self.data_files = data_files
+        self.id_columns = id_columns
+        self.key_columns = key_columns or {}
+        self.table_columns = table_columns or {}
+        self.index_columns = index_columns or {}
+        self.schemas = schemas or {}
+        self.csv_storage = csv_storage or CSVStorage(data_files, id_columns, schemas=self.schemas)
+        self.partition_column = partition_column
+        self._local = threading.local()
+        self._init_lock = threading.Lock()
+        self._initialized = False
+
+    # Connection and schema management
+
+    def _connect(self):
+        """Return the connection for the current thread, creating it if needed"""
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            conn = sqlite3.connect(self.db_path, timeout=30)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            self._local.conn = conn
+        if not self._initialized:
+            with self._init_lock:
+                if not self._initialized:
+                    self._create_tables(conn)
+                    self._initialized = True
+        return conn
+
+    def table_key(self, data_type):
+        """Return the table name used for a data type"""
+        return os.path.splitext(self.data_files[data_type])[0]
+
+    def _create_tables(self, conn):
+        """Create missing tables and indexes, importing existing CSV files"""
+        with conn:
+            conn.execute(
+                "CREATE TABLE IF NOT EXISTS _table_versions (name TEXT PRIMARY KEY, version INTEGER NOT NULL)"
+            )
+            for data_type in self.data_files:
+                table = self.table_key(data_type)
+                if self._table_columns(conn, table):
+                    continue
+
+                try:
+                    csv_df = self.csv_storage.read(data_type)
+                except (FileNotFoundError, pd.errors.EmptyDataError):
+                    csv_df = None
+
+                columns = list(csv_df.columns) if csv_df is not None else []
+                columns += [col for col in self.table_columns.get(data_type, []) if col not in columns]
+                if not self._create_table(conn, data_type, columns):
+                    continue
+
+                if csv_df is not None and not csv_df.empty:
+                    self._insert_frame(conn, table, csv_df, replace=True)
+
+            for data_type in self.index_columns:
+                self._create_indexes(conn, data_type)
+
+    def _create_table(self, conn, data_type, columns):
+        """Create a data type's table with the given columns and its key
+
+        Returns:
+            False if there was nothing to create (no columns and no key)
+        """
+        table = self.table_key(data_type)
+        id_column = self.id_columns.get(data_type)
+        key = [id_column] if id_column else self.key_columns.get(data_type)
+        if not columns and key:
+            columns = list(key)
+        if not columns:
+            return False
+
+        column_defs = [f'"{col}"' for col in columns]
+        if key:
+            column_defs.append("PRIMARY KEY (" + ", ".join(f'"{col}"' for col in key) + ")")
+        conn.execute(f'CREATE TABLE "{table}" ({", ".join(column_defs)})')
+        conn.execute(
+            "INSERT OR IGNORE INTO _table_versions (name, version) VALUES (?, 0)", (table,)
+        )
+        return True
+
+    def _create_indexes(self, conn, data_type):
+        """Create the secondary indexes of a data type whose columns its table has"""
+        table = self.table_key(data_type)
+        existing = self._table_columns(conn, table)
+        for index in self.index_columns.get(data_type, []):
+            if not all(col in existing for col in index):
+                continue
+            index_name = f"idx_{table}_{'_'.join(index)}"
+            conn.execute(
+                f'CREATE INDEX IF NOT EXISTS "{index_name}" ON "{table}" ('
+                + ", ".join(f'"{col}"' for col in index) + ")"
+            )
+
+    @staticmethod
+    def _table_columns(conn, table):
+        return [row[1] for row in conn.execute(f'PRAGMA table_info("{table}")')]
+
+    def _ensure_columns(self, conn, table, columns):
+        """Add any columns the table doesn't have yet"""
+        existing = self._table_columns(conn, table)
+        for col in columns:
+            if col not in existing:
+                conn.execute(f'ALTER TABLE "{table}" ADD COLUMN "{col}"')
+
+    def _bump_version(self, conn, table):
+        conn.execute("UPDATE _table_versions SET version = version + 1 WHERE name = ?", (table,))
+
+    @staticmethod
+    def _rows(df):
+        """Convert a DataFrame to a list of tuples sqlite3 can bind"""
+        values = df.astype(object).where(df.notna(), None)
+        return list(values.itertuples(index=False, name=None))
+
+    def _insert_frame(self, conn, table, df, replace=False):
+        self._ensure_columns(conn, table, df.columns)
+        columns = ", ".join(f'"{col}"' for col in df.columns)
+        placeholders = ", ".join("?" for _ in df.columns)
+        verb = "INSERT OR REPLACE" if replace else "INSERT"
+        conn.executemany(
+            f'{verb} INTO "{table}" ({columns}) VALUES ({placeholders})', self._rows(df)
+        )
+
+    @staticmethod
+    def _where_clause(where):
+        """Build a WHERE clause from a {column: value} dict
+
+        List, tuple and set values match any of their members; None matches NULL.
+        """
+        if not where:
+            return "", []
+        clauses = []
+        params = []
+        for col, value in where.items():
+            if isinstance(value, (list, tuple, set, np.ndarray, pd.Series, pd.Index)):
+                values = [item for item in value if item is not None]
+                matches = [f'"{col}" IS NULL'] if len(values) < len(list(value)) else []
+                if values:
+                    matches.insert(0, f'"{col}" IN (' + ", ".join("?" for _ in values) + ")")
+                    params.extend(values)
+                clauses.append("(" + " OR ".join(matches) + ")" if matches else "0")
+            elif value is None:
+                clauses.append(f'"{col}" IS NULL')
+            else:
+                clauses.append(f'"{col}" = ?')
+                params.append(value)
+        return " WHERE " + " AND ".join(clauses), params
+
+    @staticmethod
+    def _normalize(df):
+        """Match read_csv conventions: missing values and empty strings are NaN"""
+        for col in df.columns[df.dtypes == object]:
+            df[col] = df[col].where(df[col].notna() & (df[col] != ""), np.nan)
+        return df
+
+    # Transactions
+
+    @contextmanager
+    def transaction(self):
+        """Run the writes made by the current thread in one SQLite transaction
+
+        The write lock is taken when the transaction starts. If the block
+        raises, all of its writes are rolled back. Nested transactions join
+        the outer one.
+        """
+        conn = self._connect()
+        if getattr(self._local, "in_transaction", False):
+            yield
+            return
+        conn.execute("BEGIN IMMEDIATE")
+        self._local.in_transaction = True
+        try:
+            yield
+        except BaseException:
+            conn.rollback()
+            raise
+        else:
+            conn.commit()
+        finally:
+            self._local.in_transaction = False
+
+    def recover(self):
+        """SQLite recovers interrupted transactions itself when the database is opened"""
+        return False
+
+    # Backend interface
+
+    def version(self, data_type):
+        """Return a token that changes whenever the stored table changes"""
+        conn = self._connect()
+        table = self.table_key(data_type)
+        row = conn.execute("SELECT version FROM _table_versions WHERE name = ?", (table,)).fetchone()
+        if row is None:
+            raise FileNotFoundError(f"No table for data type: {data_type}")
+        return (os.stat(self.db_path).st_ino, row[0])
+
+    def read(self, data_type):
+        """Read the full table for a data type"""
+        return self.select(data_type)
+
+    def select(self, data_type, where=None):
+        """Read the rows of a data type matching a {column: value} filter"""
+        return self.query(data_type, where=where)
+
+    def _query_sql(self, data_type, columns=None, where=None):
+        """Build the SELECT reading some columns of the rows matching a filter
+
+        Returns:
+            (sql, params, selected columns or None for all columns)
+        """
+        conn = self._connect()
+        table = self.table_key(data_type)
+        table_columns = self._table_columns(conn, table)
+        if not table_columns:
+            raise FileNotFoundError(f"No table for data type: {data_type}")
+        if columns is None:
+            selected = "*"
+        else:
+            columns = [col for col in columns if col in table_columns]
+            selected = ", ".join(f'"{col}"' for col in columns) if columns else "NULL AS _"
+        clause, params = self._where_clause(where)
+        if any(col not in table_columns for col in (where or {})):
+            clause, params = " WHERE 0", []
+        return f'SELECT {selected} FROM "{table}"{clause}', params, columns
+
+    def _query_frame(self, data_type, df, columns):
+        """Cast a frame read by a query and keep the selected columns"""
+        if columns is not None:
+            df = df[columns]
+        return apply_schema(self._normalize(df), self.schemas.get(data_type))
+
+    def query(self, data_type, columns=None, where=None):
+        """Read some columns of the rows of a data type matching a filter
+
+        The projection and filter are part of the SELECT, so SQLite only
+        returns the requested data (using the organization_id index for
+        partition filters).
+
+        Args:
+            data_type: Data type to read
+            columns: Columns to return (those the table has), or None for all columns
+            where: Optional {column: value} filter, see _where_clause
+
+        Returns:
+            DataFrame of the matching rows
+        """
+        sql, params, columns = self._query_sql(data_type, columns, where)
+        return self._query_frame(data_type, pd.read_sql_query(sql, self._connect(), params=params), columns)
+
+    def iter_query(self, data_type, columns=None, where=None, chunk_rows=None):
+        """Read some columns of the rows of a data type matching a filter, in chunks
+
+        Args:
+            data_type: Data type to read
+            columns: Columns to return (those the table has), or None for all columns
+            where: Optional {column: value} filter, see _where_clause
+            chunk_rows: Rows fetched at a time (default: the chunk_rows attribute)
+
+        Yields:
+            DataFrames of at most chunk_rows matching rows
+        """
+        sql, params, columns = self._query_sql(data_type, columns, where)
+        if getattr(self._local, "in_transaction", False):
+            # The transaction's own writes are only visible on its connection
+            for df in pd.read_sql_query(sql, self._connect(), params=params, chunksize=chunk_rows or self.chunk_rows):
+                yield self._query_frame(data_type, df, columns)
+            return
+
+        # The rows are read on a connection of their own: its open read
+        # snapshot would otherwise keep the thread's connection from writing
+        # until the consumer finishes iterating
+        conn = sqlite3.connect(self.db_path, timeout=30)
+        try:
+            for df in pd.read_sql_query(sql, conn, params=params, chunksize=chunk_rows or self.chunk_rows):
+                yield self._query_frame(data_type, df, columns)
+        finally:
+            conn.close()
+
+    def write(self, data_type, df):
+        """Replace the full table for a data type"""
+        conn = self._connect()
+        table = self.table_key(data_type)
+        with self.transaction():
+            conn.execute(f'DELETE FROM "{table}"')
+            self._insert_frame(conn, table, df, replace=True)
+            self._bump_version(conn, table)
+
+    def replace_table(self, data_type, df):
+        """Replace the full table for a data type, dropping the columns df doesn't have
+
+        Used by schema migrations that rename or remove columns. The table is
+        created again with the current key and indexes.
+        """
+        conn = self._connect()
+        table = self.table_key(data_type)
+        with self.transaction():
+            conn.execute(f'DROP TABLE IF EXISTS "{table}"')
+            self._create_table(conn, data_type, list(df.columns))
+            for index_type in self.index_columns:
+                if self.table_key(index_type) == table:
+                    self._create_indexes(conn, index_type)
+            self._insert_frame(conn, table, df, replace=True)
+            self._bump_version(conn, table)
+
+    def insert(self, data_type, df):
+        """Insert new rows into a data type's table"""
+        conn = self._connect()
+        table = self.table_key(data_type)
+        with self.transaction():
+            self._insert_frame(conn, table, df)
+            self._bump_version(conn, table)
+
+    def update(self, data_type, where, values, increment=()):
+        """Set columns on the rows matching a filter, returning the number of rows updated
+
+        Columns in increment (e.g. row versions) are increased by one on every
+        updated row, counting from 0 where they are NULL.
+        """
+        conn = self._connect()
+        table = self.table_key(data_type)
+        clause, params = self._where_clause(where)
+        assignments = ", ".join([f'"{col}" = ?' for col in values] + [f'"{col}" = COALESCE("{col}", 0) + 1' for col in increment])
+        with self.transaction():
+            self._ensure_columns(conn, table, list(values) + list(increment))
+            cursor = conn.execute(
+                f'UPDATE "{table}" SET {assignments}{clause}', list(values.values()) + params
+            )
+            if cursor.rowcount:
+                self._bump_version(conn, table)
+        return cursor.rowcount
+
+    def delete(self, data_type, where):
+        """Delete the rows matching a filter, returning the number of rows deleted"""
+        conn = self._connect()
+        table = self.table_key(data_type)
+        clause, params = self._where_clause(where)
+        with self.transaction():
+            cursor = conn.execute(f'DELETE FROM "{table}"{clause}', params)
+            if cursor.rowcount:
+                self._bump_version(conn, table)
+        return cursor.rowcount
+
+    def delete_keys(self, data_type, keys):
+        """Delete the rows matching any row of a frame of key columns, in one transaction
+
+        Missing values in keys match NULL.
+
+        Returns:
+            Number of rows deleted
+        """
+        conn = self._connect()
+        table = self.table_key(data_type)
+        condition = " AND ".join(f'"{col}" IS ?' for col in keys.columns)
+        with self.transaction():
+            cursor = conn.executemany(f'DELETE FROM "{table}" WHERE {condition}', self._rows(keys))
+            if cursor.rowcount:
+                self._bump_version(conn, table)
+        return cursor.rowcount
+
+    def append(self, data_type, df, id_column):
+        """Insert new rows into a data type's table, assigning their IDs
+
+        Returns:
+            List of the IDs assigned to the new rows
+        """
+        conn = self._connect()
+        table = self.table_key(data_type)
+        df = df.drop(columns=[id_column], errors="ignore")
+        # The transaction holds the write lock before the current maximum ID is read
+        with self.transaction():
+            row = conn.execute(f'SELECT MAX("{id_column}") FROM "{table}"').fetchone()
+            last_id = 0 if row[0] is None else int(row[0])
+            ids = list(range(last_id + 1, last_id + len(df) + 1))
+            df.insert(0, id_column, ids)
+            self._insert_frame(conn, table, df)
+            self._bump_version(conn, table)
+        return ids
+
+    # Partitions
+
+    def _partition_filter(self, organization_id):
+        """Build the row filter selecting one organization's partition"""
+        name = partition_name(organization_id)
+        if not name:
+            return {self.partition_column: None}
+        try:
+            return {self.partition_column: int(name)}
+        except ValueError:
+            return {self.partition_column: name}
+
+    def partitions(self, data_type):
+        """Return the names of the partitions of a data type that have rows"""
+        conn = self._connect()
+        table = self.table_key(data_type)
+        if self.partition_column not in self._table_columns(conn, table):
+            return [""]
+        rows = conn.execute(f'SELECT DISTINCT "{self.partition_column}" FROM "{table}"').fetchall()
+        return sorted({partition_name(row[0]) for row in rows})
+
+    def partition_version(self, data_type, organization_id):
+        """Return a token that changes whenever one organization's rows change"""
+        return self.version(data_type)
+
+    def read_partition(self, data_type, organization_id):
+        """Read one organization's rows of a partitioned data type"""
+        return self.select(data_type, self._partition_filter(organization_id))
+
+    def write_partition(self, data_type, organization_id, df):
+        """Replace one organization's rows of a partitioned data type"""
+        conn = self._connect()
+        table = self.table_key(data_type)
+        clause, params = self._where_clause(self._partition_filter(organization_id))
+        with self.transaction():
+            conn.execute(f'DELETE FROM "{table}"{clause}', params)
+            self._insert_frame(conn, table, df, replace=True)
+            self._bump_version(conn, table)
+
+    def drop_partition(self, data_type, organization_id):
+        """Delete one organization's rows of a partitioned data type"""
+        self.delete(data_type, self._partition_filter(organization_id))
+
+    def split_partitions(self, data_type):
+        """Partitions are rows of the same table, so there is nothing to split"""
+
+    # Schema version
+
+    def schema_version(self):
+        """Return the schema version the database was migrated to (0 if never stamped)"""
+        return self._connect().execute("PRAGMA user_version").fetchone()[0]
+
+    def set_schema_version(self, version):
+        """Stamp the database with a schema version"""
+        conn = self._connect()
+        with self.transaction():
+            conn.execute(f"PRAGMA user_version = {int(version)}")
+
+    @contextmanager
+    def schema_lock(self):
+        """Hold an exclusive lock while migrating the schema across processes"""
+        if fcntl is None:
+            yield
+            return
+        with open(self.db_path + ".lock", "a") as lock_file:
+            fcntl.flock(lock_file, fcntl.LOCK_EX)
+            try:
+                yield
+            finally:
+                fcntl.flock(lock_file, fcntl.LOCK_UN)
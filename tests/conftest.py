@@ -0,0 +1,28 @@
+import glob
+import importlib
+import os
+import shutil
+import sys
+import pytest
+
+REPO_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, REPO_DIR)
+
+
+@pytest.fixture(params=["csv", "sqlite"])
+def data_dir(request, tmp_path, monkeypatch):
+    """A copy of the repository's baseline (never migrated) data files, used
+    as the working directory with the storage backend of the test's parameter"""
+    for path in glob.glob(os.path.join(REPO_DIR, "*.csv")):
+        shutil.copy(path, tmp_path)
+    monkeypatch.chdir(tmp_path)
+    monkeypatch.setenv("SKILLMATRIX_STORAGE", request.param)
+    monkeypatch.setenv("SKILLMATRIX_DB_PATH", str(tmp_path / "skillmatrix.db"))
+    return tmp_path
+
+
+@pytest.fixture
+def dm(data_dir):
+    """data_manager reloaded so its storage and caches use data_dir"""
+    import data_manager
+    return importlib.reload(data_manager)
@@ -0,0 +1,58 @@
+import multiprocessing
+import warnings
+
+PROCESSES = 4
+ROWS_PER_PROCESS = 15
+
+
+def _add_rows(worker):
+    """Add employees and notes from a separate process, returning the new IDs"""
+    warnings.filterwarnings("ignore")
+    import data_manager
+    employee_ids, note_ids = [], []
+    for i in range(ROWS_PER_PROCESS):
+        success, message, employee_id = data_manager.add_employee(
+            f"Worker {worker} Employee {i}", f"w{worker}e{i}@example.com", "Engineer", "Junior", "Engineering", None, 2
+        )
+        assert success, message
+        employee_ids.append(employee_id)
+        success, message, note_id = data_manager.add_note(employee_id, 1, "manager", f"Note {i}", True, 2)
+        assert success, message
+        note_ids.append(note_id)
+    return employee_ids, note_ids
+
+
+def test_concurrent_adds_get_unique_ids(dm):
+    dm.run_migrations()
+    employees_before = len(dm.load_data("employees"))
+    notes_before = len(dm.load_data("notes"))
+
+    with multiprocessing.get_context("spawn").Pool(PROCESSES) as pool:
+        results = pool.map(_add_rows, range(PROCESSES))
+    employee_ids = [employee_id for ids, _ in results for employee_id in ids]
+    note_ids = [note_id for _, ids in results for note_id in ids]
+
+    total = PROCESSES * ROWS_PER_PROCESS
+    assert len(set(employee_ids)) == total
+    assert len(set(note_ids)) == total
+
+    dm.invalidate_cache()
+    employees = dm.load_data("employees")
+    notes = dm.load_data("notes")
+    assert len(employees) == employees_before + total
+    assert len(notes) == notes_before + total
+    assert not employees["employee_id"].duplicated().any()
+    assert not notes["note_id"].duplicated().any()
+    assert set(employee_ids) <= set(employees["employee_id"])
+    assert set(note_ids) <= set(notes["note_id"])
+
+
+def test_new_ids_follow_the_largest_id(dm):
+    dm.run_migrations()
+    largest = dm.load_data("competencies")["competency_id"].max()
+
+    success, _, first_id = dm.add_competency("Test Competency A", "", 2)
+    assert success
+    success, _, second_id = dm.add_competency("Test Competency B", "", 2)
+    assert success
+    assert (first_id, second_id) == (largest + 1, largest + 2)
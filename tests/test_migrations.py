@@ -0,0 +1,50 @@
+import pandas as pd
+
+
+def _latest_keys(df, key_columns):
+    return set(df[key_columns].astype(str).itertuples(index=False, name=None))
+
+
+def test_migrations_from_baseline_data(dm):
+    messages = dm.run_migrations()
+
+    assert f"Migration {dm.SCHEMA_VERSION}: {dm.MIGRATIONS[-1][1]}" in messages
+    assert dm.get_schema_version() == dm.SCHEMA_VERSION
+
+    for data_type in ["assessments", "comp_assessments"]:
+        history = dm._load_table(data_type)
+        assert not history.empty
+        assert "competency" not in history.columns
+        assert history["competency_id"].notna().all()
+
+        latest_type, key_columns = dm.LATEST_TABLES[data_type]
+        latest = dm._load_table(latest_type)
+        id_columns = [col for col in ["competency_id", "skill_id"] if col in key_columns]
+        assert latest[id_columns].notna().all().all()
+        assert len(latest) == len(history.drop_duplicates(key_columns))
+        assert _latest_keys(latest, key_columns) == _latest_keys(history, key_columns)
+
+
+def test_migrations_run_once(dm):
+    dm.run_migrations()
+
+    assert dm.run_migrations() == []
+
+
+def test_migrations_resume_after_reference_ids(dm):
+    """Data stamped with version 5 gets its latest scores rebuilt by ID"""
+    dm.run_migrations()
+    latest = dm._load_table("latest_assessments")
+    dm._storage.replace_table("latest_assessments", latest.head(1))
+    dm._storage.set_schema_version(5)
+    dm.invalidate_cache()
+
+    messages = dm.run_migrations()
+
+    assert messages[0] == f"Migration 6: {dm.MIGRATIONS[5][1]}"
+    rebuilt = dm._load_table("latest_assessments")
+    key_columns = dm.LATEST_TABLES["assessments"][1]
+    pd.testing.assert_frame_equal(
+        rebuilt.sort_values(key_columns).reset_index(drop=True)[key_columns],
+        latest.sort_values(key_columns).reset_index(drop=True)[key_columns]
+    )
@@ -41,30 +41,32 @@ def authenticate_user(username, password):
     """
     # For demo purposes, using simple authentication
     # In a production environment, use secure password hashing and verification
-    try:
-        users_df = pd.read_csv("users.csv")
-        user = users_df[(users_df["username"] == username) & (users_df["password"] == password)]
-        return not user.empty
-    except FileNotFoundError:
-        # If no users file exists, create default admin account
+    from data_manager import load_data
+    users_df = load_data("users")
+    if users_df.empty:
+        # If no users exist, create default admin account
         if username == "admin" and password == "admin":
             create_default_admin()
             return True
         return False
+    
+    user = users_df[(users_df["username"] == username) & (users_df["password"] == password)]
+    return not user.empty
 
 def get_user_role(username):
     """Get the role of the authenticated user"""
-    try:
-        users_df = pd.read_csv("users.csv")
-        user = users_df[users_df["username"] == username]
-        if not user.empty:
-            return user.iloc[0]["role"]
-        return None
-    except FileNotFoundError:
+    from data_manager import load_data
+    users_df = load_data("users")
+    if users_df.empty:
         # If this is the first run with default admin
         if username == "admin":
             return "admin"
         return None
+    
+    user = users_df[users_df["username"] == username]
+    if not user.empty:
+        return user.iloc[0]["role"]
+    return None
 
 def create_default_admin():
     """Create a default admin user if no users exist"""
@@ -75,12 +77,14 @@ def create_default_admin():
         "name": ["Administrator"],
         "email": ["admin@example.com"]
     })
-    users_df.to_csv("users.csv", index=False)
+    from data_manager import save_data
+    save_data("users", users_df)
 
 def get_user_id(username):
     """Get the employee ID associated with a username or email login"""
     try:
-        employees_df = pd.read_csv("employees.csv")
+        from data_manager import load_data
+        employees_df = load_data("employees")
         
         # Check if this is an email login
         if username.startswith("email_"):
@@ -90,7 +94,7 @@ def get_user_id(username):
                 return employee.iloc[0]["employee_id"]
         else:
             # Regular user login
-            users_df = pd.read_csv("users.csv")
+            users_df = load_data("users")
             user = users_df[users_df["username"] == username]
             if not user.empty:
                 user_email = user.iloc[0]["email"]
@@ -160,29 +164,32 @@ def get_level_expectation(job_level, competency, skill, expectations_df):
 def get_employee_manager_id(employee_id):
     """Get the manager ID for a given employee"""
     try:
-        employees_df = pd.read_csv("employees.csv")
+        from data_manager import load_data
+        employees_df = load_data("employees")
         employee = employees_df[employees_df["employee_id"] == employee_id]
-        if not employee.empty:
+        if not employee.empty and pd.notna(employee.iloc[0]["manager_id"]):
             return employee.iloc[0]["manager_id"]
     except Exception:
         pass
     return None
 
-def get_employees_for_manager(manager_id):
-    """Get all employees reporting to a manager"""
+def get_employees_for_manager(manager_id, include_indirect=False):
+    """Get all employees reporting to a manager, optionally including indirect reports"""
     try:
-        employees_df = pd.read_csv("employees.csv")
-        return employees_df[employees_df["manager_id"] == manager_id]
+        from data_manager import get_employees_for_manager as get_reports
+        return get_reports(manager_id, include_indirect=include_indirect)
     except Exception:
         return pd.DataFrame()
 
-def is_manager_of(manager_id, employee_id):
-    """Check if a user is the manager of an employee"""
+def is_manager_of(manager_id, employee_id, include_indirect=False):
+    """Check if a user is the manager of an employee, or one of their managers higher up"""
     try:
-        employees_df = pd.read_csv("employees.csv")
-        employee = employees_df[employees_df["employee_id"] == employee_id]
-        if not employee.empty:
-            return employee.iloc[0]["manager_id"] == manager_id
+        from data_manager import get_reporting_hierarchy
+        hierarchy = get_reporting_hierarchy()
+        if include_indirect:
+            return manager_id in hierarchy.management_chain(employee_id)
+        employee_manager_id = hierarchy.manager(employee_id)
+        return employee_manager_id is not None and employee_manager_id == manager_id
     except Exception:
         pass
     return False
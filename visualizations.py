@@ -4,15 +4,45 @@ import plotly.express as px
 import plotly.graph_objects as go
 import numpy as np
 from data_manager import (
-    load_data, 
     get_employee_assessments, 
-    get_latest_assessment,
-    get_latest_competency_assessment,
+    get_latest_assessments,
+    get_latest_competency_assessments,
     calculate_employee_competency_means,
     calculate_employee_skill_means,
-    get_team_competency_means
+    get_team_competency_means,
+    get_gap_analysis,
+    get_org_context,
+    get_assessment_store
 )
 
+def _org_context(context):
+    """Use the organization context passed by the page, or one of all organizations"""
+    return context if context is not None else get_org_context()
+
+def latest_skill_scores(employee_ids, assessment_type=None):
+    """Get the latest skill scores of several employees as a lookup dict
+    
+    Returns:
+        Dict mapping (employee_id, competency, skill, assessment_type) to the latest score
+    """
+    latest = get_latest_assessments(employee_ids, assessment_type)
+    if latest.empty:
+        return {}
+    keys = zip(latest["employee_id"], latest["competency"], latest["skill"], latest["assessment_type"])
+    return dict(zip(keys, latest["score"]))
+
+def latest_competency_scores(employee_ids, assessment_type=None):
+    """Get the latest competency scores of several employees as a lookup dict
+    
+    Returns:
+        Dict mapping (employee_id, competency, assessment_type) to the latest score
+    """
+    latest = get_latest_competency_assessments(employee_ids, assessment_type)
+    if latest.empty:
+        return {}
+    keys = zip(latest["employee_id"], latest["competency"], latest["assessment_type"])
+    return dict(zip(keys, latest["score"]))
+
 def create_radar_chart(data, categories, title="", scale=5):
     """Create a radar chart for skills visualization"""
     fig = go.Figure()
@@ -75,11 +105,12 @@ def create_comparison_radar_chart(actual_data, expected_data, categories, title=
     
     return fig
 
-def employee_skill_radar(employee_id, assessment_type="self"):
+def employee_skill_radar(employee_id, assessment_type="self", context=None):
     """Create a radar chart for an employee's skills"""
     # Get skill data
-    skills_df = load_data("skills")
-    competencies_df = load_data("competencies")
+    context = _org_context(context)
+    skills_df = context.skills
+    competencies_df = context.competencies
     
     if skills_df.empty or competencies_df.empty:
         return None, "No skills or competencies found."
@@ -88,22 +119,19 @@ def employee_skill_radar(employee_id, assessment_type="self"):
     labels = []
     values = []
     
+    # Get the latest assessment of every skill in one pass
+    latest_scores = latest_skill_scores([employee_id], assessment_type)
+    
     # Loop through all competencies and skills to get latest assessments
     for _, comp_row in competencies_df.iterrows():
-        comp_skills = skills_df[skills_df["competency_id"] == comp_row["competency_id"]]
+        comp_skills = context.skills_of(comp_row["competency_id"])
         
         for _, skill_row in comp_skills.iterrows():
-            # Get latest assessment for this skill
-            latest = get_latest_assessment(
-                employee_id, 
-                comp_row["name"], 
-                skill_row["name"], 
-                assessment_type
-            )
+            latest = latest_scores.get((employee_id, comp_row["name"], skill_row["name"], assessment_type))
             
             if latest is not None:
                 labels.append(f"{comp_row['name']} - {skill_row['name']}")
-                values.append(latest["score"])
+                values.append(latest)
     
     if not labels:
         return None, f"No {assessment_type} assessments found for this employee."
@@ -118,11 +146,12 @@ def employee_skill_radar(employee_id, assessment_type="self"):
     
     return fig, None
 
-def combined_skill_radar(employee_id):
+def combined_skill_radar(employee_id, context=None):
     """Create a combined radar chart showing both self and manager assessments for an employee's skills"""
     # Get skill data
-    skills_df = load_data("skills")
-    competencies_df = load_data("competencies")
+    context = _org_context(context)
+    skills_df = context.skills
+    competencies_df = context.competencies
     
     if skills_df.empty or competencies_df.empty:
         return None, "No skills or competencies found."
@@ -132,60 +161,21 @@ def combined_skill_radar(employee_id):
     self_values = []
     manager_values = []
     
-    # Get unique skill identifier combinations
-    skill_identifiers = []
+    # Get the latest self and manager assessments of every skill in one pass
+    latest_scores = latest_skill_scores([employee_id])
     
-    # First gather all possible competency-skill combinations for this employee
+    # Gather all competency-skill combinations with either a self or manager assessment
     for _, comp_row in competencies_df.iterrows():
-        comp_skills = skills_df[skills_df["competency_id"] == comp_row["competency_id"]]
+        comp_skills = context.skills_of(comp_row["competency_id"])
         
         for _, skill_row in comp_skills.iterrows():
-            # Check if either self or manager assessment exists
-            self_assessment = get_latest_assessment(
-                employee_id, 
-                comp_row["name"], 
-                skill_row["name"], 
-                "self"
-            )
-            
-            manager_assessment = get_latest_assessment(
-                employee_id, 
-                comp_row["name"], 
-                skill_row["name"], 
-                "manager"
-            )
+            self_score = latest_scores.get((employee_id, comp_row["name"], skill_row["name"], "self"))
+            manager_score = latest_scores.get((employee_id, comp_row["name"], skill_row["name"], "manager"))
             
-            if self_assessment is not None or manager_assessment is not None:
-                label = f"{comp_row['name']} - {skill_row['name']}"
-                skill_identifiers.append((comp_row["name"], skill_row["name"], label))
-    
-    # Then populate the data arrays
-    for comp_name, skill_name, label in skill_identifiers:
-        labels.append(label)
-        
-        # Get latest self assessment
-        self_assessment = get_latest_assessment(
-            employee_id, 
-            comp_name, 
-            skill_name, 
-            "self"
-        )
-        if self_assessment is not None:
-            self_values.append(float(self_assessment["score"]))
-        else:
-            self_values.append(None)
-        
-        # Get latest manager assessment
-        manager_assessment = get_latest_assessment(
-            employee_id, 
-            comp_name, 
-            skill_name, 
-            "manager"
-        )
-        if manager_assessment is not None:
-            manager_values.append(float(manager_assessment["score"]))
-        else:
-            manager_values.append(None)
+            if self_score is not None or manager_score is not None:
+                labels.append(f"{comp_row['name']} - {skill_row['name']}")
+                self_values.append(float(self_score) if self_score is not None else None)
+                manager_values.append(float(manager_score) if manager_score is not None else None)
     
     if not labels:
         return None, "No assessments found for this employee."
@@ -233,54 +223,20 @@ def combined_skill_radar(employee_id):
     
     return fig, None
 
-def comparison_radar_chart(employee_id, job_level, assessment_type="self"):
+def comparison_radar_chart(employee_id, job_level, assessment_type="self", context=None):
     """Create a radar chart comparing actual vs expected skills"""
-    # Load necessary data
-    skills_df = load_data("skills")
-    competencies_df = load_data("competencies")
-    expectations_df = load_data("expectations")
-    
-    if skills_df.empty or competencies_df.empty:
-        return None, "No skills or competencies found."
-    
-    if expectations_df.empty:
-        return None, "No skill expectations defined."
-    
-    # Filter expectations for the employee's job level
-    level_expectations = expectations_df[expectations_df["job_level"] == job_level]
+    # Take the employee's row of the gap analysis instead of looking up
+    # the expectation of every skill
+    gaps = get_gap_analysis(assessment_type, _org_context(context).organization_id).employee_gaps(employee_id, job_level=job_level)
     
-    if level_expectations.empty:
+    if gaps["expected_score"].isna().all():
         return None, f"No skill expectations defined for job level {job_level}."
     
-    # Create lists for chart data
-    labels = []
-    actual_values = []
-    expected_values = []
-    
-    # Loop through all competencies and skills
-    for _, comp_row in competencies_df.iterrows():
-        comp_skills = skills_df[skills_df["competency_id"] == comp_row["competency_id"]]
-        
-        for _, skill_row in comp_skills.iterrows():
-            # Get latest assessment for this skill
-            latest = get_latest_assessment(
-                employee_id, 
-                comp_row["name"], 
-                skill_row["name"], 
-                assessment_type
-            )
-            
-            # Find matching expectation
-            expectation = level_expectations[
-                (level_expectations["competency"] == comp_row["name"]) &
-                (level_expectations["skill"] == skill_row["name"])
-            ]
-            
-            # Only include if both assessment and expectation exist
-            if latest is not None and not expectation.empty:
-                labels.append(f"{comp_row['name']} - {skill_row['name']}")
-                actual_values.append(latest["score"])
-                expected_values.append(expectation.iloc[0]["expected_score"])
+    # Only include skills with both an assessment and an expectation
+    gaps = gaps.dropna(subset=["gap"])
+    labels = (gaps["competency"].astype(str) + " - " + gaps["skill"].astype(str)).tolist()
+    actual_values = gaps["score"].tolist()
+    expected_values = gaps["expected_score"].tolist()
     
     if not labels:
         return None, "No matching skill expectations found for this employee's assessments."
@@ -296,17 +252,19 @@ def comparison_radar_chart(employee_id, job_level, assessment_type="self"):
     
     return fig, None
 
-def team_skill_radar(team_assessments, assessment_type="self", title="Team Skills Assessment"):
+def team_skill_radar(team_assessments, assessment_type="self", title="Team Skills Assessment", context=None):
     """Create a radar chart for a team's skills using latest assessments
     
     Args:
         team_assessments: DataFrame containing team assessment data
         assessment_type: Type of assessment to use (should be pre-filtered)
         title: Title for the chart
+        context: Optional OrgContext of the page (see get_org_context)
     """
     # Load necessary data
-    skills_df = load_data("skills")
-    competencies_df = load_data("competencies")
+    context = _org_context(context)
+    skills_df = context.skills
+    competencies_df = context.competencies
     
     # Check if dataframes are empty
     if skills_df.empty or competencies_df.empty or team_assessments.empty:
@@ -320,27 +278,24 @@ def team_skill_radar(team_assessments, assessment_type="self", title="Team Skill
     # Dictionary to store cumulative skill scores and counts for averaging
     skill_data = {}  # {(competency, skill): [total_score, count]}
     
+    # Get every team member's latest assessments in one pass
+    latest_scores = latest_skill_scores(team_employee_ids, assessment_type)
+    
     # Process each employee's latest assessments
     for employee_id in team_employee_ids:
         # Loop through all competencies and skills
         for _, comp_row in competencies_df.iterrows():
-            comp_skills = skills_df[skills_df["competency_id"] == comp_row["competency_id"]]
+            comp_skills = context.skills_of(comp_row["competency_id"])
             
             for _, skill_row in comp_skills.iterrows():
-                # Get latest assessment for this skill
-                latest = get_latest_assessment(
-                    employee_id, 
-                    comp_row["name"], 
-                    skill_row["name"], 
-                    assessment_type
-                )
+                latest = latest_scores.get((employee_id, comp_row["name"], skill_row["name"], assessment_type))
                 
                 if latest is not None:
                     key = (comp_row["name"], skill_row["name"])
                     if key not in skill_data:
-                        skill_data[key] = [latest["score"], 1]
+                        skill_data[key] = [latest, 1]
                     else:
-                        skill_data[key][0] += latest["score"]
+                        skill_data[key][0] += latest
                         skill_data[key][1] += 1
     
     if not skill_data:
@@ -364,10 +319,10 @@ def team_skill_radar(team_assessments, assessment_type="self", title="Team Skill
     
     return fig, None
 
-def team_competency_radar(team_assessments, assessment_type="self", title="Team Competency Assessment"):
+def team_competency_radar(team_assessments, assessment_type="self", title="Team Competency Assessment", context=None):
     """Create a radar chart for a team's competencies using latest assessments"""
     # Load necessary data
-    competencies_df = load_data("competencies")
+    competencies_df = _org_context(context).competencies
     
     # Check if dataframes are empty
     if competencies_df.empty or team_assessments.empty:
@@ -381,23 +336,21 @@ def team_competency_radar(team_assessments, assessment_type="self", title="Team
     # Dictionary to store cumulative competency scores and counts for averaging
     comp_data = {}  # {competency: [total_score, count]}
     
+    # Get every team member's latest competency assessments in one pass
+    latest_scores = latest_competency_scores(team_employee_ids, assessment_type)
+    
     # Process each employee's latest assessments
     for employee_id in team_employee_ids:
         # Loop through all competencies
         for _, comp_row in competencies_df.iterrows():
-            # Get latest assessment for this competency
-            latest = get_latest_competency_assessment(
-                employee_id, 
-                comp_row["name"], 
-                assessment_type
-            )
+            latest = latest_scores.get((employee_id, comp_row["name"], assessment_type))
             
             if latest is not None:
                 key = comp_row["name"]
                 if key not in comp_data:
-                    comp_data[key] = [latest["score"], 1]
+                    comp_data[key] = [latest, 1]
                 else:
-                    comp_data[key][0] += latest["score"]
+                    comp_data[key][0] += latest
                     comp_data[key][1] += 1
     
     if not comp_data:
@@ -421,10 +374,10 @@ def team_competency_radar(team_assessments, assessment_type="self", title="Team
     
     return fig, None
 
-def employee_competency_radar(employee_id, assessment_type="self"):
+def employee_competency_radar(employee_id, assessment_type="self", context=None):
     """Create a radar chart for an employee's competencies (not skills)"""
     # Get competency data
-    competencies_df = load_data("competencies")
+    competencies_df = _org_context(context).competencies
     
     if competencies_df.empty:
         return None, "No competencies found."
@@ -433,18 +386,16 @@ def employee_competency_radar(employee_id, assessment_type="self"):
     labels = []
     values = []
     
+    # Get the latest assessment of every competency in one pass
+    latest_scores = latest_competency_scores([employee_id], assessment_type)
+    
     # Loop through all competencies to get latest assessments
     for _, comp_row in competencies_df.iterrows():
-        # Get latest competency assessment
-        latest = get_latest_competency_assessment(
-            employee_id, 
-            comp_row["name"], 
-            assessment_type
-        )
+        latest = latest_scores.get((employee_id, comp_row["name"], assessment_type))
         
         if latest is not None:
             labels.append(comp_row["name"])
-            values.append(latest["score"])
+            values.append(latest)
     
     if not labels:
         return None, f"No {assessment_type} competency assessments found for this employee."
@@ -459,10 +410,10 @@ def employee_competency_radar(employee_id, assessment_type="self"):
     
     return fig, None
 
-def combined_competency_radar(employee_id):
+def combined_competency_radar(employee_id, context=None):
     """Create a combined radar chart showing both self and manager assessments for an employee's competencies"""
     # Get competency data
-    competencies_df = load_data("competencies")
+    competencies_df = _org_context(context).competencies
     
     if competencies_df.empty:
         return None, "No competencies found."
@@ -472,52 +423,18 @@ def combined_competency_radar(employee_id):
     self_values = []
     manager_values = []
     
-    # Get unique competency identifiers
-    comp_identifiers = []
+    # Get the latest self and manager assessments of every competency in one pass
+    latest_scores = latest_competency_scores([employee_id])
     
-    # First gather all possible competencies for this employee
+    # Gather all competencies with either a self or manager assessment
     for _, comp_row in competencies_df.iterrows():
-        # Check if either self or manager assessment exists
-        self_assessment = get_latest_competency_assessment(
-            employee_id, 
-            comp_row["name"], 
-            "self"
-        )
-        
-        manager_assessment = get_latest_competency_assessment(
-            employee_id, 
-            comp_row["name"], 
-            "manager"
-        )
-        
-        if self_assessment is not None or manager_assessment is not None:
-            comp_identifiers.append(comp_row["name"])
-    
-    # Then populate the data arrays
-    for comp_name in comp_identifiers:
-        labels.append(comp_name)
+        self_score = latest_scores.get((employee_id, comp_row["name"], "self"))
+        manager_score = latest_scores.get((employee_id, comp_row["name"], "manager"))
         
-        # Get latest self assessment
-        self_assessment = get_latest_competency_assessment(
-            employee_id, 
-            comp_name, 
-            "self"
-        )
-        if self_assessment is not None:
-            self_values.append(float(self_assessment["score"]))
-        else:
-            self_values.append(None)
-        
-        # Get latest manager assessment
-        manager_assessment = get_latest_competency_assessment(
-            employee_id, 
-            comp_name, 
-            "manager"
-        )
-        if manager_assessment is not None:
-            manager_values.append(float(manager_assessment["score"]))
-        else:
-            manager_values.append(None)
+        if self_score is not None or manager_score is not None:
+            labels.append(comp_row["name"])
+            self_values.append(float(self_score) if self_score is not None else None)
+            manager_values.append(float(manager_score) if manager_score is not None else None)
     
     if not labels:
         return None, "No competency assessments found for this employee."
@@ -565,7 +482,7 @@ def combined_competency_radar(employee_id):
     
     return fig, None
 
-def competency_bar_chart(team_assessments, level_expectations=None, assessment_type="self", title="Competency Assessment"):
+def competency_bar_chart(team_assessments, level_expectations=None, assessment_type="self", title="Competency Assessment", context=None):
     """Create a bar chart for competencies using team assessment data
     
     Args:
@@ -573,16 +490,17 @@ def competency_bar_chart(team_assessments, level_expectations=None, assessment_t
         level_expectations: DataFrame containing expectation data for job levels (optional)
         assessment_type: Type of assessment to use (should be pre-filtered)
         title: Title for the chart
+        context: Optional OrgContext of the page (see get_org_context)
     """
     # Load necessary data
-    competencies_df = load_data("competencies")
+    competencies_df = _org_context(context).competencies
     
     # Check if dataframes are empty
     if competencies_df.empty or team_assessments.empty:
         return None, "No competencies or assessments found."
     
     # Calculate the mean score for each competency from the filtered assessments
-    comp_means = team_assessments.groupby('competency')['score'].mean().reset_index()
+    comp_means = team_assessments.groupby('competency', observed=True)['score'].mean().reset_index()
     
     if comp_means.empty:
         return None, f"No {assessment_type} competency assessments found."
@@ -637,42 +555,30 @@ def competency_bar_chart(team_assessments, level_expectations=None, assessment_t
     
     return fig, None
 
-def skill_improvement_chart(employee_id, competency, skill):
-    """Create a line chart showing skill improvement over time"""
-    assessments_df = load_data("assessments")
+def skill_improvement_chart(employee_id, competency, skill, context=None):
+    """Create a line chart showing skill improvement over time
     
-    if assessments_df.empty:
-        return None, "No assessments found."
+    Args:
+        context: Optional OrgContext of the employee's organization
+    """
+    context = _org_context(context)
     
-    # Filter for specific employee and skill
-    skill_assessments = assessments_df[
-        (assessments_df["employee_id"] == employee_id) &
-        (assessments_df["competency"] == competency) &
-        (assessments_df["skill"] == skill)
-    ]
+    # Look up the skill in the organization's framework
+    competency_ids = [comp_id for comp_id, name in context.competency_names.items() if name == competency]
+    skill_ids = context.skills[
+        context.skills["competency_id"].isin(competency_ids) & (context.skills["name"] == skill)
+    ]["skill_id"].tolist()
     
-    if skill_assessments.empty:
+    if not skill_ids:
         return None, f"No assessments found for {competency} - {skill}."
     
-    # Convert dates
-    skill_assessments["assessment_date"] = pd.to_datetime(skill_assessments["assessment_date"])
-    
-    # Group by date and assessment_type, keeping only the latest assessment for each day
-    skill_assessments = skill_assessments.sort_values(["assessment_date", "assessment_id"], ascending=[True, False])
-    
-    # Create a date-only column for grouping by day
-    skill_assessments["assessment_day"] = skill_assessments["assessment_date"].dt.date
-    
     # Get the latest assessment for each day and assessment type
-    latest_assessments = []
-    for (day, assess_type), group in skill_assessments.groupby(["assessment_day", "assessment_type"]):
-        latest_assessments.append(group.iloc[0])
-    
-    # Convert back to DataFrame and sort by date
-    latest_assessments_df = pd.DataFrame(latest_assessments).sort_values("assessment_date")
+    latest_assessments_df = get_assessment_store(context.organization_id).trend(
+        period="D", by=["type"], how="last", employee_ids=[employee_id], skill_ids=skill_ids
+    )
     
     if latest_assessments_df.empty:
-        return None, f"No assessments found for {competency} - {skill} after processing."
+        return None, f"No assessments found for {competency} - {skill}."
     
     # Create line chart
     fig = px.line(
@@ -692,15 +598,32 @@ def skill_improvement_chart(employee_id, competency, skill):
     
     return fig, None
 
-def team_heatmap(team_assessments, assessment_type="self"):
-    """Create a heatmap of team skills by competency using latest assessments"""
-    # Load necessary data
-    skills_df = load_data("skills")
-    competencies_df = load_data("competencies")
-    employees_df = load_data("employees")
+# Define the rows the team heatmap can be grouped by, with their axis titles
+HEATMAP_GROUPS = {
+    "job_level": "Job Level",
+    "employee": "Employee",
+    "department": "Department",
+    "manager": "Manager"
+}
+
+# Define the orders of the team heatmap's skill columns
+HEATMAP_SKILL_ORDERS = {
+    "name": "Skill name",
+    "competency": "Competency",
+    "score": "Team mean (highest first)"
+}
+
+def team_heatmap(team_assessments, assessment_type="self", group_by="job_level", skill_order="name", context=None):
+    """Create a heatmap of the team's mean latest skill scores
     
-    # Check if dataframes are empty
-    if skills_df.empty or competencies_df.empty or team_assessments.empty or employees_df.empty:
+    Args:
+        team_assessments: DataFrame of the team's assessments (selects the team members)
+        assessment_type: Assessment type to show
+        group_by: Rows of the heatmap, a key of HEATMAP_GROUPS
+        skill_order: Order of the skill columns, a key of HEATMAP_SKILL_ORDERS
+        context: Optional OrgContext of the page (see get_org_context)
+    """
+    if team_assessments.empty:
         return None, "No team members or skills/competencies found."
     
     # Get unique employee IDs from the assessments
@@ -708,85 +631,52 @@ def team_heatmap(team_assessments, assessment_type="self"):
     if not team_employee_ids:
         return None, "No team members found in the assessments."
     
-    # Get all unique competencies and skills
-    competencies = sorted(competencies_df["name"].unique())
-    
-    # Get all skills organized by competency
-    skill_by_comp = {}
-    all_skills = []
-    
-    for comp in competencies:
-        comp_id = competencies_df[competencies_df["name"] == comp]["competency_id"].iloc[0]
-        comp_skills = skills_df[skills_df["competency_id"] == comp_id]["name"].tolist()
-        skill_by_comp[comp] = comp_skills
-        all_skills.extend(comp_skills)
-    
-    all_skills = sorted(set(all_skills))  # Remove duplicates and sort
-    
-    if not all_skills:
-        return None, "No skills found for this team."
-    
-    # Get unique job levels from the team
-    team_employees = employees_df[employees_df["employee_id"].isin(team_employee_ids)]
-    job_levels = sorted(team_employees["job_level"].unique())
-    
-    if not job_levels:
-        return None, "No job levels found for this team."
+    # Every team member's latest scores, with the employee attributes to group by
+    latest = get_latest_assessments(team_employee_ids, assessment_type).dropna(subset=["skill"])
+    if latest.empty:
+        return None, f"No {assessment_type} assessments found for this team."
     
-    # Create 2D array for heatmap with default values of NaN (will display as blank in heatmap)
-    heatmap_data = np.full((len(job_levels), len(all_skills)), np.nan)
+    context = _org_context(context)
+    employees_df = context.employees[context.employees["employee_id"].isin(team_employee_ids)]
+    rows = pd.DataFrame({"employee_id": employees_df["employee_id"]})
+    if group_by == "employee":
+        # Employees sharing a name are told apart by their ID
+        names = employees_df["name"].astype(str)
+        duplicated = names.duplicated(keep=False)
+        rows["group"] = names.where(~duplicated, names + " (#" + employees_df["employee_id"].astype(str) + ")")
+    elif group_by == "manager":
+        rows["group"] = employees_df["manager_id"].map(context.employee_names).fillna("No manager")
+    elif group_by == "department":
+        rows["group"] = employees_df["department"].astype(object).fillna("No department")
+    else:
+        rows["group"] = employees_df["job_level"]
     
-    # Dictionary to store cumulative skill scores and counts by job level
-    # {(job_level, skill): [total_score, count]}
-    skill_data_by_level = {}
+    scores = latest.merge(rows.drop_duplicates("employee_id"), on="employee_id", how="inner")
+    scores = scores.astype({"skill": str, "competency": str})
+    heatmap = scores.pivot_table(index="group", columns="skill", values="score", aggfunc="mean", observed=True).sort_index()
     
-    # Process each employee's latest assessments
-    for employee_id in team_employee_ids:
-        # Get employee's job level
-        employee = team_employees[team_employees["employee_id"] == employee_id]
-        if employee.empty:
-            continue
-        
-        job_level = employee.iloc[0]["job_level"]
-        
-        # Loop through all competencies and skills
-        for comp in competencies:
-            comp_id = competencies_df[competencies_df["name"] == comp]["competency_id"].iloc[0]
-            comp_skills = skills_df[skills_df["competency_id"] == comp_id]
-            
-            for _, skill_row in comp_skills.iterrows():
-                skill_name = skill_row["name"]
-                
-                # Get latest assessment for this skill
-                latest = get_latest_assessment(
-                    employee_id, 
-                    comp, 
-                    skill_name, 
-                    assessment_type
-                )
-                
-                if latest is not None:
-                    key = (job_level, skill_name)
-                    if key not in skill_data_by_level:
-                        skill_data_by_level[key] = [latest["score"], 1]
-                    else:
-                        skill_data_by_level[key][0] += latest["score"]
-                        skill_data_by_level[key][1] += 1
+    if heatmap.empty:
+        return None, f"No {HEATMAP_GROUPS.get(group_by, 'job level').lower()} found for this team."
     
-    if not skill_data_by_level:
-        return None, f"No {assessment_type} assessments found for this team."
+    # Order the skill columns
+    if skill_order == "competency":
+        skills = scores[["competency", "skill"]].drop_duplicates("skill").sort_values(["competency", "skill"])["skill"]
+    elif skill_order == "score":
+        skills = scores.groupby("skill")["score"].mean().sort_values(ascending=False, kind="stable").index
+    else:
+        skills = sorted(heatmap.columns)
+    heatmap = heatmap[list(skills)]
     
-    # Fill in the heatmap data with calculated means
-    for (job_level, skill), (total, count) in skill_data_by_level.items():
-        i = job_levels.index(job_level)
-        j = all_skills.index(skill)
-        heatmap_data[i, j] = total / count  # Calculate mean
+    group_title = HEATMAP_GROUPS.get(group_by, HEATMAP_GROUPS["job_level"])
+    all_skills = heatmap.columns.tolist()
+    row_labels = heatmap.index.tolist()
+    heatmap_data = heatmap.to_numpy()
     
     # Create heatmap
     fig = go.Figure(data=go.Heatmap(
         z=heatmap_data,
         x=all_skills,
-        y=job_levels,
+        y=row_labels,
         colorscale=[
             [0, "#f5f0d2"],  # Light yellow for low values
             [0.25, "#f2bc54"],  # Yellow-orange
@@ -798,28 +688,30 @@ def team_heatmap(team_assessments, assessment_type="self"):
         zmax=5
     ))
     
-    # Set layout
+    # Set layout, growing the chart with the number of rows (e.g. one per employee)
     fig.update_layout(
-        title=f"Skills by Job Level ({assessment_type.capitalize()} Assessment)",
+        title=f"Skills by {group_title} ({assessment_type.capitalize()} Assessment)",
         xaxis_title="Skills",
-        yaxis_title="Job Levels",
+        yaxis_title=f"{group_title}s",
+        height=max(450, 22 * len(row_labels) + 200),
         paper_bgcolor='rgba(245, 240, 210, 0)',  # Transparent background
         plot_bgcolor='rgba(245, 240, 210, 0)'
     )
     
     return fig, None
-def combined_team_skill_radar(team_assessments, title="Team Skills Assessment"):
+def combined_team_skill_radar(team_assessments, title="Team Skills Assessment", context=None):
     """Create a combined radar chart for a team's skills showing both self and manager assessments
     
     Args:
         team_assessments: DataFrame containing team assessment data
         title: Title for the chart
+        context: Optional OrgContext of the page (see get_org_context)
     """
     import plotly.graph_objects as go
-    from data_manager import load_data, get_latest_assessment
     # Load necessary data
-    skills_df = load_data("skills")
-    competencies_df = load_data("competencies")
+    context = _org_context(context)
+    skills_df = context.skills
+    competencies_df = context.competencies
     
     # Check if dataframes are empty
     if skills_df.empty or competencies_df.empty or team_assessments.empty:
@@ -834,43 +726,36 @@ def combined_team_skill_radar(team_assessments, title="Team Skills Assessment"):
     self_skill_data = {}  # {(competency, skill): [total_score, count]}
     manager_skill_data = {}  # {(competency, skill): [total_score, count]}
     
+    # Get every team member's latest self and manager assessments in one pass
+    latest_scores = latest_skill_scores(team_employee_ids)
+    
     # Process each employee's latest assessments
     for employee_id in team_employee_ids:
         # Loop through all competencies and skills
         for _, comp_row in competencies_df.iterrows():
-            comp_skills = skills_df[skills_df["competency_id"] == comp_row["competency_id"]]
+            comp_skills = context.skills_of(comp_row["competency_id"])
             
             for _, skill_row in comp_skills.iterrows():
                 # Get latest self assessment for this skill
-                self_latest = get_latest_assessment(
-                    employee_id, 
-                    comp_row["name"], 
-                    skill_row["name"], 
-                    "self"
-                )
+                self_latest = latest_scores.get((employee_id, comp_row["name"], skill_row["name"], "self"))
                 
                 if self_latest is not None:
                     key = (comp_row["name"], skill_row["name"])
                     if key not in self_skill_data:
-                        self_skill_data[key] = [self_latest["score"], 1]
+                        self_skill_data[key] = [self_latest, 1]
                     else:
-                        self_skill_data[key][0] += self_latest["score"]
+                        self_skill_data[key][0] += self_latest
                         self_skill_data[key][1] += 1
                 
                 # Get latest manager assessment for this skill
-                manager_latest = get_latest_assessment(
-                    employee_id, 
-                    comp_row["name"], 
-                    skill_row["name"], 
-                    "manager"
-                )
+                manager_latest = latest_scores.get((employee_id, comp_row["name"], skill_row["name"], "manager"))
                 
                 if manager_latest is not None:
                     key = (comp_row["name"], skill_row["name"])
                     if key not in manager_skill_data:
-                        manager_skill_data[key] = [manager_latest["score"], 1]
+                        manager_skill_data[key] = [manager_latest, 1]
                     else:
-                        manager_skill_data[key][0] += manager_latest["score"]
+                        manager_skill_data[key][0] += manager_latest
                         manager_skill_data[key][1] += 1
     
     # Get all unique keys (competency, skill pairs)
@@ -951,18 +836,18 @@ def combined_team_skill_radar(team_assessments, title="Team Skills Assessment"):
     
     return fig, None
 
-def combined_team_competency_radar(team_assessments, title="Team Competency Assessment"):
+def combined_team_competency_radar(team_assessments, title="Team Competency Assessment", context=None):
     """Create a combined radar chart for a team's competencies showing both self and manager assessments
     
     Args:
         team_assessments: DataFrame containing team assessment data
         title: Title for the chart
+        context: Optional OrgContext of the page (see get_org_context)
     """
     import plotly.graph_objects as go
-    from data_manager import load_data, get_latest_competency_assessment
     
     # Load necessary data
-    competencies_df = load_data("competencies")
+    competencies_df = _org_context(context).competencies
     
     # Check if dataframes are empty
     if competencies_df.empty or team_assessments.empty:
@@ -977,38 +862,33 @@ def combined_team_competency_radar(team_assessments, title="Team Competency Asse
     self_comp_data = {}  # {competency: [total_score, count]}
     manager_comp_data = {}  # {competency: [total_score, count]}
     
+    # Get every team member's latest self and manager assessments in one pass
+    latest_scores = latest_competency_scores(team_employee_ids)
+    
     # Process each employee's latest assessments
     for employee_id in team_employee_ids:
         # Loop through all competencies
         for _, comp_row in competencies_df.iterrows():
             # Get latest self assessment for this competency
-            self_latest = get_latest_competency_assessment(
-                employee_id, 
-                comp_row["name"], 
-                "self"
-            )
+            self_latest = latest_scores.get((employee_id, comp_row["name"], "self"))
             
             if self_latest is not None:
                 key = comp_row["name"]
                 if key not in self_comp_data:
-                    self_comp_data[key] = [self_latest["score"], 1]
+                    self_comp_data[key] = [self_latest, 1]
                 else:
-                    self_comp_data[key][0] += self_latest["score"]
+                    self_comp_data[key][0] += self_latest
                     self_comp_data[key][1] += 1
             
             # Get latest manager assessment for this competency
-            manager_latest = get_latest_competency_assessment(
-                employee_id, 
-                comp_row["name"], 
-                "manager"
-            )
+            manager_latest = latest_scores.get((employee_id, comp_row["name"], "manager"))
             
             if manager_latest is not None:
                 key = comp_row["name"]
                 if key not in manager_comp_data:
-                    manager_comp_data[key] = [manager_latest["score"], 1]
+                    manager_comp_data[key] = [manager_latest, 1]
                 else:
-                    manager_comp_data[key][0] += manager_latest["score"]
+                    manager_comp_data[key][0] += manager_latest
                     manager_comp_data[key][1] += 1
     
     # Get all unique keys (competencies)
@@ -1088,23 +968,24 @@ def combined_team_competency_radar(team_assessments, title="Team Competency Asse
     
     return fig, None
 
-def combined_comparison_radar_chart(employee_id, job_level, view_type="Skills"):
+def combined_comparison_radar_chart(employee_id, job_level, view_type="Skills", context=None):
     """Create a radar chart comparing the mean of self and manager assessments vs expected levels for next job level
     
     Args:
         employee_id: ID of the employee to display
         job_level: Current job level of the employee (e.g., "IC1 - Associate")
         view_type: Whether to show "Skills" or "Competencies"
+        context: Optional OrgContext of the page (see get_org_context)
     """
     import plotly.graph_objects as go
-    from data_manager import load_data, get_latest_assessment, get_latest_competency_assessment
     
     # Load necessary data
-    skills_df = load_data("skills")
-    competencies_df = load_data("competencies")
-    expectations_df = load_data("expectations")
-    comp_expectations_df = load_data("comp_expectations")
-    job_levels_df = load_data("levels")
+    context = _org_context(context)
+    skills_df = context.skills
+    competencies_df = context.competencies
+    expectations_df = context.expectations
+    comp_expectations_df = context.comp_expectations
+    job_levels_df = context.levels
     
     if competencies_df.empty:
         return None, "No competencies found."
@@ -1137,21 +1018,13 @@ def combined_comparison_radar_chart(employee_id, job_level, view_type="Skills"):
     
     next_level_name = next_level_row.iloc[0]["name"]
     
-    # Filter expectations for the next job level using both ID and name formats
+    # Get the expectations of the next job level
     if view_type == "Skills":
-        # Try both numeric ID and full name
-        next_level_expectations = expectations_df[
-            (expectations_df["job_level"] == str(next_level_id)) | 
-            (expectations_df["job_level"] == next_level_name)
-        ]
+        next_level_expectations = context.expectations_for(next_level_name)
         if next_level_expectations.empty:
             return None, f"No skill expectations defined for next job level '{next_level_name}'."
     else:
-        # Try both numeric ID and full name
-        next_level_expectations = comp_expectations_df[
-            (comp_expectations_df["job_level"] == str(next_level_id)) | 
-            (comp_expectations_df["job_level"] == next_level_name)
-        ]
+        next_level_expectations = context.comp_expectations_for(next_level_name)
         if next_level_expectations.empty:
             return None, f"No competency expectations defined for next job level '{next_level_name}'."
     
@@ -1161,93 +1034,74 @@ def combined_comparison_radar_chart(employee_id, job_level, view_type="Skills"):
     next_level_expected_values = []
     
     if view_type == "Skills":
+        # Get the latest assessments and next level expectations in one pass each
+        latest_scores = latest_skill_scores([employee_id])
+        expected_scores = (
+            next_level_expectations.drop_duplicates(["competency", "skill"])
+            .set_index(["competency", "skill"])["expected_score"].to_dict()
+        )
+        
         # Loop through all competencies and skills
         for _, comp_row in competencies_df.iterrows():
-            comp_skills = skills_df[skills_df["competency_id"] == comp_row["competency_id"]]
+            comp_skills = context.skills_of(comp_row["competency_id"])
             
             for _, skill_row in comp_skills.iterrows():
-                # Get latest self assessment for this skill
-                self_latest = get_latest_assessment(
-                    employee_id, 
-                    comp_row["name"], 
-                    skill_row["name"], 
-                    "self"
-                )
-                
-                # Get latest manager assessment for this skill
-                manager_latest = get_latest_assessment(
-                    employee_id, 
-                    comp_row["name"], 
-                    skill_row["name"], 
-                    "manager"
-                )
-                
-                # Find matching expectation for the next level
-                next_expectation = next_level_expectations[
-                    (next_level_expectations["competency"] == comp_row["name"]) &
-                    (next_level_expectations["skill"] == skill_row["name"])
-                ]
+                self_latest = latest_scores.get((employee_id, comp_row["name"], skill_row["name"], "self"))
+                manager_latest = latest_scores.get((employee_id, comp_row["name"], skill_row["name"], "manager"))
+                next_expectation = expected_scores.get((comp_row["name"], skill_row["name"]))
                 
                 # Only include if next level expectation exists and at least one assessment exists
-                if not next_expectation.empty and (self_latest is not None or manager_latest is not None):
+                if next_expectation is not None and (self_latest is not None or manager_latest is not None):
                     # Calculate the combined mean of self and manager assessments
                     sum_scores = 0
                     count_scores = 0
                     
                     if self_latest is not None:
-                        sum_scores += float(self_latest["score"])
+                        sum_scores += float(self_latest)
                         count_scores += 1
                         
                     if manager_latest is not None:
-                        sum_scores += float(manager_latest["score"])
+                        sum_scores += float(manager_latest)
                         count_scores += 1
                     
                     # Only add if we have at least one assessment
                     if count_scores > 0:
                         labels.append(f"{comp_row['name']} - {skill_row['name']}")
                         combined_values.append(sum_scores / count_scores)
-                        next_level_expected_values.append(next_expectation.iloc[0]["expected_score"])
+                        next_level_expected_values.append(next_expectation)
     else:
+        # Get the latest assessments and next level expectations in one pass each
+        latest_scores = latest_competency_scores([employee_id])
+        expected_scores = (
+            next_level_expectations.drop_duplicates(["competency"])
+            .set_index("competency")["expected_score"].to_dict()
+        )
+        
         # Loop through all competencies
         for _, comp_row in competencies_df.iterrows():
-            # Get latest self assessment for this competency
-            self_latest = get_latest_competency_assessment(
-                employee_id, 
-                comp_row["name"], 
-                "self"
-            )
-            
-            # Get latest manager assessment for this competency
-            manager_latest = get_latest_competency_assessment(
-                employee_id, 
-                comp_row["name"], 
-                "manager"
-            )
-            
-            # Find matching expectation for the next level
-            next_expectation = next_level_expectations[
-                (next_level_expectations["competency"] == comp_row["name"])
-            ]
+            self_latest = latest_scores.get((employee_id, comp_row["name"], "self"))
+            manager_latest = latest_scores.get((employee_id, comp_row["name"], "manager"))
+            next_expectation = expected_scores.get(comp_row["name"])
             
             # Only include if next level expectation exists and at least one assessment exists
-            if not next_expectation.empty and (self_latest is not None or manager_latest is not None):
+            if next_expectation is not None and (self_latest is not None or manager_latest is not None):
                 # Calculate the combined mean of self and manager assessments
                 sum_scores = 0
                 count_scores = 0
                 
                 if self_latest is not None:
-                    sum_scores += float(self_latest["score"])
+                    sum_scores += float(self_latest)
                     count_scores += 1
                     
                 if manager_latest is not None:
-                    sum_scores += float(manager_latest["score"])
+                    sum_scores += float(manager_latest)
                     count_scores += 1
                 
                 # Only add if we have at least one assessment
                 if count_scores > 0:
                     labels.append(comp_row["name"])
                     combined_values.append(sum_scores / count_scores)
-                    next_level_expected_values.append(next_expectation.iloc[0]["expected_score"])
+                    next_level_expected_values.append(next_expectation)
     
     if not labels:
         return None, f"No matching {'skill' if view_type == 'Skills' else 'competency'} expectations found for next level assessments."